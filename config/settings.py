@@ -4,7 +4,7 @@ Contains every configuration variable for the application.
 
 import time
 from os import getenv
-from typing import List
+from typing import List, Optional
 
 import sentry_sdk
 from dotenv import load_dotenv
@@ -135,6 +135,44 @@ TEST_RUNNER = "tests.runner.PostgresSchemaTestRunner"
 
 CORS_ALLOWED_ORIGINS = ["http://localhost:4200"]
 
+# Engine that replays the stock portfolio timeseries, either "columnar" or "reference".
+REPLAY_ENGINE = getenv("REPLAY_ENGINE", "columnar")
+
+# Number of (ticker, date) quotes kept in memory and their time to live in seconds.
+QUOTE_CACHE_SIZE = int(getenv("QUOTE_CACHE_SIZE", "4096"))
+QUOTE_CACHE_TTL = int(getenv("QUOTE_CACHE_TTL", "3600"))
+
+# Whether the price history is kept in memory between the requests.
+PRICE_MATRIX_CACHE = getenv("PRICE_MATRIX_CACHE", "true") == "true"
+
+# Directory of the memory-mapped price history files, the store is disabled if it is not set.
+PRICE_STORE_PATH = getenv("PRICE_STORE_PATH")
+
+# Forex rates of the currencies without any stored rate history.
+# Converting a currency without either of them fails.
+USD_HUF_FX_RATE: Optional[float] = (
+    float(getenv("USD_HUF_FX_RATE", "")) if getenv("USD_HUF_FX_RATE") else None
+)
+EUR_USD_FX_RATE: Optional[float] = (
+    float(getenv("EUR_USD_FX_RATE", "")) if getenv("EUR_USD_FX_RATE") else None
+)
+
+# Whether the forex rate history is kept in memory between the requests.
+FOREX_RATE_CACHE = getenv("FOREX_RATE_CACHE", "true") == "true"
+
+# Alias of the Django cache of the data versions checked by the in-process price, quote and forex caches
+# and by the cached performance results.
+# It must be shared by the processes (e.g. Redis or Memcached) to reach every worker after a sync.
+SHARED_VERSION_CACHE = getenv("SHARED_VERSION_CACHE", "default")
+
+# Alias of the Django cache of the performance results and their time to live in seconds.
+# The results are not cached if the alias is empty.
+PERFORMANCE_CACHE = getenv("PERFORMANCE_CACHE", "default")
+PERFORMANCE_CACHE_TTL = int(getenv("PERFORMANCE_CACHE_TTL", "3600"))
+
+# Maximum number of threads that calculate the portfolio performances of a summary at once.
+PERFORMANCE_WORKERS = int(getenv("PERFORMANCE_WORKERS", "4"))
+
 # We only want to report and configure logging in non-development environments.
 environment = getenv("PYTHON_ENV")
 
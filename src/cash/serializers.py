@@ -11,3 +11,14 @@ class CashBalanceSerializer(serializers.Serializer):
     usd = serializers.FloatField(source="USD")
     huf = serializers.FloatField(source="HUF")
     eur = serializers.FloatField(source="EUR")
+
+
+class CashBalanceHistorySerializer(serializers.Serializer):
+    """Serializer of the cash balance at a given date in a timeseries."""
+
+    # pylint: disable=abstract-method
+
+    date = serializers.DateField()
+    usd = serializers.FloatField(source="balance.USD")
+    huf = serializers.FloatField(source="balance.HUF")
+    eur = serializers.FloatField(source="balance.EUR")
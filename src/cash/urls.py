@@ -2,9 +2,14 @@
 
 from django.urls import path
 
-from .views import CashBalanceDetailsView, CashBalanceSummaryView
+from .views import (
+    CashBalanceDetailsView,
+    CashBalanceHistoryView,
+    CashBalanceSummaryView,
+)
 
 urlpatterns = [
     path("<int:pk>", CashBalanceDetailsView.as_view()),
+    path("<int:pk>/history", CashBalanceHistoryView.as_view()),
     path("summary", CashBalanceSummaryView.as_view()),
 ]
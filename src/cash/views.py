@@ -9,11 +9,15 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from ..lib.helpers import parse_date_query_param
+from ..lib.helpers import get_range, parse_date_query_param
 from ..lib.permissions import IsOwnerOrAdmin
-from ..lib.services.cash import get_portfolio_cash_balance_snapshot
+from ..lib.services.cash import (
+    get_cash_balance_series,
+    get_portfolio_cash_balance_snapshot,
+)
+from ..lib.services.date import get_resolution, get_timeseries
 from ..stocks.models import StockPortfolio
-from .serializers import CashBalanceSerializer
+from .serializers import CashBalanceHistorySerializer, CashBalanceSerializer
 
 LOGGER = getLogger(__name__)
 
@@ -53,6 +57,46 @@ class CashBalanceDetailsView(APIView):
         return Response(serializer.data)
 
 
+class CashBalanceHistoryView(APIView):
+    """Business logic for the cash history API."""
+
+    permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
+
+    def get(self, request: Request, pk: int) -> Response:
+        """
+        Returns the timeseries of the cash balance of a given portfolio.
+        """
+
+        # pylint: disable=invalid-name
+
+        interval = get_range(request)
+        series = get_timeseries(interval, get_resolution(interval))
+
+        LOGGER.info(
+            "The user %s has requested %s portfolio's cash balance history from %s to %s.",
+            request.user,
+            pk,
+            interval.start_date,
+            interval.end_date,
+        )
+
+        LOGGER.debug("Looking for %s portfolio.", pk)
+        portfolio = get_object_or_404(StockPortfolio, pk=pk, owner=request.user)
+
+        history = get_cash_balance_series([portfolio], series)
+
+        LOGGER.debug("Validating output for cash balance history.")
+        serializer = CashBalanceHistorySerializer(
+            [
+                {"date": snapshot_date, "balance": balance}
+                for snapshot_date, balance in history.items()
+            ],
+            many=True,
+        )
+
+        return Response({"results": serializer.data})
+
+
 class CashBalanceSummaryView(APIView):
     """Business logic for the cash summary API."""
 
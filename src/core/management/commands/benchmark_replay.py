@@ -0,0 +1,182 @@
+"""Benchmark of the portfolio replay against a large synthetic stock universe."""
+
+from datetime import date, timedelta
+from random import Random
+from time import perf_counter
+from typing import Callable
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from src.lib.services.stocks import get_portfolio_snapshot, refresh_current_position
+from src.raw_data.models import (
+    StockDividend,
+    StockDividendSync,
+    StockPrice,
+    StockPriceSync,
+    StockSplit,
+    StockSplitSync,
+)
+from src.stocks.enums import Sector
+from src.stocks.models import Stock, StockPortfolio
+from src.transactions.models import StockTransaction
+
+BATCH_SIZE = 10_000
+
+
+class Command(BaseCommand):
+    """
+    Custom command to measure the portfolio snapshot against a synthetic stock universe.
+
+    The universe is created in a transaction that is rolled back at the end,
+    still only use it on a development database!
+    """
+
+    help = "Benchmarks the portfolio snapshot against a large synthetic stock universe."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stocks", type=int, default=5_000)
+        parser.add_argument("--held", type=int, default=25)
+        parser.add_argument("--days", type=int, default=250)
+        parser.add_argument("--runs", type=int, default=5)
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(ending="\n")
+
+        with transaction.atomic():
+            self.stdout.write(
+                f"-------- Seeding {kwargs['stocks']} stocks with {kwargs['days']} days of history. --------",
+                ending="\n\n",
+            )
+            portfolio = seed_universe(kwargs["stocks"], kwargs["held"], kwargs["days"])
+            snapshot_date = date.today()
+            transactions = StockTransaction.objects.filter(portfolio=portfolio)
+
+            self.stdout.write("-------- Measuring. --------", ending="\n\n")
+            results = {
+                "every split of the universe": measure(
+                    lambda: list(StockSplit.objects.filter(date__lte=snapshot_date)),
+                    kwargs["runs"],
+                ),
+                "splits of the held stocks": measure(
+                    lambda: list(
+                        StockSplit.objects.filter(
+                            ticker__in=transactions.values("ticker"),
+                            date__lte=snapshot_date,
+                        )
+                    ),
+                    kwargs["runs"],
+                ),
+                # The snapshots of the past are replayed, today's one is read from the current positions.
+                "portfolio snapshot replay": measure(
+                    lambda: get_portfolio_snapshot(
+                        [portfolio], snapshot_date - timedelta(days=1)
+                    ),
+                    kwargs["runs"],
+                ),
+                "portfolio snapshot from the current positions": measure(
+                    lambda: get_portfolio_snapshot([portfolio], snapshot_date),
+                    kwargs["runs"],
+                ),
+            }
+
+            for name, elapsed in results.items():
+                self.stdout.write(f"{name}: {elapsed * 1_000:.1f} ms", ending="\n")
+            self.stdout.write(ending="\n")
+
+            transaction.set_rollback(True)
+
+
+def seed_universe(stocks: int, held: int, days: int) -> StockPortfolio:
+    """Creates the stocks with their prices, dividends and splits and a portfolio holding some of them."""
+
+    # pylint: disable=too-many-locals
+
+    randomizer = Random(42)
+    owner = User.objects.create_user(  # type: ignore
+        "benchmark", "benchmark@stock-buddy.com"
+    )
+    start = date.today() - timedelta(days=days)
+
+    universe = Stock.objects.bulk_create(
+        [
+            Stock(ticker=f"B{index:06d}", name=f"Stock {index}", sector=Sector.SOFTWARE)
+            for index in range(stocks)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    price_sync = StockPriceSync.objects.create(owner=owner)
+    StockPrice.objects.bulk_create(
+        (
+            StockPrice(
+                ticker=stock,
+                date=start + timedelta(days=day),
+                value=randomizer.uniform(10, 500),
+                sync=price_sync,
+            )
+            for stock in universe
+            for day in range(days)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    dividend_sync = StockDividendSync.objects.create(owner=owner)
+    StockDividend.objects.bulk_create(
+        (
+            StockDividend(
+                ticker=stock,
+                date=start + timedelta(days=day),
+                amount=randomizer.uniform(0.1, 2),
+                sync=dividend_sync,
+            )
+            for stock in universe
+            for day in range(0, days, 90)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    split_sync = StockSplitSync.objects.create(owner=owner)
+    StockSplit.objects.bulk_create(
+        (
+            StockSplit(
+                ticker=stock,
+                date=start + timedelta(days=randomizer.randrange(days)),
+                ratio=randomizer.choice([2.0, 3.0, 4.0]),
+                sync=split_sync,
+            )
+            for stock in universe
+            for _ in range(2)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    portfolio = StockPortfolio.objects.create(name="Benchmark", owner=owner)
+    transactions = StockTransaction.objects.bulk_create(
+        StockTransaction(
+            ticker=stock,
+            amount=randomizer.randint(1, 100),
+            price=randomizer.uniform(10, 500),
+            date=start + timedelta(days=randomizer.randrange(days)),
+            owner=owner,
+            portfolio=portfolio,
+        )
+        for stock in randomizer.sample(universe, held)
+    )
+    # The bulk create skips the signals that keep the current positions in sync.
+    for stock_transaction in transactions:
+        refresh_current_position(portfolio.id, stock_transaction.ticker_id)
+
+    return portfolio
+
+
+def measure(function: Callable, runs: int) -> float:
+    """Returns the best elapsed time of the function in seconds."""
+
+    elapsed = []
+    for _ in range(runs):
+        start = perf_counter()
+        function()
+        elapsed.append(perf_counter() - start)
+
+    return min(elapsed)
@@ -0,0 +1,86 @@
+"""Compares the materialized current positions and position history with a full replay of the portfolios."""
+
+from django.core.management.base import BaseCommand, CommandError
+from src.lib.services.positions import (
+    get_current_positions,
+    get_position_history,
+    save_current_position,
+    save_position_history,
+)
+from src.lib.services.stocks import replay_current_positions
+from src.stocks.models import StockPortfolio
+
+
+class Command(BaseCommand):
+    """Custom command to check the stored positions and position history of the portfolios against a full replay."""
+
+    help = "Check the stored positions and position history against a full replay and optionally repair them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "portfolios",
+            nargs="*",
+            type=int,
+            help="Portfolios to check, all portfolios by default.",
+        )
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Store the replayed positions in place of the inconsistent ones.",
+        )
+
+    def handle(self, *args, **kwargs):
+        portfolios = StockPortfolio.objects.order_by("id")
+        if kwargs["portfolios"]:
+            portfolios = portfolios.filter(id__in=kwargs["portfolios"])
+
+        self.stdout.write(ending="\n")
+        inconsistent = 0
+        for portfolio in portfolios:
+            stored = get_current_positions(portfolio)
+            stored_history = get_position_history(portfolio)
+            try:
+                replayed, timeline = replay_current_positions(portfolio)
+            except Exception as error:  # pylint: disable=broad-except
+                self.stdout.write(
+                    f"{portfolio.id}: the portfolio can't be replayed: {error}",
+                    ending="\n",
+                )
+                inconsistent += 1
+
+                continue
+
+            for ticker in sorted(stored.keys() | replayed.keys()):
+                if stored.get(ticker) == replayed.get(ticker):
+                    continue
+
+                self.stdout.write(
+                    f"{portfolio.id} - {ticker}: stored {stored.get(ticker)}, replayed {replayed.get(ticker)}.",
+                    ending="\n",
+                )
+                inconsistent += 1
+
+                if kwargs["repair"]:
+                    save_current_position(portfolio.id, ticker, replayed.get(ticker))
+
+            for ticker in sorted(stored_history.keys() | set(timeline.tickers)):
+                periods = timeline.periods(ticker)
+                if stored_history.get(ticker, []) == periods:
+                    continue
+
+                self.stdout.write(
+                    f"{portfolio.id} - {ticker}: stored history {stored_history.get(ticker, [])}, replayed {periods}.",
+                    ending="\n",
+                )
+                inconsistent += 1
+
+                if kwargs["repair"]:
+                    save_position_history(portfolio.id, ticker, periods)
+
+        self.stdout.write(ending="\n")
+        if inconsistent and not kwargs["repair"]:
+            raise CommandError(f"Found {inconsistent} inconsistent position(s).")
+
+        self.stdout.write(
+            f"Found {inconsistent} inconsistent position(s).", ending="\n\n"
+        )
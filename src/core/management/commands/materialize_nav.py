@@ -0,0 +1,54 @@
+"""Materializes the daily net asset value of the portfolios."""
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from src.lib.services.nav import materialize_nav
+from src.lib.services.performance_cache import invalidate_performance
+from src.stocks.models import StockPortfolio
+
+
+class Command(BaseCommand):
+    """
+    Custom command to store the daily NAV of the portfolios after their last materialized day.
+
+    It is meant to run nightly, the days until yesterday are materialized by default.
+    """
+
+    help = "Store the daily NAV of the portfolios from their last materialized day."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "portfolios",
+            nargs="*",
+            type=int,
+            help="Portfolios to materialize, all portfolios by default.",
+        )
+        parser.add_argument(
+            "--until",
+            type=date.fromisoformat,
+            default=date.today() - timedelta(days=1),
+            help="Last day to materialize in YYYY-MM-DD format, yesterday by default.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Remove the materialized days and store every day again.",
+        )
+
+    def handle(self, *args, **kwargs):
+        portfolios = StockPortfolio.objects.order_by("id")
+        if kwargs["portfolios"]:
+            portfolios = portfolios.filter(id__in=kwargs["portfolios"])
+
+        self.stdout.write(ending="\n")
+        for portfolio in portfolios:
+            with transaction.atomic():
+                if kwargs["rebuild"]:
+                    invalidate_performance([portfolio.id], date.min)
+
+                written = materialize_nav(portfolio, kwargs["until"])
+
+            self.stdout.write(f"{portfolio.id}: {written} day(s) stored.", ending="\n")
+        self.stdout.write(ending="\n")
@@ -65,3 +65,4 @@ def create_schemas():
         cursor.execute(sql.SQL("CREATE SCHEMA stocks"))
         cursor.execute(sql.SQL("CREATE SCHEMA transactions"))
         cursor.execute(sql.SQL("CREATE SCHEMA dashboard"))
+        cursor.execute(sql.SQL("CREATE SCHEMA performance"))
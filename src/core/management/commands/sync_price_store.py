@@ -0,0 +1,33 @@
+"""Synchronizes the on-disk price store with the database."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from src.lib.services.prices import write_price_history
+from src.stocks.models import Stock
+
+
+class Command(BaseCommand):
+    """Custom command to write the price history of the stocks to the on-disk price store."""
+
+    help = "Append the new prices of the stocks to the price store or rebuild it."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "tickers", nargs="*", help="Stocks to synchronize, all stocks by default."
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Rewrite the whole history instead of appending the new prices.",
+        )
+
+    def handle(self, *args, **kwargs):
+        if not settings.PRICE_STORE_PATH:
+            raise CommandError("The PRICE_STORE_PATH setting is not configured.")
+
+        tickers = kwargs["tickers"] or Stock.objects.values_list("ticker", flat=True)
+
+        self.stdout.write(ending="\n")
+        for ticker in tickers:
+            written = write_price_history(ticker, rebuild=kwargs["rebuild"])
+            self.stdout.write(f"{ticker}: {written} price(s) written.", ending="\n")
@@ -14,12 +14,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from ..lib.enums import Visibility
-from ..lib.services.cash import (
-    balance_to_usd,
-    get_invested_capital_snapshot,
-    get_portfolio_cash_balance_snapshot,
-)
-from ..lib.services.stocks import get_first_transaction, get_portfolio_snapshot
+from ..lib.services.cash import balance_to_usd
+from ..lib.services.dashboard import get_portfolio_summary
 from ..stocks.models import StockPortfolio
 from .models import Strategy, StrategyItem, UserStrategy
 from .serializers import StrategySerializer
@@ -64,11 +60,10 @@ class StrategyView(
         if not user_portfolios:
             raise NotFound("The user has no stock portfolios.")
 
-        summary = get_portfolio_snapshot(user_portfolios, date.today())
-        balance = get_portfolio_cash_balance_snapshot(portfolios=user_portfolios)
-        balance_in_usd = balance_to_usd(balance)
+        summary = get_portfolio_summary(user_portfolios, date.today())
+        balance_in_usd = balance_to_usd(summary.cash_balance, date.today())
 
-        aum = summary.assets_under_management
+        aum = summary.portfolio.assets_under_management
         cash_percentage = balance_in_usd / aum if aum else 0
         stocks_percentage = 1 - cash_percentage
 
@@ -201,19 +196,19 @@ class PortfolioIndicatorView(APIView):
             len(user_portfolios),
             self.request.user,
         )
-        summary = get_portfolio_snapshot(user_portfolios, date.today())
-        invested_capital = get_invested_capital_snapshot(portfolios=user_portfolios)
-        capital = balance_to_usd(invested_capital)
+        summary = get_portfolio_summary(user_portfolios, date.today())
+        capital = balance_to_usd(summary.invested_capital, date.today())
 
         LOGGER.debug("Calculating portfolio indicators for %s.", self.request.user)
-        aum = summary.assets_under_management
+        aum = summary.portfolio.assets_under_management
         pnl = aum - capital
         roic = pnl / capital if capital else 0
 
         # This is not perfectly correct
-        first_transaction = get_first_transaction(user_portfolios)
         inception_year = (
-            first_transaction.date.year if first_transaction else date.today().year
+            summary.first_transaction_date.year
+            if summary.first_transaction_date
+            else date.today().year
         )
         current_year = datetime.now().year
 
@@ -226,17 +221,19 @@ class PortfolioIndicatorView(APIView):
         return Response(
             {
                 "largest_position_exposure": max(
-                    position for position in summary.size_distribution.values()
+                    position
+                    for position in summary.portfolio.size_distribution.values()
                 ),
                 "largest_sector_exposure": max(
-                    sector for sector in summary.sector_distribution.values()
+                    sector for sector in summary.portfolio.sector_distribution.values()
                 ),
                 "total_aum": aum,
                 "total_invested_capital": capital,
                 "total_floating_pnl": pnl,
                 "roic_since_inception": roic,
                 "annualized_roic": annualized_roic,
-                "annual_dividend_income": summary.dividend,
+                "annual_dividend_income": summary.portfolio.dividend,
+                "total_dividend_income": summary.dividend_income,
             }
         )
 
@@ -2,16 +2,18 @@
 
 from __future__ import annotations
 
+from bisect import bisect_right
 from dataclasses import dataclass
 from datetime import date
-from typing import Dict
+from typing import Dict, Iterator, Mapping, Optional
 
+import numpy as np
 from django.contrib.auth.models import User
 
 from ..stocks.models import Stock
 from ..transactions.enums import Currency
 from .protocols import DateBound
-from .services.finance import rri
+from .services.returns import rri
 
 
 @dataclass(frozen=True)
@@ -27,7 +29,8 @@ class StockPositionSnapshot:
     """Represents a position at a given time."""
 
     stock: Stock
-    shares: int
+    # The transaction amounts are stored as floats, the shares are only truncated by the splits.
+    shares: float
     # Current price of one stock in USD.
     price: float
     # Current dividend of one stock for a full year in USD (forward looking).
@@ -218,14 +221,55 @@ class StockPortfolioSnapshot(DateBound):
         (e.g.: 0.12 means 12%).
         """
 
-        mapping = {}
-        for position in self.positions.values():
-            periods = round((self.date - position.first_purchase_date).days / 365, 1)
-            mapping[position.stock.ticker] = rri(
-                periods, position.size_at_cost, position.size
-            )
+        positions = list(self.positions.values())
+        rates = rri(
+            [
+                round((self.date - position.first_purchase_date).days / 365, 1)
+                for position in positions
+            ],
+            [position.size_at_cost for position in positions],
+            [position.size for position in positions],
+        )
+
+        return {
+            position.stock.ticker: rate
+            for position, rate in zip(positions, np.atleast_1d(rates).tolist())
+        }
+
+
+class SnapshotSeries(Mapping[date, StockPortfolioSnapshot]):
+    """
+    Portfolio snapshots ordered by their date.
+
+    The latest snapshot at or before a date is looked up with a binary search.
+    """
 
-        return mapping
+    # The mapping protocol methods are documented by the base class.
+    # pylint: disable=missing-function-docstring
+
+    __slots__ = ("_dates", "_snapshots")
+
+    def __init__(
+        self, snapshots: Optional[Mapping[date, StockPortfolioSnapshot]] = None
+    ):
+        self._snapshots = dict(sorted((snapshots or {}).items()))
+        self._dates = list(self._snapshots)
+
+    def __getitem__(self, key: date) -> StockPortfolioSnapshot:
+        return self._snapshots[key]
+
+    def __iter__(self) -> Iterator[date]:
+        return iter(self._dates)
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def latest(self, target_date: date) -> Optional[StockPortfolioSnapshot]:
+        """Returns the latest snapshot taken at or before the target date."""
+
+        index = bisect_right(self._dates, target_date)
+
+        return self._snapshots[self._dates[index - 1]] if index else None
 
 
 @dataclass
@@ -276,6 +320,19 @@ class CashBalanceSnapshot:
             raise Exception("Not a valid currency.")
 
 
+@dataclass
+class PortfolioSummary:
+    """Represents the main indicators of a set of portfolios at a given time."""
+
+    # Valuated positions of the portfolios.
+    portfolio: StockPortfolioSnapshot
+    cash_balance: CashBalanceSnapshot
+    invested_capital: CashBalanceSnapshot
+    # Dividends paid by the positions since the inception in USD.
+    dividend_income: float
+    first_transaction_date: Optional[date]
+
+
 @dataclass
 class PerformanceSnapshot:
     """Represents a performance snapshot of a security position or a portfolio."""
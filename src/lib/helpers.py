@@ -7,7 +7,7 @@ from dateutil import parser
 from rest_framework.exceptions import ParseError
 from rest_framework.request import Request
 
-from .dataclasses import Interval, StockPortfolioSnapshot
+from .dataclasses import Interval
 
 
 def parse_date_query_param(
@@ -33,23 +33,6 @@ def parse_date_query_param(
         raise ParseError(f"Invalid date in {param_name} query param") from error
 
 
-def get_latest_snapshot(
-    target_date: date, snapshots: dict[date, StockPortfolioSnapshot]
-) -> Optional[StockPortfolioSnapshot]:
-    """Returns latest snapshot from a series that was taken before the target date."""
-
-    sorted_snapshots = sorted(
-        (
-            (date, snapshot)
-            for date, snapshot in snapshots.items()
-            if date <= target_date
-        ),
-        key=lambda x: x[0],
-    )
-
-    return sorted_snapshots[0][1] if sorted_snapshots else None
-
-
 def get_range(request: Request) -> Interval:
     """Parses the range query params or add fallback to an interval."""
 
@@ -67,3 +50,26 @@ def get_range(request: Request) -> Interval:
         start_date=start_date,
         end_date=end_date,
     )
+
+
+def get_points(request: Request) -> Optional[int]:
+    """
+    Parses the points query param, the maximum number of snapshots in a timeseries.
+
+    Throws 400 if it is not an integer of at least 2.
+    """
+
+    query_param = request.query_params.get("points", None)
+
+    if not query_param:
+        return None
+
+    try:
+        points = int(query_param)
+    except ValueError as error:
+        raise ParseError("Invalid integer in points query param") from error
+
+    if points < 2:
+        raise ParseError("The points query param must be at least 2")
+
+    return points
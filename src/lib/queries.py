@@ -33,7 +33,7 @@ def sum_cash_transactions(portfolios: list[StockPortfolio], snapshot_date: date)
         WHERE
             portfolio_id IN %(portfolio_ids)s
             AND date <= %(as_of)s
-        UNION
+        UNION ALL
         SELECT
             SUM(amount) FILTER(WHERE currency = 'USD') AS usd,
             SUM(amount) FILTER(WHERE currency = 'EUR') AS eur,
@@ -43,7 +43,7 @@ def sum_cash_transactions(portfolios: list[StockPortfolio], snapshot_date: date)
         WHERE
             portfolio_id IN %(portfolio_ids)s
             AND date <= %(as_of)s
-        UNION
+        UNION ALL
         SELECT
             COALESCE(SUM(ratio * amount) FILTER(WHERE target_currency = 'USD'), 0)
             - COALESCE(SUM(amount) FILTER(WHERE source_currency = 'USD'), 0) AS usd,
@@ -63,6 +63,144 @@ def sum_cash_transactions(portfolios: list[StockPortfolio], snapshot_date: date)
     return cursor.fetchone()
 
 
+def sum_cash_balance_series(portfolios: list[StockPortfolio], series: list[date]):
+    """
+    Calculate the running cash balance of the given portfolios at each date of the series in a single query.
+
+    The daily flows of the cash, forex and stock transactions and the dividends paid on the shares
+    in the position history are summed with a window, then each date takes the latest running sum.
+    """
+
+    params = {
+        "portfolio_ids": tuple(portfolio.id for portfolio in portfolios)  # type: ignore
+        if portfolios
+        else (None,),
+        "series": sorted(series),
+        "as_of": max(series, default=date.min),
+    }
+
+    cursor = connection.cursor()
+
+    cursor.execute(
+        """
+        WITH flows AS (
+            SELECT
+                date, -1 * amount * price AS usd, 0 AS eur, 0 AS huf
+            FROM
+                transactions.stock_transaction
+            WHERE
+                portfolio_id IN %(portfolio_ids)s
+                AND date <= %(as_of)s
+            UNION ALL
+            SELECT
+                date,
+                CASE WHEN currency = 'USD' THEN amount ELSE 0 END AS usd,
+                CASE WHEN currency = 'EUR' THEN amount ELSE 0 END AS eur,
+                CASE WHEN currency = 'HUF' THEN amount ELSE 0 END AS huf
+            FROM
+                transactions.cash_transaction
+            WHERE
+                portfolio_id IN %(portfolio_ids)s
+                AND date <= %(as_of)s
+            UNION ALL
+            SELECT
+                date,
+                CASE WHEN target_currency = 'USD' THEN ratio * amount ELSE 0 END
+                - CASE WHEN source_currency = 'USD' THEN amount ELSE 0 END AS usd,
+                CASE WHEN target_currency = 'EUR' THEN ratio * amount ELSE 0 END
+                - CASE WHEN source_currency = 'EUR' THEN amount ELSE 0 END AS eur,
+                CASE WHEN target_currency = 'HUF' THEN ratio * amount ELSE 0 END
+                - CASE WHEN source_currency = 'HUF' THEN amount ELSE 0 END AS huf
+            FROM
+                transactions.forex_transaction
+            WHERE
+                portfolio_id IN %(portfolio_ids)s
+                AND date <= %(as_of)s
+            UNION ALL
+            SELECT
+                dividend.date, dividend.amount * history.shares AS usd, 0 AS eur, 0 AS huf
+            FROM
+                stocks.position_history AS history
+                INNER JOIN raw_data.stock_dividend AS dividend
+                    ON dividend.ticker_id = history.ticker_id
+                    AND daterange(history.valid_from, history.valid_to) @> dividend.date
+            WHERE
+                history.portfolio_id IN %(portfolio_ids)s
+                AND dividend.date <= %(as_of)s
+        ), balances AS (
+            SELECT
+                date,
+                SUM(SUM(usd)) OVER (ORDER BY date) AS usd,
+                SUM(SUM(eur)) OVER (ORDER BY date) AS eur,
+                SUM(SUM(huf)) OVER (ORDER BY date) AS huf
+            FROM
+                flows
+            GROUP BY
+                date
+        )
+        SELECT
+            snapshot.date,
+            COALESCE(balance.usd, 0),
+            COALESCE(balance.eur, 0),
+            COALESCE(balance.huf, 0)
+        FROM
+            UNNEST(%(series)s::date[]) AS snapshot(date)
+            LEFT JOIN LATERAL (
+                SELECT
+                    usd, eur, huf
+                FROM
+                    balances
+                WHERE
+                    balances.date <= snapshot.date
+                ORDER BY
+                    balances.date DESC
+                LIMIT 1
+            ) AS balance ON TRUE
+        ORDER BY
+            snapshot.date;
+        """,
+        params=params,  # type: ignore
+    )
+
+    return cursor.fetchall()
+
+
+def sum_dividend_payouts(
+    portfolios: list[StockPortfolio], snapshot_date: date
+) -> float:
+    """
+    Calculate the dividends paid to the given portfolios up until the snapshot date
+    by joining each dividend on the shares held at its date in the position history.
+    """
+
+    params = {
+        "portfolio_ids": tuple(portfolio.id for portfolio in portfolios)  # type: ignore
+        if portfolios
+        else (None,),
+        "as_of": snapshot_date,
+    }
+
+    cursor = connection.cursor()
+
+    cursor.execute(
+        """
+        SELECT
+            COALESCE(SUM(dividend.amount * history.shares), 0)
+        FROM
+            stocks.position_history AS history
+            INNER JOIN raw_data.stock_dividend AS dividend
+                ON dividend.ticker_id = history.ticker_id
+                AND daterange(history.valid_from, history.valid_to) @> dividend.date
+        WHERE
+            history.portfolio_id IN %(portfolio_ids)s
+            AND dividend.date <= %(as_of)s;
+        """,
+        params=params,  # type: ignore
+    )
+
+    return cursor.fetchone()[0]
+
+
 def fetch_watchlist_tree(watchlist_id: int):
     """
     Calculate a full details tree for a watchlist containing each child.
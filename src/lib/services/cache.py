@@ -0,0 +1,124 @@
+"""Service for the in-process caching related operations and their shared data versions."""
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Callable, Generic, Hashable, Iterable, Optional, TypeVar
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Bounded cache that evicts the least recently used entry and expires the entries after a time to live.
+
+    The size and the time to live (in seconds) are read from the given settings on every access,
+    so they could be overridden at runtime. A size of zero disables the cache.
+    """
+
+    def __init__(self, size_setting: str, ttl_setting: str):
+        # pylint: disable=missing-function-docstring
+
+        self.__size_setting = size_setting
+        self.__ttl_setting = ttl_setting
+        # The entries are ordered from the least to the most recently used.
+        self.__entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.__lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> Optional[V]:
+        """Returns the value cached for the key or None if it is missing or expired."""
+
+        if getattr(settings, self.__size_setting) <= 0:
+            return None
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is None or entry[0] <= monotonic():
+                self.__entries.pop(key, None)
+                self.misses += 1
+
+                return None
+
+            self.__entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        """Caches the value for the key and evicts the least recently used entries over the size."""
+
+        size = getattr(settings, self.__size_setting)
+        if size <= 0:
+            return
+
+        with self.__lock:
+            expires_at = monotonic() + getattr(settings, self.__ttl_setting)
+            self.__entries[key] = (expires_at, value)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > size:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[K], bool]) -> None:
+        """Removes every entry whose key matches the predicate."""
+
+        with self.__lock:
+            for key in [key for key in self.__entries if predicate(key)]:
+                del self.__entries[key]
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters."""
+
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        # pylint: disable=missing-function-docstring
+
+        return len(self.__entries)
+
+
+def get_shared_versions(namespace: str, keys: Iterable[str]) -> dict[str, str]:
+    """
+    Returns the data version of each key that is shared by the processes through the Django cache.
+
+    The in-process caches compare their entries to these versions, so the changes made by another
+    process are not served from them. A new random version is used when a key has none,
+    so an evicted version is never reused.
+    """
+
+    cache = caches[settings.SHARED_VERSION_CACHE]
+    version_keys = {key: f"{namespace}-version:{key}" for key in keys}
+    stored = cache.get_many(list(version_keys.values()))
+
+    versions = {}
+    for key, version_key in version_keys.items():
+        version = stored.get(version_key)
+        if version is None:
+            version = uuid4().hex
+            # The version of a concurrent process is kept if it was added first.
+            if not cache.add(version_key, version, timeout=None):
+                version = cache.get(version_key, version)
+
+        versions[key] = version
+
+    return versions
+
+
+def bump_shared_versions(namespace: str, keys: Iterable[str]) -> None:
+    """Drops the shared data version of the keys, so the in-process caches of every process reload them."""
+
+    caches[settings.SHARED_VERSION_CACHE].delete_many(
+        [f"{namespace}-version:{key}" for key in keys]
+    )
@@ -1,73 +1,38 @@
 """Service functions for cash and balance related operations."""
 
 
-from copy import deepcopy
+from copy import copy
 from datetime import date
 from logging import getLogger
-from os import getenv
-from typing import cast
+from typing import Iterable, NamedTuple, Optional, cast
 
-from ...raw_data.models import StockDividend, StockSplit
 from ...stocks.models import StockPortfolio
 from ...transactions.enums import Currency
-from ...transactions.models import CashTransaction, StockTransaction
-from ..dataclasses import CashBalanceSnapshot, StockPortfolioSnapshot
-from ..queries import sum_cash_transactions
-from .replay import generate_snapshot_series
-from .stocks import (
-    get_all_stocks_since_inceptions,
-    get_first_transaction,
-    get_portfolio,
+from ...transactions.models import CashTransaction
+from ..dataclasses import CashBalanceSnapshot
+from ..queries import (
+    sum_cash_balance_series,
+    sum_cash_transactions,
+    sum_dividend_payouts,
 )
+from .events import CashEvent, ForexEvent, TransactionEvent, stream_events
+from .forex import get_forex_rates
+from .replay import generate_snapshot_series
 
 LOGGER = getLogger(__name__)
 
 
-def get_portfolio_cash_balance(
-    payouts: list[StockDividend],
-    series: list[date],
-    initial: CashBalanceSnapshot,
-    portfolio_snapshots: dict[date, StockPortfolioSnapshot],
-) -> dict[date, CashBalanceSnapshot]:
-    """Creates a timeseries from the portfolio cash balance at each date in the series."""
-
-    LOGGER.debug(
-        "Generate series for %s transaction(s) at %s snapshot date(s).",
-        len(payouts),
-        len(series),
-    )
-
-    def add_dividend_payout(
-        snapshot: CashBalanceSnapshot, payout: StockDividend
-    ) -> CashBalanceSnapshot:
-        portfolio_snapshot = portfolio_snapshots[payout.date]
-        position = portfolio_snapshot.positions.get(payout.ticker.ticker, None)
-
-        if position:
-            snapshot.USD += payout.amount * position.shares
-
-        return snapshot
-
-    def take_snapshot(
-        snapshot: CashBalanceSnapshot, snapshot_date: date
-    ) -> CashBalanceSnapshot:
-        # pylint: disable=unused-argument
-
-        return deepcopy(snapshot)
+class CashFlow(NamedTuple):
+    """Cash moved in (positive) or out (negative) of a portfolio on a given date in USD."""
 
-    return generate_snapshot_series(
-        initial=initial,
-        actions=payouts,
-        series=series,
-        operation=add_dividend_payout,
-        take_snapshot=take_snapshot,
-    )
+    date: date
+    amount: float
 
 
 def get_portfolio_cash_balance_snapshot(
     portfolios: list[StockPortfolio], snapshot_date: date = date.today()
 ) -> CashBalanceSnapshot:
-    """Returns the cash balance of the portfolio at a given time."""
+    """Returns the cash balance of the portfolio at a given time including the dividend payouts."""
 
     LOGGER.debug(
         "Calculate cash balance for %s portfolio at %s.",
@@ -82,40 +47,34 @@ def get_portfolio_cash_balance_snapshot(
     balance.EUR = eur or 0
     balance.HUF = huf or 0
 
-    owned_stocks = get_all_stocks_since_inceptions(portfolios, snapshot_date)
-    first_transaction = get_first_transaction(portfolios)
-    dividend_payouts = cast(
-        list[StockDividend],
-        (
-            StockDividend.objects.filter(
-                ticker__in=owned_stocks,
-                date__lte=snapshot_date,
-                date__gte=first_transaction.date,
-            )
-            if first_transaction
-            else []
-        ),
-    )
+    # The dividends are paid on the shares held at their date in the position history.
+    balance.USD += sum_dividend_payouts(portfolios, snapshot_date)
+
+    return balance
+
+
+def get_cash_balance_series(
+    portfolios: list[StockPortfolio], series: list[date]
+) -> dict[date, CashBalanceSnapshot]:
+    """Returns the cash balance of the portfolios including the dividend payouts at each date in the series."""
 
-    transactions = StockTransaction.objects.filter(
-        portfolio__in=portfolios, date__lte=snapshot_date
+    LOGGER.debug(
+        "Calculate cash balance for %s portfolio at %s snapshot date(s).",
+        len(portfolios),
+        len(series),
     )
-    splits = StockSplit.objects.filter(date__lte=snapshot_date)
-    actions = sorted([*transactions, *splits], key=lambda x: x.date)
-    snapshot_dates = list({dividend.date for dividend in dividend_payouts})
-    owner = portfolios[0].owner if portfolios else None
-    portfolio_snapshots = get_portfolio(actions, snapshot_dates, owner)
 
-    return get_portfolio_cash_balance(
-        payouts=dividend_payouts,
-        series=[snapshot_date],
-        initial=balance,
-        portfolio_snapshots=portfolio_snapshots,
-    )[snapshot_date]
+    if not series:
+        return {}
+
+    return {
+        snapshot_date: CashBalanceSnapshot(USD=usd, EUR=eur, HUF=huf)
+        for snapshot_date, usd, eur, huf in sum_cash_balance_series(portfolios, series)
+    }
 
 
 def get_invested_capital(
-    transactions: list[CashTransaction], series: list[date]
+    transactions: list[CashEvent], series: list[date]
 ) -> dict[date, CashBalanceSnapshot]:
     """Creates a timeseries from the current invested capital at each date in the series."""
 
@@ -126,7 +85,7 @@ def get_invested_capital(
     )
 
     def sum_cash_balance(
-        snapshot: CashBalanceSnapshot, transaction: CashTransaction
+        snapshot: CashBalanceSnapshot, transaction: CashEvent
     ) -> CashBalanceSnapshot:
         snapshot[transaction.currency] += transaction.amount
 
@@ -137,7 +96,7 @@ def get_invested_capital(
     ) -> CashBalanceSnapshot:
         # pylint: disable=unused-argument
 
-        return deepcopy(snapshot)
+        return copy(snapshot)
 
     return generate_snapshot_series(
         initial=CashBalanceSnapshot(),
@@ -160,55 +119,75 @@ def get_invested_capital_snapshot(
     )
 
     cash_transactions = cast(
-        list[CashTransaction],
-        CashTransaction.objects.filter(
-            portfolio__in=portfolios,
-            date__lte=snapshot_date,
+        list[CashEvent],
+        list(
+            stream_events(
+                CashTransaction.objects.filter(
+                    portfolio__in=portfolios,
+                    date__lte=snapshot_date,
+                )
+            )
         ),
     )
 
     return get_invested_capital(cash_transactions, [snapshot_date])[snapshot_date]
 
 
-def balance_to_usd(balance: CashBalanceSnapshot) -> float:
-    """Converts each item in the cash balance to USD."""
+def add_cash_action(
+    balance: CashBalanceSnapshot,
+    action: CashEvent | ForexEvent | TransactionEvent,
+) -> CashBalanceSnapshot:
+    """
+    Applies a single transaction on the cash balance.
+
+    Cash transactions are inflows, forex transactions are exchanges and stock transactions are outflows in USD.
+    """
+
+    if isinstance(action, CashEvent):
+        balance[action.currency] += float(action.amount)
+    elif isinstance(action, ForexEvent):
+        balance[action.source_currency] -= float(action.amount)
+        balance[action.target_currency] += float(action.ratio * action.amount)
+    elif isinstance(action, TransactionEvent):
+        balance.USD -= action.amount * action.price
+    else:
+        raise Exception("Unknown action type.")
 
-    huf_usd_fx = 1 / float(cast(str, getenv("USD_HUF_FX_RATE")))
-    eur_usd_fx = float(cast(str, getenv("EUR_USD_FX_RATE")))
+    return balance
 
-    return balance.USD + balance.EUR * eur_usd_fx + balance.HUF * huf_usd_fx
 
+def balance_to_usd(
+    balance: CashBalanceSnapshot, snapshot_date: Optional[date] = None
+) -> float:
+    """Converts each item in the cash balance to USD with the forex rates at the snapshot date (today by default)."""
 
-def transaction_to_usd(transaction: CashTransaction) -> CashTransaction:
-    """Converts a general transaction to a USD based transaction."""
+    rates = get_forex_rates()
+    snapshot_date = snapshot_date or date.today()
+
+    return (
+        balance.USD
+        + balance.EUR * rates.rate(Currency.EURO, snapshot_date)
+        + balance.HUF * rates.rate(Currency.HUNGARIAN_FORINT, snapshot_date)
+    )
 
-    if transaction.currency == Currency.US_DOLLAR:
-        return transaction
 
-    if transaction.currency == Currency.EURO:
-        eur_usd_fx = float(cast(str, getenv("EUR_USD_FX_RATE")))
+def convert_cash_flows(
+    transactions: Iterable[tuple[date, str, float]]
+) -> list[CashFlow]:
+    """
+    Converts the cash transactions given as (date, currency, amount) rows to USD flows.
 
-        return CashTransaction(
-            date=transaction.date,
-            owner=transaction.owner,
-            portfolio=transaction.portfolio,
-            created_at=transaction.created_at,
-            updated_at=transaction.updated_at,
-            currency=Currency.US_DOLLAR,
-            amount=transaction.amount * eur_usd_fx,
-        )
+    Every amount is converted with the forex rate at its date, the rows are converted at once.
+    """
 
-    if transaction.currency == Currency.HUNGARIAN_FORINT:
-        huf_usd_fx = 1 / float(cast(str, getenv("USD_HUF_FX_RATE")))
+    rows = list(transactions)
+    if not rows:
+        return []
 
-        return CashTransaction(
-            date=transaction.date,
-            owner=transaction.owner,
-            portfolio=transaction.portfolio,
-            created_at=transaction.created_at,
-            updated_at=transaction.updated_at,
-            currency=Currency.US_DOLLAR,
-            amount=transaction.amount * huf_usd_fx,
-        )
+    dates, currencies, amounts = zip(*rows)
+    converted = get_forex_rates().to_usd(amounts, currencies, dates)
 
-    raise Exception("Unknown currency.")
+    return [
+        CashFlow(date=flow_date, amount=amount)
+        for flow_date, amount in zip(dates, converted.tolist())
+    ]
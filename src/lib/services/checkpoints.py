@@ -0,0 +1,111 @@
+"""Service functions for the portfolio replay checkpoint related operations."""
+
+from datetime import date
+from logging import getLogger
+from typing import Iterable, Optional
+
+from ...stocks.models import Stock, StockPortfolio, StockPortfolioCheckpoint
+from ..dataclasses import StockPortfolioSnapshot, StockPositionSnapshot
+
+LOGGER = getLogger(__name__)
+
+
+def get_latest_checkpoint(
+    portfolios: list[StockPortfolio], snapshot_date: date
+) -> Optional[StockPortfolioCheckpoint]:
+    """Returns the latest checkpoint of the portfolios taken at or before the snapshot date."""
+
+    return (
+        StockPortfolioCheckpoint.objects.filter(
+            portfolios=__get_key(portfolios), date__lte=snapshot_date
+        )
+        .order_by("-date")
+        .first()
+    )
+
+
+def restore_positions(
+    checkpoint: StockPortfolioCheckpoint,
+    stocks: Optional[dict[str, Stock]] = None,
+) -> dict[str, StockPositionSnapshot]:
+    """
+    Creates the positions saved in the checkpoint.
+
+    The price of a restored position is its opening price and it has no dividend info attached.
+    The stocks of the positions are queried unless they are provided.
+    """
+
+    stocks = stocks or Stock.objects.in_bulk(checkpoint.positions.keys())
+
+    return {
+        ticker: StockPositionSnapshot(
+            stock=stocks[ticker],
+            shares=position["shares"],
+            price=position["opening_price"],
+            dividend=0.0,
+            purchase_price=position["purchase_price"],
+            first_purchase_date=date.fromisoformat(position["first_purchase_date"]),
+            latest_purchase_date=date.fromisoformat(position["latest_purchase_date"]),
+        )
+        for ticker, position in checkpoint.positions.items()
+    }
+
+
+def save_checkpoints(
+    portfolios: list[StockPortfolio], snapshots: list[StockPortfolioSnapshot]
+) -> None:
+    """Saves the snapshots replayed without quotes as checkpoints of the portfolios."""
+
+    if not snapshots:
+        return
+
+    LOGGER.debug(
+        "Saving %s checkpoint(s) for %s portfolio(s).", len(snapshots), len(portfolios)
+    )
+
+    key = __get_key(portfolios)
+    StockPortfolioCheckpoint.objects.bulk_create(
+        [
+            StockPortfolioCheckpoint(
+                portfolios=key,
+                date=snapshot.date,
+                positions={
+                    ticker: {
+                        "shares": position.shares,
+                        "opening_price": position.price,
+                        "purchase_price": position.purchase_price,
+                        "first_purchase_date": position.first_purchase_date.isoformat(),
+                        "latest_purchase_date": position.latest_purchase_date.isoformat(),
+                    }
+                    for ticker, position in snapshot.positions.items()
+                },
+            )
+            for snapshot in snapshots
+        ],
+        # A concurrent request could have saved the same checkpoint in the meantime.
+        ignore_conflicts=True,
+    )
+
+
+def invalidate_checkpoints(portfolio_ids: Iterable[int], since: date) -> None:
+    """Removes every checkpoint of the portfolios that was taken at or after the given date."""
+
+    portfolio_ids = list(portfolio_ids)
+    if not portfolio_ids:
+        return
+
+    LOGGER.debug(
+        "Invalidating checkpoints of %s portfolio(s) since %s.",
+        len(portfolio_ids),
+        since,
+    )
+
+    StockPortfolioCheckpoint.objects.filter(
+        portfolios__overlap=portfolio_ids, date__gte=since
+    ).delete()
+
+
+def __get_key(portfolios: list[StockPortfolio]) -> list[int]:
+    """Checkpoints are identified by the sorted list of portfolio ids they were replayed for."""
+
+    return sorted(portfolio.id for portfolio in portfolios)  # type: ignore
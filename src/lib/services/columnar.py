@@ -0,0 +1,445 @@
+"""
+Columnar replay engine for the stock portfolio timeseries.
+
+The actions are loaded into parallel arrays and the state of every ticker is computed
+after each of its actions, so the snapshots could be looked up with a binary search instead
+of replaying the actions with a callback per event. The results match the reference replay
+in the stocks service exactly.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from logging import getLogger
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+from django.contrib.auth.models import User
+
+from ...stocks.models import Stock
+from ..dataclasses import StockPortfolioSnapshot, StockPositionSnapshot
+from .events import SplitEvent, TransactionEvent
+
+LOGGER = getLogger(__name__)
+
+# Integers above this could not be represented exactly by a float.
+MAX_EXACT_INTEGER = 2**53
+
+
+@dataclass
+class ActionColumns:
+    """Stock transactions and splits stored as parallel arrays in the order of the replay."""
+
+    tickers: list[str]
+    # Index of the ticker in the tickers list for each action.
+    ticker_index: np.ndarray
+    # Date of each action as a proleptic Gregorian ordinal.
+    dates: np.ndarray
+    # Shares transacted, zero for the splits.
+    amounts: np.ndarray
+    # Price of one share in USD, zero for the splits.
+    prices: np.ndarray
+    # Ratio of the splits, one for the transactions.
+    ratios: np.ndarray
+    is_split: np.ndarray
+
+
+@dataclass
+class _Timeline:
+    """State of a single position after each of its actions."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    ticker: str
+    # Index of the ticker's actions in the columns.
+    rows: np.ndarray
+    held: list[bool] = field(default_factory=list)
+    shares: list = field(default_factory=list)
+    purchase_prices: list[float] = field(default_factory=list)
+    dividends: list[float] = field(default_factory=list)
+    first_purchase_dates: list[int] = field(default_factory=list)
+    latest_purchase_dates: list[int] = field(default_factory=list)
+    # Index of the transaction that opened the position in the columns.
+    opened: list[int] = field(default_factory=list)
+
+
+def load_actions(actions: Iterable[TransactionEvent | SplitEvent]) -> ActionColumns:
+    """Converts a list of stock transactions and splits to columns, keeping their order."""
+
+    tickers: dict[str, int] = {}
+    ticker_index, dates, prices, ratios, is_split = [], [], [], [], []
+    amounts: list[float] = []
+
+    for action in actions:
+        ticker_index.append(tickers.setdefault(action.ticker_id, len(tickers)))
+        dates.append(action.date.toordinal())
+
+        if isinstance(action, SplitEvent):
+            amounts.append(0)
+            prices.append(0.0)
+            ratios.append(action.ratio)
+            is_split.append(True)
+        else:
+            amounts.append(action.amount)
+            prices.append(action.price)
+            ratios.append(1.0)
+            is_split.append(False)
+
+    return ActionColumns(
+        tickers=list(tickers),
+        ticker_index=np.array(ticker_index, dtype=np.int64),
+        dates=np.array(dates, dtype=np.int64),
+        # The amounts keep the integer type if every amount was provided as an integer.
+        amounts=np.array(amounts) if amounts else np.array([], dtype=np.int64),
+        prices=np.array(prices, dtype=np.float64),
+        ratios=np.array(ratios, dtype=np.float64),
+        is_split=np.array(is_split, dtype=bool),
+    )
+
+
+def replay_portfolio(
+    columns: ActionColumns,
+    series: list[date],
+    owner: User,
+    get_quote: Callable[[str], tuple[Optional[float], float]],
+) -> dict[date, StockPortfolioSnapshot]:
+    """
+    Creates a timeseries from the portfolio at each date in the series.
+
+    Like the reference replay, the snapshot is taken before the first action after the snapshot date,
+    so the actions are expected to be ordered by date.
+    """
+
+    # pylint: disable=too-many-locals
+
+    series = sorted(series)
+    if not series:
+        return {}
+
+    # Number of actions that are applied before each snapshot.
+    running_dates = (
+        np.maximum.accumulate(columns.dates) if len(columns.dates) else columns.dates
+    )
+    applied = np.searchsorted(
+        running_dates,
+        [snapshot_date.toordinal() for snapshot_date in series],
+        side="right",
+    )
+
+    order = np.argsort(columns.ticker_index, kind="stable")
+    bounds = np.searchsorted(
+        columns.ticker_index[order], np.arange(len(columns.tickers) + 1)
+    )
+
+    # Each quote is only queried once even if the position is opened multiple times.
+    quotes: dict[str, tuple[Optional[float], float]] = {}
+
+    def get_cached_quote(ticker: str) -> tuple[Optional[float], float]:
+        if ticker not in quotes:
+            quotes[ticker] = get_quote(ticker)
+
+        return quotes[ticker]
+
+    timelines, sequential = [], 0
+    for index, ticker in enumerate(columns.tickers):
+        first_row, last_row = bounds[index], bounds[index + 1]
+        rows = order[first_row:last_row]
+        timeline = __get_vectorized_timeline(columns, ticker, rows, get_cached_quote)
+
+        if not timeline:
+            sequential += 1
+            timeline = __get_sequential_timeline(
+                columns, ticker, rows, get_cached_quote
+            )
+
+        timelines.append(timeline)
+
+    LOGGER.debug(
+        "Replayed %s ticker(s), %s of them sequentially.", len(timelines), sequential
+    )
+
+    return __take_snapshots(
+        columns, timelines, series, applied, owner, get_cached_quote
+    )
+
+
+def __get_vectorized_timeline(
+    columns: ActionColumns,
+    ticker: str,
+    rows: np.ndarray,
+    get_quote: Callable[[str], tuple[Optional[float], float]],
+) -> Optional[_Timeline]:
+    """
+    Computes the timeline of a position with array operations.
+
+    Returns None if the position is closed after it was opened or it has a split
+    that could not be applied exactly on the cumulative share count.
+    """
+
+    # pylint: disable=too-many-locals
+
+    is_split = columns.is_split[rows]
+    amounts = columns.amounts[rows]
+    timeline = _Timeline(ticker=ticker, rows=rows)
+
+    opening = np.flatnonzero(~is_split & (amounts > 0))
+    if opening.size == 0:
+        # Splits and sells without a position are ignored, so the position is never opened.
+        return __pad_timeline(timeline, len(rows))
+
+    start = int(opening[0])
+    is_split, amounts = is_split[start:], amounts[start:]
+    ratios = columns.ratios[rows[start:]]
+    dates = columns.dates[rows[start:]]
+
+    if is_split.any():
+        # The shares are truncated after a split, that is only exact on the cumulative sum
+        # for integer ratios and share counts.
+        if (
+            (ratios < 1).any()
+            or (ratios != np.floor(ratios)).any()
+            or (amounts != np.floor(amounts)).any()
+            or float(np.prod(ratios)) * float(np.abs(amounts).sum())
+            >= MAX_EXACT_INTEGER
+        ):
+            return None
+
+        # Each transaction is multiplied by the splits that come after it.
+        factors = ratios.astype(np.int64)
+        later_factors = np.append(np.cumprod(factors[::-1])[::-1][1:], 1)
+        shares = (
+            np.cumsum(amounts.astype(np.int64) * later_factors) // later_factors
+        ).astype(amounts.dtype)
+    else:
+        shares = np.cumsum(amounts)
+
+    # Closing a position resets it, so those are replayed sequentially.
+    if (shares <= 0).any():
+        return None
+
+    _, latest_dividend = get_quote(ticker)
+
+    # The average price is rounded after each purchase, so it is carried through the purchases and splits.
+    purchase_prices = __get_purchase_prices(
+        is_split,
+        amounts.tolist(),
+        columns.prices[rows[start:]].tolist(),
+        ratios.tolist(),
+        shares.tolist(),
+    )
+
+    # The dividend info is divided by each split in order and carried forward until the next split.
+    split_rows = np.flatnonzero(is_split)
+    adjusted_dividends = np.divide.accumulate(
+        np.concatenate([[latest_dividend * 4], ratios[split_rows]])
+    )
+    dividends = adjusted_dividends[
+        np.searchsorted(split_rows, np.arange(len(is_split)), side="right")
+    ]
+
+    first_purchase_dates = np.minimum.accumulate(
+        np.where(is_split, np.iinfo(np.int64).max, dates)
+    )
+    latest_purchase_dates = np.maximum.accumulate(np.where(is_split, 0, dates))
+
+    timeline.held = [False] * start + [True] * len(is_split)
+    timeline.shares = [0] * start + shares.tolist()
+    timeline.purchase_prices = [0.0] * start + purchase_prices
+    timeline.dividends = [0.0] * start + dividends.tolist()
+    timeline.first_purchase_dates = [0] * start + first_purchase_dates.tolist()
+    timeline.latest_purchase_dates = [0] * start + latest_purchase_dates.tolist()
+    timeline.opened = [-1] * start + [int(rows[start])] * len(is_split)
+
+    return timeline
+
+
+def __get_purchase_prices(
+    is_split: np.ndarray,
+    amounts: list,
+    prices: list[float],
+    ratios: list[float],
+    shares: list,
+) -> list[float]:
+    """Calculates the average purchase price after each action of an open position."""
+
+    # Sells keep the average price, so only the purchases and splits change it.
+    changes = np.flatnonzero(is_split | (np.array(amounts) >= 0))
+    changed_prices = [prices[0]]
+    for current in changes[1:].tolist():
+        purchase_price = changed_prices[-1]
+        if is_split[current]:
+            purchase_price /= ratios[current]
+        else:
+            # Same rounding as the reference replay uses after each purchase.
+            current_shares = shares[current - 1]
+            purchase_price = round(
+                (
+                    round(current_shares * purchase_price, 2)
+                    + amounts[current] * prices[current]
+                )
+                / (current_shares + amounts[current]),
+                2,
+            )
+
+        changed_prices.append(purchase_price)
+
+    # Every action takes the average price after the latest purchase or split up until that point.
+    latest_change = np.searchsorted(changes, np.arange(len(amounts)), side="right") - 1
+
+    return np.array(changed_prices, dtype=np.float64)[latest_change].tolist()
+
+
+def __get_sequential_timeline(
+    columns: ActionColumns,
+    ticker: str,
+    rows: np.ndarray,
+    get_quote: Callable[[str], tuple[Optional[float], float]],
+) -> _Timeline:
+    """Computes the timeline of a position by applying its actions one by one like the reference replay."""
+
+    # pylint: disable=too-many-locals
+
+    timeline = _Timeline(ticker=ticker, rows=rows)
+
+    held, opened = False, -1
+    shares, purchase_price, dividend, first, latest = 0, 0.0, 0.0, 0, 0
+    for row, is_split, amount, price, ratio, action_date in zip(
+        rows.tolist(),
+        columns.is_split[rows].tolist(),
+        columns.amounts[rows].tolist(),
+        columns.prices[rows].tolist(),
+        columns.ratios[rows].tolist(),
+        columns.dates[rows].tolist(),
+    ):
+        if is_split and held:
+            shares = int(shares * ratio)
+            purchase_price /= ratio
+            dividend /= ratio
+        elif not is_split and not held:
+            # In this situation we consider a negative or zero value a spinoff sellout.
+            if amount > 0:
+                held, opened = True, row
+                shares, purchase_price = amount, price
+                dividend = get_quote(ticker)[1] * 4
+                first, latest = action_date, action_date
+        elif not is_split and held:
+            if amount >= 0:
+                purchase_price = round(
+                    (round(shares * purchase_price, 2) + (amount * price))
+                    / (shares + amount),
+                    2,
+                )
+
+            first, latest = min(first, action_date), max(latest, action_date)
+            shares += amount
+
+            if shares == 0:
+                held = False
+            elif shares < 0:
+                raise Exception("Negative position size is not allowed.")
+
+        timeline.held.append(held)
+        timeline.shares.append(shares)
+        timeline.purchase_prices.append(purchase_price)
+        timeline.dividends.append(dividend)
+        timeline.first_purchase_dates.append(first)
+        timeline.latest_purchase_dates.append(latest)
+        timeline.opened.append(opened)
+
+    return timeline
+
+
+def __pad_timeline(timeline: _Timeline, length: int) -> _Timeline:
+    """Fills the timeline of a position that is never opened."""
+
+    timeline.held = [False] * length
+    timeline.shares = [0] * length
+    timeline.purchase_prices = [0.0] * length
+    timeline.dividends = [0.0] * length
+    timeline.first_purchase_dates = [0] * length
+    timeline.latest_purchase_dates = [0] * length
+    timeline.opened = [-1] * length
+
+    return timeline
+
+
+def __take_snapshots(
+    columns: ActionColumns,
+    timelines: list[_Timeline],
+    series: list[date],
+    applied: np.ndarray,
+    owner: User,
+    get_quote: Callable[[str], tuple[Optional[float], float]],
+) -> dict[date, StockPortfolioSnapshot]:
+    """Looks up the state of each position at the snapshot dates."""
+
+    # pylint: disable=too-many-arguments, too-many-locals
+
+    stocks = Stock.objects.in_bulk(
+        [timeline.ticker for timeline in timelines if any(timeline.held)]
+    )
+    # Index of the latest action of each ticker that is applied before each snapshot.
+    states = np.array(
+        [np.searchsorted(timeline.rows, applied) - 1 for timeline in timelines]
+    ).reshape(len(timelines), len(series))
+    changed = np.concatenate(
+        [[True], (states[:, 1:] != states[:, :-1]).any(axis=0)]
+    ).tolist()
+
+    positions: dict[str, StockPositionSnapshot] = {}
+    cache: dict[tuple[int, int], StockPositionSnapshot] = {}
+    snapshots = {}
+    for index, snapshot_date in enumerate(series):
+        if changed[index]:
+            entries = []
+            for ticker_index, timeline in enumerate(timelines):
+                state = int(states[ticker_index, index])
+                if state < 0 or not timeline.held[state]:
+                    continue
+
+                if (ticker_index, state) not in cache:
+                    cache[(ticker_index, state)] = __create_position(
+                        columns, timeline, state, stocks, get_quote
+                    )
+
+                entries.append(
+                    (
+                        timeline.opened[state],
+                        timeline.ticker,
+                        cache[(ticker_index, state)],
+                    )
+                )
+
+            # The positions are ordered by their opening, same as the reference replay inserts them.
+            positions = {
+                ticker: position
+                for _, ticker, position in sorted(entries, key=lambda entry: entry[0])
+            }
+
+        snapshots[snapshot_date] = StockPortfolioSnapshot(
+            positions=positions, date=snapshot_date, owner=owner
+        )
+
+    return snapshots
+
+
+def __create_position(
+    columns: ActionColumns,
+    timeline: _Timeline,
+    state: int,
+    stocks: dict[str, Stock],
+    get_quote: Callable[[str], tuple[Optional[float], float]],
+) -> StockPositionSnapshot:
+    """Helper function to generate a position entity from the state of its timeline."""
+
+    latest_price, _ = get_quote(timeline.ticker)
+    opened = timeline.opened[state]
+
+    return StockPositionSnapshot(
+        stock=stocks[timeline.ticker],
+        shares=timeline.shares[state],
+        price=latest_price or float(columns.prices[opened]),
+        dividend=timeline.dividends[state],
+        purchase_price=timeline.purchase_prices[state],
+        first_purchase_date=date.fromordinal(timeline.first_purchase_dates[state]),
+        latest_purchase_date=date.fromordinal(timeline.latest_purchase_dates[state]),
+    )
@@ -0,0 +1,147 @@
+"""Service functions for the dashboard related operations."""
+
+from copy import copy
+from datetime import date
+from logging import getLogger
+from typing import Optional
+
+from ...raw_data.models import StockSplit
+from ...stocks.models import Stock, StockPortfolio
+from ...transactions.models import CashTransaction, ForexTransaction, StockTransaction
+from ..dataclasses import (
+    CashBalanceSnapshot,
+    PortfolioSummary,
+    StockPortfolioSnapshot,
+    StockPositionSnapshot,
+)
+from ..queries import sum_dividend_payouts
+from .cash import add_cash_action
+from .events import CashEvent, ForexEvent, SplitEvent, TransactionEvent, stream_events
+from .replay import CopyOnWriteMap, FusedReplay, merge_actions
+from .stocks import StockLookup, apply_stock_action, valuate_snapshots
+
+LOGGER = getLogger(__name__)
+
+
+def get_portfolio_summary(
+    portfolios: list[StockPortfolio], snapshot_date: date
+) -> PortfolioSummary:
+    """
+    Calculates the main indicators of the portfolios with a single replay.
+
+    The stock, cash and forex transactions and the splits of the transacted stocks are streamed
+    from the database and merged into one event stream for every reducer. The dividend income
+    is summed by the database from the position history.
+    """
+
+    # pylint: disable=too-many-locals
+
+    LOGGER.debug(
+        "Calculate portfolio summary for %s portfolio at %s.",
+        len(portfolios),
+        snapshot_date,
+    )
+
+    stock_transactions = StockTransaction.objects.filter(
+        portfolio__in=portfolios, date__lte=snapshot_date
+    )
+    actions = merge_actions(
+        stream_events(stock_transactions),
+        stream_events(
+            StockSplit.objects.filter(
+                ticker__in=stock_transactions.values("ticker"),
+                date__lte=snapshot_date,
+            )
+        ),
+        stream_events(
+            CashTransaction.objects.filter(
+                portfolio__in=portfolios, date__lte=snapshot_date
+            )
+        ),
+        stream_events(
+            ForexTransaction.objects.filter(
+                portfolio__in=portfolios, date__lte=snapshot_date
+            )
+        ),
+    )
+    stocks = StockLookup(
+        Stock.objects.filter(ticker__in=stock_transactions.values("ticker"))
+    )
+
+    replay = FusedReplay()
+    positions: CopyOnWriteMap[str, StockPositionSnapshot] = CopyOnWriteMap()
+
+    # The reducers are typed functions, so the type arguments of the replay could be inferred.
+    def apply_position_action(
+        positions: CopyOnWriteMap[str, StockPositionSnapshot],
+        action: TransactionEvent | SplitEvent,
+    ) -> CopyOnWriteMap[str, StockPositionSnapshot]:
+        return apply_stock_action(positions, action, stocks=stocks)
+
+    def snapshot_positions(
+        positions: CopyOnWriteMap[str, StockPositionSnapshot], _: date
+    ) -> dict[str, StockPositionSnapshot]:
+        return positions.snapshot()
+
+    def find_first_date(
+        first_date: Optional[date], transaction: TransactionEvent
+    ) -> Optional[date]:
+        return min(first_date, transaction.date) if first_date else transaction.date
+
+    def snapshot_first_date(first_date: Optional[date], _: date) -> Optional[date]:
+        return first_date
+
+    replay.register(
+        "positions",
+        initial=positions,
+        operation=apply_position_action,
+        take_snapshot=snapshot_positions,
+        accepts=(TransactionEvent, SplitEvent),
+    )
+    replay.register(
+        "cash_balance",
+        initial=CashBalanceSnapshot(),
+        operation=add_cash_action,
+        take_snapshot=lambda balance, _: copy(balance),
+        accepts=(CashEvent, ForexEvent, TransactionEvent),
+    )
+    replay.register(
+        "invested_capital",
+        initial=CashBalanceSnapshot(),
+        operation=add_cash_action,
+        take_snapshot=lambda balance, _: copy(balance),
+        accepts=(CashEvent,),
+    )
+    replay.register(
+        "first_transaction_date",
+        initial=None,
+        operation=find_first_date,
+        take_snapshot=snapshot_first_date,
+        accepts=(TransactionEvent,),
+    )
+
+    snapshots = replay.run(actions, [snapshot_date])
+
+    # The positions are replayed without quotes, so the valuation as of the snapshot date is attached at the end.
+    portfolio = valuate_snapshots(
+        [
+            StockPortfolioSnapshot(
+                positions=snapshots["positions"][snapshot_date],
+                date=snapshot_date,
+                owner=portfolios[0].owner,
+            )
+        ]
+    )[0]
+
+    # The dividends are paid on the shares held at their date in the position history.
+    dividend_income = sum_dividend_payouts(portfolios, snapshot_date)
+    cash_balance = snapshots["cash_balance"][snapshot_date]
+    cash_balance.USD += dividend_income
+
+    return PortfolioSummary(
+        portfolio=portfolio,
+        cash_balance=cash_balance,
+        invested_capital=snapshots["invested_capital"][snapshot_date],
+        dividend_income=dividend_income,
+        first_transaction_date=snapshots["first_transaction_date"][snapshot_date],
+    )
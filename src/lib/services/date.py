@@ -42,3 +42,30 @@ def get_timeseries(interval: Interval, resolution: Resolution) -> list[date]:
         interval.start_date + timedelta(days=days)
         for days in range(0, elapsed_days, resolution.value)
     ]
+
+
+def get_month_ends(interval: Interval) -> list[date]:
+    """
+    Generate the last day of every month within an interval.
+
+    start_date <= month ends < end_date
+    """
+
+    if interval.start_date > interval.end_date:
+        raise Exception("Cannot process inverse interval.")
+
+    month_ends = []
+    current = interval.start_date.replace(day=1)
+    while True:
+        next_month = (current + timedelta(days=32)).replace(day=1)
+        month_end = next_month - timedelta(days=1)
+
+        if month_end >= interval.end_date:
+            break
+
+        if month_end >= interval.start_date:
+            month_ends.append(month_end)
+
+        current = next_month
+
+    return month_ends
@@ -0,0 +1,97 @@
+"""Service functions for downsampling the timeseries to a point budget."""
+
+from datetime import date
+from logging import getLogger
+
+import numpy as np
+
+from ..dataclasses import PerformanceSnapshot
+
+LOGGER = getLogger(__name__)
+
+
+def largest_triangle_three_buckets(
+    x: np.ndarray, y: np.ndarray, points: int
+) -> np.ndarray:
+    """
+    Selects the indexes of the points that preserve the shape of the line with the LTTB algorithm.
+
+    The first and last points are always kept, every bucket between them keeps the point which forms
+    the largest triangle with the previously kept point and the average of the next bucket.
+    """
+
+    # pylint: disable=invalid-name
+
+    length = len(x)
+    if points >= length:
+        return np.arange(length)
+    if points <= 2:
+        return np.array([0, length - 1])[:points]
+
+    bucket_size = (length - 2) / (points - 2)
+    selected = np.zeros(points, dtype=np.int64)
+    selected[-1] = length - 1
+
+    previous = 0
+    for bucket in range(points - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, length)
+
+        average_x = x[end:next_end].mean()
+        average_y = y[end:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def downsample_performance(
+    performance: dict[date, PerformanceSnapshot], points: int
+) -> dict[date, PerformanceSnapshot]:
+    """
+    Reduces the performance timeseries to the given number of snapshots along its capital size.
+
+    The flows of the dropped snapshots are summed into the next kept one, so the kept snapshots
+    chain like a series calculated at their dates.
+    """
+
+    snapshots = list(performance.values())
+    if len(snapshots) <= points:
+        return performance
+
+    LOGGER.debug("Downsample %s performance snapshots to %s.", len(snapshots), points)
+
+    selected = largest_triangle_three_buckets(
+        np.array(
+            [snapshot.date.toordinal() for snapshot in snapshots], dtype=np.float64
+        ),
+        np.array([snapshot.capital_size for snapshot in snapshots], dtype=np.float64),
+        points,
+    )
+
+    def cumulate(values: list[float]) -> np.ndarray:
+        return np.concatenate((np.zeros(1), np.cumsum(values)))
+
+    appreciation = cumulate([snapshot.appreciation for snapshot in snapshots])
+    dividends = cumulate([snapshot.dividends for snapshot in snapshots])
+    cash_flow = cumulate([snapshot.cash_flow for snapshot in snapshots])
+
+    downsampled = {}
+    first = 0
+    for index in selected.tolist():
+        downsampled[snapshots[index].date] = PerformanceSnapshot(
+            date=snapshots[index].date,
+            base_size=snapshots[first].base_size,
+            appreciation=float(appreciation[index + 1] - appreciation[first]),
+            dividends=float(dividends[index + 1] - dividends[first]),
+            cash_flow=float(cash_flow[index + 1] - cash_flow[first]),
+        )
+        first = index + 1
+
+    return downsampled
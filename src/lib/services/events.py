@@ -0,0 +1,208 @@
+"""
+Lightweight replay events and their loaders.
+
+The events are built directly from the selected columns of the rows instead of model instances,
+the stock of an event is its ticker_id, so reading it never follows the foreign key.
+The fields of an event are named after the attributes of its model.
+"""
+
+from datetime import date
+from itertools import chain
+from logging import getLogger
+from typing import Iterator, NamedTuple, Union, overload
+
+from django.db.models import Model, QuerySet
+
+from ...raw_data.models import StockDividend, StockPrice, StockSplit
+from ...stocks.models import Stock, StockPortfolio
+from ...transactions.models import CashTransaction, ForexTransaction, StockTransaction
+from ..dataclasses import Interval
+from .prices import read_price_history
+
+LOGGER = getLogger(__name__)
+
+# Number of rows fetched at once when an event source is streamed from the database.
+CHUNK_SIZE = 2_000
+
+
+class PriceEvent(NamedTuple):
+    """Price of a stock on a date."""
+
+    date: date
+    ticker_id: str
+    value: float
+
+
+class DividendEvent(NamedTuple):
+    """Dividend paid by a stock for each share on a date."""
+
+    date: date
+    ticker_id: str
+    amount: float
+
+
+class TransactionEvent(NamedTuple):
+    """Shares of a stock bought (positive amount) or sold (negative amount) in a portfolio on a date."""
+
+    date: date
+    ticker_id: str
+    amount: float
+    price: float
+    portfolio_id: int
+
+
+class SplitEvent(NamedTuple):
+    """Split of a stock on a date, every share becomes ratio shares."""
+
+    date: date
+    ticker_id: str
+    ratio: float
+
+
+class CashEvent(NamedTuple):
+    """Cash deposited (positive amount) or withdrawn (negative amount) on a date."""
+
+    date: date
+    currency: str
+    amount: float
+
+
+class ForexEvent(NamedTuple):
+    """Cash exchanged from the source currency to the target currency on a date."""
+
+    date: date
+    source_currency: str
+    target_currency: str
+    amount: float
+    ratio: float
+
+
+Event = Union[
+    PriceEvent, DividendEvent, TransactionEvent, SplitEvent, CashEvent, ForexEvent
+]
+
+# Event type of the rows of each model.
+EVENT_TYPES: dict[type[Model], type[Event]] = {
+    StockPrice: PriceEvent,
+    StockDividend: DividendEvent,
+    StockTransaction: TransactionEvent,
+    StockSplit: SplitEvent,
+    CashTransaction: CashEvent,
+    ForexTransaction: ForexEvent,
+}
+
+
+@overload
+def stream_events(queryset: QuerySet[StockPrice]) -> Iterator[PriceEvent]:
+    ...
+
+
+@overload
+def stream_events(queryset: QuerySet[StockDividend]) -> Iterator[DividendEvent]:
+    ...
+
+
+@overload
+def stream_events(queryset: QuerySet[StockTransaction]) -> Iterator[TransactionEvent]:
+    ...
+
+
+@overload
+def stream_events(queryset: QuerySet[StockSplit]) -> Iterator[SplitEvent]:
+    ...
+
+
+@overload
+def stream_events(queryset: QuerySet[CashTransaction]) -> Iterator[CashEvent]:
+    ...
+
+
+@overload
+def stream_events(queryset: QuerySet[ForexTransaction]) -> Iterator[ForexEvent]:
+    ...
+
+
+def stream_events(queryset: QuerySet) -> Iterator[Event]:
+    """Streams the rows of the queryset in date order as events without loading all of them into memory."""
+
+    event_type = EVENT_TYPES[queryset.model]
+
+    return (
+        event_type._make(row)
+        for row in queryset.order_by("date", "id")
+        .values_list(*event_type._fields)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def load_price_events(ticker: str, interval: Interval) -> list[PriceEvent]:
+    """
+    Loads the prices of the stock within the interval and the latest one before it as an anchor.
+
+    The prices are read from the on-disk store if it is configured.
+    """
+
+    start, end = interval.start_date, interval.end_date
+
+    history = (
+        read_price_history(ticker)
+        if Stock.objects.filter(ticker=ticker).exists()
+        else None
+    )
+    if history is not None:
+        # The anchor is the last price before the interval.
+        first = max(int(history["date"].searchsorted(start.toordinal())) - 1, 0)
+        last = int(history["date"].searchsorted(end.toordinal(), side="right"))
+
+        return [
+            PriceEvent(date.fromordinal(ordinal), ticker, value)
+            for ordinal, value in zip(
+                history["date"][first:last].tolist(),
+                history["value"][first:last].tolist(),
+            )
+        ]
+
+    prices = StockPrice.objects.filter(ticker_id=ticker)
+    anchor = (
+        prices.filter(date__lt=start)
+        .order_by("-date", "-id")
+        .values_list("date", "value")[:1]
+    )
+    rows = (
+        prices.filter(date__range=(start, end))
+        .order_by("date", "id")
+        .values_list("date", "value")
+    )
+
+    return [
+        PriceEvent(row_date, ticker, value) for row_date, value in chain(anchor, rows)
+    ]
+
+
+def load_dividend_events(ticker: str, interval: Interval) -> list[DividendEvent]:
+    """Loads the dividends of the stock within the interval."""
+
+    return list(
+        stream_events(
+            StockDividend.objects.filter(
+                ticker_id=ticker,
+                date__range=(interval.start_date, interval.end_date),
+            )
+        )
+    )
+
+
+def load_transaction_events(
+    portfolio: StockPortfolio, ticker: str, interval: Interval
+) -> list[TransactionEvent]:
+    """Loads the transactions of the stock in the portfolio within the interval."""
+
+    return list(
+        stream_events(
+            StockTransaction.objects.filter(
+                portfolio=portfolio,
+                ticker_id=ticker,
+                date__range=(interval.start_date, interval.end_date),
+            )
+        )
+    )
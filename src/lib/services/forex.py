@@ -0,0 +1,176 @@
+"""Service functions for the historical forex rate related operations."""
+
+from datetime import date
+from logging import getLogger
+from threading import Lock
+from typing import Iterable, NamedTuple, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from ...raw_data.models import ForexRate
+from ...transactions.enums import Currency
+from .cache import bump_shared_versions, get_shared_versions
+
+LOGGER = getLogger(__name__)
+
+
+class _RateHistory(NamedTuple):
+    """USD value of one unit of a currency at each date it changed."""
+
+    # Proleptic Gregorian ordinals of the dates in ascending order.
+    ordinals: np.ndarray
+    rates: np.ndarray
+
+
+class ForexRates:
+    """
+    Historical USD rates of the currencies looked up as of a date.
+
+    A currency is converted with its stored rates against USD in either direction. The latest rate at or
+    before a date is used, the dates before the first stored rate take the first one and the currencies
+    without any stored rate take the configured rate. The histories are loaded lazily when a currency is
+    first looked up and many amounts are converted at once with a vectorized search. Each history keeps
+    the shared data version it was loaded at, so the rates synced by another process are reloaded.
+    """
+
+    def __init__(self) -> None:
+        # pylint: disable=missing-function-docstring
+
+        self.__histories: dict[str, _RateHistory] = {}
+        self.__versions: dict[str, str] = {}
+        self.__lock = Lock()
+
+    def load(self, currencies: Iterable[str]) -> None:
+        """Loads the histories of the currencies that are not loaded yet or outdated with a single query."""
+
+        # The versions are read before the rates, so a sync in between reloads the histories again.
+        versions = get_shared_versions(
+            "forex",
+            {currency for currency in currencies if currency != Currency.US_DOLLAR},
+        )
+        missing = {
+            currency
+            for currency, version in versions.items()
+            if currency not in self.__histories
+            or self.__versions.get(currency) != version
+        }
+        if not missing:
+            return
+
+        LOGGER.debug("Loading the forex rate history of %s currencies.", len(missing))
+
+        history: dict[str, dict[int, float]] = {currency: {} for currency in missing}
+        for source, target, rate_date, rate in (
+            ForexRate.objects.filter(
+                Q(source_currency__in=missing, target_currency=Currency.US_DOLLAR)
+                | Q(source_currency=Currency.US_DOLLAR, target_currency__in=missing)
+            )
+            .order_by("date", "id")
+            .values_list("source_currency", "target_currency", "date", "rate")
+        ):
+            # The latest rate wins if a day has more than one.
+            if source == Currency.US_DOLLAR:
+                history[target][rate_date.toordinal()] = 1 / rate
+            else:
+                history[source][rate_date.toordinal()] = rate
+
+        with self.__lock:
+            for currency, rates in history.items():
+                self.__histories[currency] = _RateHistory(
+                    np.array(list(rates.keys()), dtype=np.int64),
+                    np.array(list(rates.values()), dtype=np.float64),
+                )
+                self.__versions[currency] = versions[currency]
+
+    def rate(self, currency: str, target_date: date) -> float:
+        """Returns the USD value of one unit of the currency at the target date."""
+
+        return float(self.rates(currency, [target_date])[0])
+
+    def rates(self, currency: str, dates: Sequence[date]) -> np.ndarray:
+        """Returns the USD value of one unit of the currency at each date."""
+
+        if currency == Currency.US_DOLLAR:
+            return np.ones(len(dates), dtype=np.float64)
+
+        self.load([currency])
+        history = self.__histories[currency]
+        if not history.ordinals.size:
+            return np.full(len(dates), self.__get_default_rate(currency))
+
+        ordinals = np.array(
+            [target_date.toordinal() for target_date in dates], dtype=np.int64
+        )
+        found = np.searchsorted(history.ordinals, ordinals, side="right") - 1
+
+        return history.rates[np.maximum(found, 0)]
+
+    def to_usd(
+        self,
+        amounts: Sequence[float],
+        currencies: Sequence[str],
+        dates: Sequence[date],
+    ) -> np.ndarray:
+        """Converts each amount in the currency at the same index to USD with the rate at its date."""
+
+        converted = np.array(amounts, dtype=np.float64)
+        codes = np.array(currencies, dtype=object)
+        self.load(set(currencies))
+
+        for currency in set(currencies):
+            if currency == Currency.US_DOLLAR:
+                continue
+
+            mask = codes == currency
+            converted[mask] *= self.rates(
+                currency, [dates[index] for index in np.flatnonzero(mask).tolist()]
+            )
+
+        return converted
+
+    def clear(self) -> None:
+        """Removes every loaded history."""
+
+        with self.__lock:
+            self.__histories.clear()
+            self.__versions.clear()
+
+    @staticmethod
+    def __get_default_rate(currency: str) -> float:
+        """The configured rates are used for the currencies without any stored rate."""
+
+        if currency == Currency.EURO:
+            rate = settings.EUR_USD_FX_RATE
+        elif currency == Currency.HUNGARIAN_FORINT:
+            rate = 1 / settings.USD_HUF_FX_RATE if settings.USD_HUF_FX_RATE else None
+        else:
+            raise Exception("Unknown currency.")
+
+        if rate is None:
+            raise Exception(
+                f"There is no synced or configured forex rate for {currency}."
+            )
+
+        return rate
+
+
+# Forex rate history shared by the requests of the process.
+FOREX_RATES = ForexRates()
+
+
+def get_forex_rates() -> ForexRates:
+    """Returns the shared forex rates or new ones for the caller if they are not kept between requests."""
+
+    return FOREX_RATES if settings.FOREX_RATE_CACHE else ForexRates()
+
+
+def refresh_forex_rates() -> None:
+    """Drops the shared forex rate histories after a rate sync, they are reloaded on the next lookup."""
+
+    # The other processes reload their histories at the next lookup.
+    bump_shared_versions(
+        "forex", [currency for currency in Currency if currency != Currency.US_DOLLAR]
+    )
+    FOREX_RATES.clear()
@@ -0,0 +1,303 @@
+"""Service functions for the materialized portfolio net asset value related operations."""
+
+from datetime import date, timedelta
+from logging import getLogger
+from typing import Callable, Iterable, NamedTuple, Optional
+
+import numpy as np
+from django.db.models import Max, Min
+
+from ...performance.models import PortfolioNav
+from ...raw_data.models import StockDividend, StockSplit
+from ...stocks.models import StockPortfolio
+from ...transactions.models import CashTransaction, StockTransaction
+from .cash import CashFlow, convert_cash_flows
+from .events import DividendEvent, SplitEvent, TransactionEvent, stream_events
+from .positions import PositionTimeline
+from .prices import PriceMatrix, get_price_matrix
+from .replay import merge_actions
+
+LOGGER = getLogger(__name__)
+
+BATCH_SIZE = 1_000
+
+
+class NavRow(NamedTuple):
+    """Net asset value of a portfolio at the end of a date, the flows are summed since the previous row."""
+
+    date: date
+    assets_under_management: float
+    cash_flow: float
+    dividends: float
+    invested_capital: float
+
+
+class NavInputs(NamedTuple):
+    """Events and prices of a portfolio loaded from the database, the NAV is computed from them without queries."""
+
+    actions: list[TransactionEvent | SplitEvent]
+    dividends: list[DividendEvent]
+    cash_flows: list[CashFlow]
+    prices: PriceMatrix
+
+
+def load_nav_inputs(
+    portfolio: StockPortfolio, until: date, since: Optional[date] = None
+) -> NavInputs:
+    """Loads the events of the portfolio until the given date and the price history of its stocks."""
+
+    transactions = StockTransaction.objects.filter(portfolio=portfolio)
+    actions = list(
+        merge_actions(
+            stream_events(transactions),
+            stream_events(
+                StockSplit.objects.filter(ticker__in=transactions.values("ticker"))
+            ),
+        )
+    )
+
+    dividends = StockDividend.objects.filter(
+        ticker__in=transactions.values("ticker"), date__lte=until
+    )
+    if since:
+        dividends = dividends.filter(date__gt=since)
+
+    prices = get_price_matrix()
+    prices.load({action.ticker_id for action in actions})
+
+    return NavInputs(
+        actions=actions,
+        dividends=list(stream_events(dividends)),
+        cash_flows=convert_cash_flows(
+            CashTransaction.objects.filter(portfolio=portfolio, date__lte=until)
+            .order_by("date", "id")
+            .values_list("date", "currency", "amount")
+        ),
+        prices=prices,
+    )
+
+
+def compute_nav(
+    inputs: NavInputs, dates: list[date], since: Optional[date] = None
+) -> list[NavRow]:
+    """
+    Replays the loaded portfolio at each date and sums its cash flows and dividends since the previous date.
+
+    It does not query the database, so it can run outside of the request thread.
+    """
+
+    # pylint: disable=too-many-locals
+
+    dates = sorted(dates)
+    if not dates:
+        return []
+
+    timeline = PositionTimeline(inputs.actions)
+
+    # The positions are valued at the prices of each date, the ones without a price yet at their opening price.
+    tickers = timeline.tickers
+    keys = ([ticker for ticker in tickers for _ in dates], dates * len(tickers))
+    shares = timeline.lookup(*keys).reshape(len(tickers), len(dates))
+    assets = inputs.prices.valuate(
+        tickers,
+        shares,
+        dates,
+        timeline.opening_prices(*keys).reshape(len(tickers), len(dates)),
+    )
+
+    ordinals = np.array([row_date.toordinal() for row_date in dates], dtype=np.int64)
+    flow_ordinals = np.array(
+        [flow.date.toordinal() for flow in inputs.cash_flows], dtype=np.int64
+    )
+    flow_amounts = np.array(
+        [flow.amount for flow in inputs.cash_flows], dtype=np.float64
+    )
+
+    # Every cash flow until a date is part of the invested capital.
+    invested = np.concatenate((np.zeros(1), np.cumsum(flow_amounts)))[
+        np.searchsorted(flow_ordinals, ordinals, side="right")
+    ]
+    period_flows = __sum_by_period(ordinals, flow_ordinals, flow_amounts, since)
+    period_dividends = __sum_by_period(
+        ordinals,
+        np.array(
+            [dividend.date.toordinal() for dividend in inputs.dividends],
+            dtype=np.int64,
+        ),
+        timeline.payouts(inputs.dividends),
+        since,
+    )
+
+    return [
+        NavRow(
+            date=row_date,
+            assets_under_management=aum,
+            cash_flow=cash_flow,
+            dividends=dividend,
+            invested_capital=capital,
+        )
+        for row_date, aum, cash_flow, dividend, capital in zip(
+            dates,
+            assets.tolist(),
+            period_flows.tolist(),
+            period_dividends.tolist(),
+            invested.tolist(),
+        )
+    ]
+
+
+def calculate_nav(
+    portfolio: StockPortfolio, dates: list[date], since: Optional[date] = None
+) -> list[NavRow]:
+    """
+    Replays the portfolio at each date and sums its cash flows and dividends since the previous date.
+
+    The flows of the first date are summed after the since date, or from the first event if it is not given.
+    Every amount is in USD.
+    """
+
+    LOGGER.debug("Calculate the NAV of %s at %s date(s).", portfolio, len(dates))
+
+    if not dates:
+        return []
+
+    return compute_nav(load_nav_inputs(portfolio, max(dates), since), dates, since)
+
+
+def get_portfolio_nav(
+    portfolio: StockPortfolio, start_date: date, series: list[date]
+) -> list[NavRow]:
+    """
+    Returns the materialized daily NAV of the portfolio from the start date until the last date of the series.
+
+    The series dates after the last materialized day are calculated with a replay, their first row sums
+    the flows since the last materialized day.
+    """
+
+    return load_portfolio_nav(portfolio, start_date, series)()
+
+
+def load_portfolio_nav(
+    portfolio: StockPortfolio, start_date: date, series: list[date]
+) -> Callable[[], list[NavRow]]:
+    """
+    Loads everything the NAV of the portfolio needs and returns the computation of its rows.
+
+    The returned function does not query the database, so it can run in a worker thread.
+    """
+
+    if not series:
+        return list
+
+    rows = [
+        NavRow(*values)
+        for values in PortfolioNav.objects.filter(
+            portfolio=portfolio, date__range=(start_date, series[-1])
+        )
+        .order_by("date")
+        .values_list(
+            "date",
+            "assets_under_management",
+            "cash_flow",
+            "dividends",
+            "invested_capital",
+        )
+    ]
+
+    last_date = rows[-1].date if rows else start_date - timedelta(days=1)
+    live_series = [series_date for series_date in series if series_date > last_date]
+
+    LOGGER.debug(
+        "Read %s materialized NAV row(s) and replay %s date(s) of %s.",
+        len(rows),
+        len(live_series),
+        portfolio,
+    )
+
+    if not live_series:
+        return lambda: rows
+
+    inputs = load_nav_inputs(portfolio, live_series[-1], since=last_date)
+
+    return lambda: rows + compute_nav(inputs, live_series, since=last_date)
+
+
+def materialize_nav(portfolio: StockPortfolio, until: date) -> int:
+    """
+    Stores the NAV of every day after the last materialized one until the given date.
+
+    The first day of a portfolio is the date of its first transaction. Returns the number of days stored.
+    """
+
+    last_date = PortfolioNav.objects.filter(portfolio=portfolio).aggregate(Max("date"))[
+        "date__max"
+    ]
+    start_date = (
+        last_date + timedelta(days=1) if last_date else __get_first_date(portfolio)
+    )
+
+    if not start_date or start_date > until:
+        return 0
+
+    dates = [
+        start_date + timedelta(days=offset)
+        for offset in range((until - start_date).days + 1)
+    ]
+    rows = calculate_nav(portfolio, dates, since=last_date)
+
+    LOGGER.debug("Saving %s NAV row(s) of %s.", len(rows), portfolio)
+
+    PortfolioNav.objects.bulk_create(
+        (PortfolioNav(portfolio=portfolio, **row._asdict()) for row in rows),
+        batch_size=BATCH_SIZE,
+    )
+
+    return len(rows)
+
+
+def invalidate_nav(portfolio_ids: Iterable[int], since: date) -> None:
+    """Removes every materialized day of the portfolios at or after the given date."""
+
+    portfolio_ids = list(portfolio_ids)
+    if not portfolio_ids:
+        return
+
+    LOGGER.debug(
+        "Invalidating the NAV of %s portfolio(s) since %s.", len(portfolio_ids), since
+    )
+
+    PortfolioNav.objects.filter(
+        portfolio_id__in=portfolio_ids, date__gte=since
+    ).delete()
+
+
+def __get_first_date(portfolio: StockPortfolio) -> Optional[date]:
+    """Returns the date of the first stock or cash transaction of the portfolio."""
+
+    dates = [
+        model.objects.filter(portfolio=portfolio).aggregate(Min("date"))["date__min"]
+        for model in (StockTransaction, CashTransaction)
+    ]
+
+    return min((first for first in dates if first), default=None)
+
+
+def __sum_by_period(
+    ordinals: np.ndarray,
+    event_ordinals: np.ndarray,
+    amounts: np.ndarray,
+    since: Optional[date],
+) -> np.ndarray:
+    """Sums the amounts of the events after the since date into the first date at or after them."""
+
+    kept = (
+        event_ordinals > since.toordinal()
+        if since
+        else np.ones(len(event_ordinals), dtype=bool)
+    )
+    index = np.searchsorted(ordinals, event_ordinals[kept], side="left")
+    valid = index < len(ordinals)
+
+    return np.bincount(
+        index[valid], weights=amounts[kept][valid], minlength=len(ordinals)
+    ).astype(np.float64)
@@ -1,32 +1,39 @@
 """Service functions for performance related operations"""
 
-from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from itertools import chain
 from logging import getLogger
-from math import prod
-from typing import cast
-
-from ...raw_data.models import StockDividend, StockPrice
-from ...transactions.models import CashTransaction, StockTransaction
-from ..dataclasses import (
-    PerformanceSnapshot,
-    StockPortfolioSnapshot,
-    StockPositionSnapshot,
-)
-from ..helpers import get_latest_snapshot
-from .cash import transaction_to_usd
-from .replay import generate_snapshot_series
+from math import isnan
+from time import perf_counter
+from typing import Iterable, Optional, cast
+
+from django.conf import settings
+from django.db import connection
+
+from ...stocks.models import StockPortfolio
+from ..dataclasses import PerformanceSnapshot, SnapshotSeries
+from . import returns
+from .events import DividendEvent, PriceEvent, TransactionEvent
+from .nav import NavRow, load_portfolio_nav
+from .replay import generate_snapshot_series, merge_actions
 
 LOGGER = getLogger(__name__)
 
 
 def get_position_performance(
-    portfolio_snapshots: dict[date, StockPortfolioSnapshot],
-    price_info: list[StockPrice],
-    dividends: list[StockDividend],
-    transactions: list[StockTransaction],
+    portfolio_snapshots: SnapshotSeries,
+    price_info: Iterable[PriceEvent],
+    dividends: Iterable[DividendEvent],
+    transactions: Iterable[TransactionEvent],
     series: list[date],
 ) -> dict[date, PerformanceSnapshot]:
-    """Creates a timeseries from the position performance at each date in the series."""
+    """
+    Creates a timeseries from the position performance at each date in the series.
+
+    The price info, dividends and transactions must be ordered by date, they are merged lazily.
+    The actions at or before the first date of the series are part of its snapshot.
+    """
 
     LOGGER.debug("Generate %s performance snapshots for a position.", len(series))
 
@@ -34,42 +41,35 @@ def get_position_performance(
     if not series or not portfolio_snapshots:
         return {}
 
-    actions = sorted(
-        cast(
-            list[StockPrice | StockDividend | StockTransaction],
-            [*price_info, *dividends, *transactions],
-        ),
-        key=lambda x: x.date,
+    actions: Iterable[PriceEvent | DividendEvent | TransactionEvent] = merge_actions(
+        price_info, dividends, transactions
     )
     first_snapshot_date = series[0]
     first_snapshot = portfolio_snapshots[first_snapshot_date]
-    initial_position = first_snapshot.positions.get(
-        actions[0].ticker.ticker
-    ) or StockPositionSnapshot(
-        stock=actions[0].ticker,
-        shares=0,
-        price=0,
-        dividend=0,
-        purchase_price=0,
-        first_purchase_date=datetime.now().date(),
-        latest_purchase_date=datetime.now().date(),
+
+    # The first action is only peeked to find the position in the first snapshot.
+    first_action = next(iter(actions), None)
+    initial_position = (
+        first_snapshot.positions.get(first_action.ticker_id) if first_action else None
     )
+    if first_action:
+        actions = chain([first_action], actions)
 
     def accumulate(
         snapshot: PerformanceSnapshot,
-        action: StockPrice | StockDividend | StockTransaction,
+        action: PriceEvent | DividendEvent | TransactionEvent,
     ) -> PerformanceSnapshot:
-        portfolio = get_latest_snapshot(action.date, portfolio_snapshots)
+        portfolio = portfolio_snapshots.latest(action.date)
 
         if not portfolio:
             return snapshot
 
-        position = portfolio.positions.get(action.ticker.ticker)
+        position = portfolio.positions.get(action.ticker_id)
 
         if not position:
             return snapshot
 
-        if isinstance(action, StockPrice):
+        if isinstance(action, PriceEvent):
             return PerformanceSnapshot(
                 date=snapshot.date,
                 base_size=snapshot.base_size,
@@ -78,7 +78,7 @@ def get_position_performance(
                 cash_flow=snapshot.cash_flow,
             )
 
-        if isinstance(action, StockDividend):
+        if isinstance(action, DividendEvent):
             return PerformanceSnapshot(
                 date=snapshot.date,
                 base_size=snapshot.base_size,
@@ -87,7 +87,7 @@ def get_position_performance(
                 cash_flow=snapshot.cash_flow,
             )
 
-        if isinstance(action, StockTransaction):
+        if isinstance(action, TransactionEvent):
             return PerformanceSnapshot(
                 date=snapshot.date,
                 base_size=snapshot.base_size,
@@ -120,7 +120,7 @@ def get_position_performance(
     return generate_snapshot_series(
         initial=PerformanceSnapshot(
             date=first_snapshot_date,
-            base_size=initial_position.size,
+            base_size=initial_position.size if initial_position else 0,
         ),
         actions=actions,
         series=series,
@@ -129,68 +129,34 @@ def get_position_performance(
     )
 
 
-def get_portfolio_performance(
-    portfolio_snapshots: dict[date, StockPortfolioSnapshot],
-    dividends: list[StockDividend],
-    cash_transactions: list[CashTransaction],
-    series: list[date],
+def get_nav_performance(
+    rows: list[NavRow], series: list[date]
 ) -> dict[date, PerformanceSnapshot]:
-    """Creates a timeseries from the portfolio performance at each date in the series."""
-
-    LOGGER.debug("Generate %s performance snapshots for a portfolio.", len(series))
-
-    if not portfolio_snapshots or not series:
-        return {}
-
-    first_snapshot_date = series[0]
-    first_snapshot = portfolio_snapshots[first_snapshot_date]
-
-    def accumulate(
-        snapshot: PerformanceSnapshot,
-        action: StockPortfolioSnapshot | StockDividend | CashTransaction,
-    ) -> PerformanceSnapshot:
-        if isinstance(action, CashTransaction):
-            currency_adjusted_action = transaction_to_usd(action)
-
-            return PerformanceSnapshot(
-                date=snapshot.date,
-                base_size=snapshot.base_size,
-                appreciation=snapshot.appreciation,
-                dividends=snapshot.dividends,
-                cash_flow=snapshot.cash_flow + currency_adjusted_action.amount,
-            )
+    """
+    Creates a timeseries from the portfolio performance at each date in the series from its NAV.
 
-        if isinstance(action, StockPortfolioSnapshot):
-            return PerformanceSnapshot(
-                date=snapshot.date,
-                base_size=snapshot.base_size,
-                appreciation=action.assets_under_management - snapshot.base_size,
-                dividends=snapshot.dividends,
-                cash_flow=snapshot.cash_flow,
-            )
+    The rows must be ordered by date, each of them holds the flows since the previous one.
+    """
 
-        if isinstance(action, StockDividend):
-            portfolio = get_latest_snapshot(
-                cast(date, action.date), portfolio_snapshots
-            )
-
-            if not portfolio:
-                return snapshot
+    LOGGER.debug(
+        "Generate %s performance snapshots from %s NAV row(s).", len(series), len(rows)
+    )
 
-            position = portfolio.positions.get(action.ticker.ticker)
+    series = sorted(series)
+    if not series:
+        return {}
 
-            if not position:
-                return snapshot
+    # The base size is the latest assets under management at the first snapshot date.
+    first_rows = [row for row in rows if row.date <= series[0]]
 
-            return PerformanceSnapshot(
-                date=snapshot.date,
-                base_size=snapshot.base_size,
-                appreciation=snapshot.appreciation,
-                dividends=snapshot.dividends + action.amount * position.shares,
-                cash_flow=snapshot.cash_flow,
-            )
-
-        raise Exception("Unknown action type.")
+    def accumulate(snapshot: PerformanceSnapshot, row: NavRow) -> PerformanceSnapshot:
+        return PerformanceSnapshot(
+            date=snapshot.date,
+            base_size=snapshot.base_size,
+            appreciation=row.assets_under_management - snapshot.base_size,
+            dividends=snapshot.dividends + row.dividends,
+            cash_flow=snapshot.cash_flow + row.cash_flow,
+        )
 
     def take_snapshot(
         snapshot: PerformanceSnapshot, target_date: date
@@ -213,23 +179,131 @@ def get_portfolio_performance(
 
     return generate_snapshot_series(
         initial=PerformanceSnapshot(
-            date=first_snapshot_date,
-            base_size=first_snapshot.assets_under_management,
-        ),
-        actions=sorted(
-            cast(
-                list[StockPortfolioSnapshot | StockDividend | CashTransaction],
-                [*portfolio_snapshots.values(), *dividends, *cash_transactions],
-            ),
-            key=lambda x: cast(date, x.date),
+            date=series[0],
+            base_size=first_rows[-1].assets_under_management if first_rows else 0,
         ),
+        actions=rows,
         series=series,
         operation=accumulate,
         take_snapshot=take_snapshot,
     )
 
 
+def merge_performances(
+    performances: Iterable[dict[date, PerformanceSnapshot]]
+) -> dict[date, PerformanceSnapshot]:
+    """
+    Sums the performance timeseries of many portfolios date by date into a single one.
+
+    The performance of the merged snapshots is weighted by the capital of the portfolios.
+    """
+
+    merged: dict[date, PerformanceSnapshot] = {}
+    for performance in performances:
+        for snapshot_date, snapshot in performance.items():
+            total = merged.setdefault(
+                snapshot_date, PerformanceSnapshot(date=snapshot_date)
+            )
+            total.base_size += snapshot.base_size
+            total.appreciation += snapshot.appreciation
+            total.dividends += snapshot.dividends
+            total.cash_flow += snapshot.cash_flow
+
+    return dict(sorted(merged.items()))
+
+
+def get_summary_performance(
+    portfolios: list[StockPortfolio], start_date: date, series: list[date]
+) -> dict[date, PerformanceSnapshot]:
+    """
+    Creates a timeseries from the summed performance of the portfolios at each date in the series.
+
+    Each portfolio is loaded and calculated in a pool of at most PERFORMANCE_WORKERS threads,
+    every thread uses its own database connection.
+    """
+
+    if not portfolios or not series:
+        return {}
+
+    def calculate(portfolio: StockPortfolio) -> dict[date, PerformanceSnapshot]:
+        try:
+            started = perf_counter()
+            calculate_nav = load_portfolio_nav(portfolio, start_date, series)
+            loaded = perf_counter()
+            performance = get_nav_performance(calculate_nav(), series)
+
+            LOGGER.info(
+                "Calculated the performance of %s in %.3f seconds (%.3f loading).",
+                portfolio,
+                perf_counter() - started,
+                loaded - started,
+            )
+
+            return performance
+        finally:
+            # The connections of the worker threads are not closed by the request.
+            connection.close()
+
+    workers = max(1, min(settings.PERFORMANCE_WORKERS, len(portfolios)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        performances = list(executor.map(calculate, portfolios))
+
+    return merge_performances(performances)
+
+
 def time_weighted_return(performance_snapshots: list[PerformanceSnapshot]) -> float:
     """Calculate the time weighted return of the position or portfolio."""
 
-    return prod((1 + snapshot.performance for snapshot in performance_snapshots)) - 1
+    return cast(
+        float,
+        returns.time_weighted_return(
+            returns.period_returns(
+                [snapshot.base_size for snapshot in performance_snapshots],
+                [snapshot.total for snapshot in performance_snapshots],
+                [snapshot.cash_flow for snapshot in performance_snapshots],
+            )
+        ),
+    )
+
+
+def money_weighted_return(
+    performance_snapshots: list[PerformanceSnapshot],
+) -> Optional[float]:
+    """
+    Calculate the money weighted (XIRR) annual return of the position or portfolio.
+
+    The base size of the first snapshot is invested at its date, the cash flows are invested and
+    the dividends are withdrawn at their snapshot dates and the capital is withdrawn at the last one.
+    Returns None if the return cannot be solved.
+    """
+
+    if not performance_snapshots:
+        return None
+
+    first, last = performance_snapshots[0], performance_snapshots[-1]
+    rate = returns.xirr(
+        [-first.base_size]
+        + [
+            snapshot.dividends - snapshot.cash_flow
+            for snapshot in performance_snapshots
+        ]
+        + [last.capital_size],
+        [first.date.toordinal()]
+        + [snapshot.date.toordinal() for snapshot in performance_snapshots]
+        + [last.date.toordinal()],
+    )
+
+    return None if isnan(rate) else cast(float, rate)
+
+
+def get_returns(
+    performance: dict[date, PerformanceSnapshot]
+) -> dict[str, Optional[float]]:
+    """Time and money weighted return of a performance timeseries."""
+
+    snapshots = list(performance.values())
+
+    return {
+        "time_weighted": time_weighted_return(snapshots),
+        "money_weighted": money_weighted_return(snapshots),
+    }
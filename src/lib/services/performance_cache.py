@@ -0,0 +1,94 @@
+"""Service functions for the cached performance result related operations."""
+
+from datetime import date
+from logging import getLogger
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+
+from ...transactions.models import StockTransaction
+from ..dataclasses import Interval, PerformanceSnapshot
+from ..enums import Resolution
+from .cache import bump_shared_versions, get_shared_versions
+from .nav import invalidate_nav
+
+LOGGER = getLogger(__name__)
+
+
+def get_performance_cache() -> Optional[BaseCache]:
+    """Returns the Django cache of the performance results or None if the results are not cached."""
+
+    return caches[settings.PERFORMANCE_CACHE] if settings.PERFORMANCE_CACHE else None
+
+
+def get_cached_performance(
+    portfolio_id: int,
+    ticker: Optional[str],
+    interval: Interval,
+    resolution: Resolution,
+    calculate: Callable[[], dict[date, PerformanceSnapshot]],
+) -> dict[date, PerformanceSnapshot]:
+    """
+    Returns the cached performance of the portfolio or its position or calculates and caches it.
+
+    The results are cached for the shared data version of the portfolio, so they are not used after its data changed.
+    """
+
+    cache = get_performance_cache()
+    if cache is None:
+        return calculate()
+
+    key = ":".join(
+        [
+            "performance",
+            str(portfolio_id),
+            ticker or "",
+            interval.start_date.isoformat(),
+            interval.end_date.isoformat(),
+            resolution.name,
+            get_shared_versions("performance", [str(portfolio_id)])[str(portfolio_id)],
+        ]
+    )
+
+    performance = cache.get(key)
+    if performance is None:
+        LOGGER.debug("Calculating the performance of %s for %s.", portfolio_id, key)
+
+        performance = calculate()
+        cache.set(key, performance, settings.PERFORMANCE_CACHE_TTL)
+
+    return performance
+
+
+def bump_data_versions(portfolio_ids: Iterable[int]) -> None:
+    """Drops the data version of the portfolios, so their cached results are not used anymore."""
+
+    if get_performance_cache() is None:
+        return
+
+    bump_shared_versions(
+        "performance", [str(portfolio_id) for portfolio_id in portfolio_ids]
+    )
+
+
+def invalidate_performance(portfolio_ids: Iterable[int], since: date) -> None:
+    """Removes the materialized NAV of the portfolios from the given date and their cached results."""
+
+    portfolio_ids = list(portfolio_ids)
+    if not portfolio_ids:
+        return
+
+    invalidate_nav(portfolio_ids, since)
+    bump_data_versions(portfolio_ids)
+
+
+def invalidate_stock_performance(ticker: str, since: date) -> None:
+    """The prices and dividends of a stock change the performance of every portfolio that transacted it."""
+
+    invalidate_performance(
+        StockTransaction.objects.filter(ticker_id=ticker)
+        .values_list("portfolio_id", flat=True)
+        .distinct(),
+        since,
+    )
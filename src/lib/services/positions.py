@@ -0,0 +1,281 @@
+"""Service functions for the stock position related operations."""
+
+from datetime import date
+from logging import getLogger
+from typing import Iterable, Optional
+
+import numpy as np
+
+from ...raw_data.models import StockSplit
+from ...stocks.models import CurrentPosition, PositionHistory, StockPortfolio
+from ...transactions.models import StockTransaction
+from ..dataclasses import StockPositionSnapshot
+from .events import DividendEvent, SplitEvent, TransactionEvent
+
+LOGGER = getLogger(__name__)
+
+# Multiplier of the ticker index in the keys of the timeline, it is above every date ordinal.
+TICKER_KEY = 2**32
+
+
+class PositionTimeline:
+    """
+    Share count of every transacted stock over time.
+
+    The change points of the share counts are stored in a single sorted array keyed by the ticker
+    and the date, so the shares held at any date are looked up with a binary search and many lookups
+    are done at once with a single vectorized search. The share counts follow the portfolio replay:
+    sells without a position are ignored, a closed position is reset and splits truncate the shares.
+    The price of the transaction that opened the position is kept with every share count.
+    """
+
+    def __init__(self, actions: Iterable[TransactionEvent | SplitEvent]):
+        """The actions must be ordered by date."""
+
+        changes: dict[str, tuple[list[int], list[float], list[float]]] = {}
+        for action in actions:
+            dates, shares, prices = changes.setdefault(action.ticker_id, ([], [], []))
+            current = shares[-1] if shares else 0
+            opening = prices[-1] if prices else 0.0
+
+            if isinstance(action, SplitEvent):
+                if not current:
+                    continue
+
+                current = int(current * action.ratio)
+            elif current:
+                current += action.amount
+
+                if current < 0:
+                    raise Exception("Negative position size is not allowed.")
+            elif action.amount > 0:
+                current = action.amount
+                opening = action.price
+            else:
+                continue
+
+            dates.append(action.date.toordinal())
+            shares.append(current)
+            prices.append(opening)
+
+        self.__tickers = {ticker: index for index, ticker in enumerate(changes)}
+        self.__keys = np.array(
+            [
+                index * TICKER_KEY + ordinal
+                for index, (dates, _, _) in enumerate(changes.values())
+                for ordinal in dates
+            ],
+            dtype=np.int64,
+        )
+        self.__shares = np.array(
+            [count for _, shares, _ in changes.values() for count in shares],
+            dtype=np.float64,
+        )
+        self.__prices = np.array(
+            [price for _, _, prices in changes.values() for price in prices],
+            dtype=np.float64,
+        )
+
+    @property
+    def tickers(self) -> list[str]:
+        """Transacted stocks of the timeline."""
+
+        return list(self.__tickers)
+
+    def periods(self, ticker: str) -> list[tuple[date, Optional[date], float]]:
+        """
+        Returns the periods of the stock with a share count as (valid from, valid to, shares).
+
+        The shares are held until the day before the valid to date, the last period could be open.
+        """
+
+        if ticker not in self.__tickers:
+            return []
+
+        offset = self.__tickers[ticker] * TICKER_KEY
+        start, end = np.searchsorted(self.__keys, [offset, offset + TICKER_KEY])
+        # Only the share count after the last change of a date is kept.
+        changes = list(
+            dict(
+                zip(
+                    (self.__keys[start:end] - offset).tolist(),
+                    self.__shares[start:end].tolist(),
+                )
+            ).items()
+        )
+
+        return [
+            (
+                date.fromordinal(ordinal),
+                date.fromordinal(changes[index + 1][0])
+                if index + 1 < len(changes)
+                else None,
+                shares,
+            )
+            for index, (ordinal, shares) in enumerate(changes)
+            if shares
+        ]
+
+    def shares(self, ticker: str, target_date: date) -> float:
+        """Returns the number of shares held of the stock at the end of the target date."""
+
+        return float(self.lookup([ticker], [target_date])[0])
+
+    def lookup(self, tickers: list[str], dates: list[date]) -> np.ndarray:
+        """Returns the number of shares held of each stock at the end of the date at the same index."""
+
+        return self.__find(self.__shares, tickers, dates)
+
+    def opening_prices(self, tickers: list[str], dates: list[date]) -> np.ndarray:
+        """
+        Returns the opening price of the position of each stock at the end of the date at the same index.
+
+        The stocks without a position at the date are NaN.
+        """
+
+        prices = self.__find(self.__prices, tickers, dates, np.nan)
+
+        return np.where(self.lookup(tickers, dates) > 0, prices, np.nan)
+
+    def __find(
+        self,
+        values: np.ndarray,
+        tickers: list[str],
+        dates: list[date],
+        default: float = 0.0,
+    ) -> np.ndarray:
+        """Returns the value of the latest change point of each stock at or before the date at the same index."""
+
+        if not self.__keys.size:
+            return np.full(len(tickers), default, dtype=np.float64)
+
+        index = np.array(
+            [self.__tickers.get(ticker, -1) for ticker in tickers], dtype=np.int64
+        )
+        keys = index * TICKER_KEY + np.array(
+            [target_date.toordinal() for target_date in dates], dtype=np.int64
+        )
+
+        # The latest change point at or before the key belongs to the ticker if the ticker has any until then.
+        found = np.searchsorted(self.__keys, keys, side="right") - 1
+        found_keys = self.__keys[np.maximum(found, 0)]
+        valid = (index >= 0) & (found >= 0) & (found_keys // TICKER_KEY == index)
+
+        return np.where(valid, values[np.maximum(found, 0)], default)
+
+    def payouts(self, dividends: list[DividendEvent]) -> np.ndarray:
+        """Returns the amount paid by each dividend on the shares held at its date."""
+
+        amounts = np.array(
+            [dividend.amount for dividend in dividends], dtype=np.float64
+        )
+
+        return amounts * self.lookup(
+            [dividend.ticker_id for dividend in dividends],
+            [dividend.date for dividend in dividends],
+        )
+
+
+def get_current_positions(
+    portfolio: StockPortfolio,
+) -> dict[str, StockPositionSnapshot]:
+    """
+    Creates the stored current positions of the portfolio.
+
+    The price of a position is its opening price and it has no dividend info attached.
+    """
+
+    return {
+        position.ticker_id: StockPositionSnapshot(
+            stock=position.ticker,
+            shares=position.shares,
+            price=position.opening_price,
+            dividend=0.0,
+            purchase_price=position.purchase_price,
+            first_purchase_date=position.first_purchase_date,
+            latest_purchase_date=position.latest_purchase_date,
+        )
+        for position in CurrentPosition.objects.filter(
+            portfolio=portfolio
+        ).select_related("ticker")
+    }
+
+
+def save_current_position(
+    portfolio_id: int, ticker: str, position: Optional[StockPositionSnapshot]
+) -> None:
+    """Stores the position replayed without quotes or removes it if the stock is not held anymore."""
+
+    LOGGER.debug("Saving the current position of %s in %s.", ticker, portfolio_id)
+
+    if position is None:
+        CurrentPosition.objects.filter(
+            portfolio_id=portfolio_id, ticker_id=ticker
+        ).delete()
+
+        return
+
+    CurrentPosition.objects.update_or_create(
+        portfolio_id=portfolio_id,
+        ticker_id=ticker,
+        defaults={
+            "shares": position.shares,
+            "opening_price": position.price,
+            "purchase_price": position.purchase_price,
+            "first_purchase_date": position.first_purchase_date,
+            "latest_purchase_date": position.latest_purchase_date,
+        },
+    )
+
+
+def get_position_history(
+    portfolio: StockPortfolio,
+) -> dict[str, list[tuple[date, Optional[date], float]]]:
+    """Returns the stored periods of every stock of the portfolio as (valid from, valid to, shares)."""
+
+    history: dict[str, list[tuple[date, Optional[date], float]]] = {}
+    for ticker, valid_from, valid_to, shares in (
+        PositionHistory.objects.filter(portfolio=portfolio)
+        .order_by("ticker", "valid_from")
+        .values_list("ticker", "valid_from", "valid_to", "shares")
+    ):
+        history.setdefault(ticker, []).append((valid_from, valid_to, shares))
+
+    return history
+
+
+def save_position_history(
+    portfolio_id: int, ticker: str, periods: list[tuple[date, Optional[date], float]]
+) -> None:
+    """Replaces the stored periods of the stock in the portfolio."""
+
+    LOGGER.debug("Saving %s period(s) of %s in %s.", len(periods), ticker, portfolio_id)
+
+    PositionHistory.objects.filter(portfolio_id=portfolio_id, ticker_id=ticker).delete()
+    PositionHistory.objects.bulk_create(
+        PositionHistory(
+            portfolio_id=portfolio_id,
+            ticker_id=ticker,
+            valid_from=valid_from,
+            valid_to=valid_to,
+            shares=shares,
+        )
+        for valid_from, valid_to, shares in periods
+    )
+
+
+def has_later_actions(portfolio: StockPortfolio, snapshot_date: date) -> bool:
+    """
+    Checks if the portfolio has a transaction or a split of a transacted stock after the snapshot date.
+
+    The current positions contain every action, so they are the positions at the snapshot date only if it has none.
+    """
+
+    transactions = StockTransaction.objects.filter(portfolio=portfolio)
+
+    return (
+        transactions.filter(date__gt=snapshot_date).exists()
+        or StockSplit.objects.filter(
+            ticker__in=transactions.values("ticker"), date__gt=snapshot_date
+        ).exists()
+    )
@@ -0,0 +1,308 @@
+"""Service functions for the historical stock price related operations."""
+
+from datetime import date
+from logging import getLogger
+from os import makedirs, path, replace
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Iterable, NamedTuple, Optional, cast
+
+import numpy as np
+from django.conf import settings
+
+from ...raw_data.models import StockPrice
+from .cache import bump_shared_versions, get_shared_versions
+
+LOGGER = getLogger(__name__)
+
+# Row of the on-disk price history: the date as a proleptic Gregorian ordinal and the price.
+PRICE_HISTORY_DTYPE = np.dtype([("date", np.int64), ("value", np.float64)])
+
+
+class _PriceRow(NamedTuple):
+    """Daily prices of a single ticker from its first price to its latest one."""
+
+    # Proleptic Gregorian ordinal of the first price.
+    start: int
+    values: np.ndarray
+
+
+class PriceMatrix:
+    """
+    Dense matrix of the historical stock prices indexed by ticker and day.
+
+    Each row starts at the first price of the ticker and holds one float64 value per calendar day,
+    the days without a price (e.g. weekends) take the previous price. After the latest price
+    the latest value is used. The rows are loaded lazily when a ticker is first looked up and
+    extended incrementally when new prices are synced. Each row keeps the shared data version
+    it was loaded at, so the rows synced by another process are reloaded.
+    """
+
+    def __init__(self) -> None:
+        # pylint: disable=missing-function-docstring
+
+        self.__rows: dict[str, Optional[_PriceRow]] = {}
+        self.__versions: dict[str, str] = {}
+        self.__lock = Lock()
+
+    def load(self, tickers: Iterable[str]) -> None:
+        """Loads the rows of the tickers that are not loaded yet or outdated with a single query."""
+
+        # The versions are read before the prices, so a sync in between reloads the rows again.
+        versions = get_shared_versions("prices", set(tickers))
+        missing = {
+            ticker
+            for ticker, version in versions.items()
+            if ticker not in self.__rows or self.__versions.get(ticker) != version
+        }
+        if not missing:
+            return
+
+        LOGGER.debug("Loading the price history of %s ticker(s).", len(missing))
+
+        history: dict[str, tuple[list[int], list[float]]] = {
+            ticker: ([], []) for ticker in missing
+        }
+        for ticker, price_date, value in (
+            StockPrice.objects.filter(ticker__in=missing)
+            .order_by("ticker", "date", "id")
+            .values_list("ticker", "date", "value")
+        ):
+            history[ticker][0].append(price_date.toordinal())
+            history[ticker][1].append(value)
+
+        with self.__lock:
+            for ticker, (ordinals, values) in history.items():
+                self.__rows[ticker] = self.__build_row(ordinals, values)
+                self.__versions[ticker] = versions[ticker]
+
+    def refresh(self, ticker: str) -> None:
+        """Appends the prices synced after the latest loaded price of the ticker, if its row is loaded."""
+
+        if ticker not in self.__rows:
+            return
+
+        version = get_shared_versions("prices", [ticker])[ticker]
+        row = self.__rows[ticker]
+        prices = StockPrice.objects.filter(ticker=ticker).order_by("date", "id")
+        if row:
+            prices = prices.filter(
+                date__gt=date.fromordinal(row.start + len(row.values) - 1)
+            )
+
+        ordinals, values = [], []
+        for price_date, value in prices.values_list("date", "value"):
+            ordinals.append(price_date.toordinal())
+            values.append(value)
+
+        if not ordinals:
+            with self.__lock:
+                self.__versions[ticker] = version
+
+            return
+
+        LOGGER.debug("Appending %s price(s) to the history of %s.", len(values), ticker)
+
+        if row:
+            # The gap between the latest loaded price and the new ones is filled with the latest value.
+            ordinals.insert(0, row.start + len(row.values) - 1)
+            values.insert(0, float(row.values[-1]))
+            # The row is never empty, it starts with the latest loaded price.
+            appended = cast(_PriceRow, self.__build_row(ordinals, values))
+            row = _PriceRow(
+                row.start, np.concatenate((row.values, appended.values[1:]))
+            )
+        else:
+            row = self.__build_row(ordinals, values)
+
+        with self.__lock:
+            self.__rows[ticker] = row
+            self.__versions[ticker] = version
+
+    def price(self, ticker: str, target_date: date) -> Optional[float]:
+        """Returns the latest price of the ticker at the target date or None if it had no price yet."""
+
+        self.load([ticker])
+        row = self.__rows[ticker]
+        if not row:
+            return None
+
+        index = target_date.toordinal() - row.start
+        if index < 0:
+            return None
+
+        return float(row.values[min(index, len(row.values) - 1)])
+
+    def prices(self, tickers: list[str], series: list[date]) -> np.ndarray:
+        """
+        Returns the prices of the tickers at each date in the series as a tickers x series matrix.
+
+        The tickers without a price at a date are NaN.
+        """
+
+        self.load(tickers)
+
+        ordinals = np.array(
+            [target_date.toordinal() for target_date in series], dtype=np.int64
+        )
+        matrix = np.full((len(tickers), len(series)), np.nan, dtype=np.float64)
+        for index, ticker in enumerate(tickers):
+            row = self.__rows[ticker]
+            if not row:
+                continue
+
+            offsets = ordinals - row.start
+            valid = offsets >= 0
+            matrix[index, valid] = row.values[
+                np.minimum(offsets[valid], len(row.values) - 1)
+            ]
+
+        return matrix
+
+    def valuate(
+        self,
+        tickers: list[str],
+        shares: np.ndarray,
+        series: list[date],
+        fallback: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Returns the value of a book at each date in the series.
+
+        The shares are given as a tickers x series matrix, the positions without a price are valued
+        at the fallback prices of the same shape, or are worth 0 without them.
+        """
+
+        prices = self.prices(tickers, series)
+        if fallback is not None:
+            prices = np.where(np.isnan(prices), fallback, prices)
+
+        return np.nansum(prices * shares, axis=0)
+
+    def clear(self) -> None:
+        """Removes every loaded row."""
+
+        with self.__lock:
+            self.__rows.clear()
+            self.__versions.clear()
+
+    @staticmethod
+    def __build_row(ordinals: list[int], values: list[float]) -> Optional[_PriceRow]:
+        """Creates a daily row from the ordered prices and forward fills the days without a price."""
+
+        if not ordinals:
+            return None
+
+        start = ordinals[0]
+        offsets = np.array(ordinals, dtype=np.int64) - start
+
+        # The latest price wins if a day has more than one.
+        row = np.empty(offsets[-1] + 1, dtype=np.float64)
+        filled = np.zeros(len(row), dtype=np.int64)
+        row[offsets] = values
+        filled[offsets] = offsets
+
+        return _PriceRow(start, row[np.maximum.accumulate(filled)])
+
+
+# Price history shared by the requests of the process.
+PRICE_MATRIX = PriceMatrix()
+
+
+def get_price_matrix() -> PriceMatrix:
+    """Returns the shared price matrix or a new one for the caller if it is not kept between requests."""
+
+    return PRICE_MATRIX if settings.PRICE_MATRIX_CACHE else PriceMatrix()
+
+
+def refresh_prices(ticker: str) -> None:
+    """Extends the shared price history of the ticker after a price sync."""
+
+    # The other processes reload the row of the ticker at its next lookup.
+    bump_shared_versions("prices", [ticker])
+    PRICE_MATRIX.refresh(ticker)
+
+
+def read_price_history(ticker: str) -> Optional[np.ndarray]:
+    """
+    Returns the price history of the ticker from the on-disk store as a read-only memory-mapped array.
+
+    The file of the ticker is written on the first read. Returns None if the store is not configured
+    and the history queried from the database if the store can't be read or written.
+    """
+
+    store = settings.PRICE_STORE_PATH
+    if not store:
+        return None
+
+    file_path = __get_price_history_path(store, ticker)
+    try:
+        if not path.exists(file_path):
+            write_price_history(ticker, rebuild=True)
+
+        # The pages of the file are shared by the processes through the page cache.
+        return np.load(file_path, mmap_mode="r")
+    except OSError as error:
+        # The store is only a cache of the prices, so a broken one does not fail the request.
+        LOGGER.warning(
+            "The price history of %s can't be read from the store: %s", ticker, error
+        )
+
+        return __query_price_history(ticker)
+
+
+def write_price_history(ticker: str, rebuild: bool = False) -> int:
+    """
+    Appends the prices saved after the latest stored one to the on-disk history of the ticker.
+
+    The whole history is written if it is rebuilt or not stored yet. Returns the number of prices written.
+    """
+
+    store = settings.PRICE_STORE_PATH
+    if not store:
+        return 0
+
+    file_path = __get_price_history_path(store, ticker)
+    stored = (
+        np.load(file_path)
+        if not rebuild and path.exists(file_path)
+        else np.empty(0, dtype=PRICE_HISTORY_DTYPE)
+    )
+
+    appended = __query_price_history(
+        ticker, date.fromordinal(int(stored["date"][-1])) if stored.size else None
+    )
+    if path.exists(file_path) and not rebuild and appended.size == 0:
+        return 0
+
+    LOGGER.debug("Writing %s price(s) to the history of %s.", len(appended), ticker)
+
+    makedirs(store, exist_ok=True)
+    # The file is replaced at once, so the readers never see a partially written one.
+    with NamedTemporaryFile(dir=store, suffix=".npy", delete=False) as file:
+        np.save(file, np.concatenate((stored, appended)))
+    replace(file.name, file_path)
+
+    return len(appended)
+
+
+def __query_price_history(ticker: str, since: Optional[date] = None) -> np.ndarray:
+    """Returns the prices of the ticker after the given date from the database in the format of the store."""
+
+    prices = StockPrice.objects.filter(ticker=ticker).order_by("date", "id")
+    if since:
+        prices = prices.filter(date__gt=since)
+
+    return np.array(
+        [
+            (price_date.toordinal(), value)
+            for price_date, value in prices.values_list("date", "value")
+        ],
+        dtype=PRICE_HISTORY_DTYPE,
+    )
+
+
+def __get_price_history_path(store: str, ticker: str) -> str:
+    """Each ticker has its own file in the store."""
+
+    return path.join(store, f"{ticker}.npy")
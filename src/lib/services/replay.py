@@ -1,43 +1,242 @@
 """Base service for the replay action related operations."""
 
-from copy import deepcopy
+from copy import copy
+from dataclasses import dataclass
 from datetime import date
-from typing import Callable, TypeVar, cast
+from heapq import merge
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    TypeVar,
+    cast,
+)
 
 from ..dataclasses import DateBound
 
 T = TypeVar("T")
 U = TypeVar("U")
+S = TypeVar("S")
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class CopyOnWriteMap(Mapping[K, V], Generic[K, V]):
+    """
+    Mapping to hold the state of a replay that could be snapshotted in constant time.
+
+    Taking a snapshot shares the underlying dict with the snapshot. The next write copies
+    the dict itself (not the values) and a value is only copied when it is modified the first
+    time after a snapshot. Snapshots share every unchanged value so they must be treated as read-only.
+    """
+
+    # The mapping protocol methods are documented by the base class.
+    # pylint: disable=missing-function-docstring
+
+    __slots__ = ("_data", "_shared", "_owned")
+
+    def __init__(self, data: Optional[Mapping[K, V]] = None):
+        self._data: dict[K, V] = dict(data or {})
+        self._shared = False
+        # Keys of the values that were copied or created since the last snapshot.
+        self._owned: set[K] = set()
+
+    def __getitem__(self, key: K) -> V:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self.__detach()
+        self._data[key] = value
+        self._owned.add(key)
+
+    def __delitem__(self, key: K) -> None:
+        self.__detach()
+        del self._data[key]
+        self._owned.discard(key)
+
+    def __copy__(self) -> "CopyOnWriteMap[K, V]":
+        duplicate: CopyOnWriteMap[K, V] = CopyOnWriteMap()
+        duplicate._data = self.snapshot()
+        duplicate._shared = True
+
+        return duplicate
+
+    def __deepcopy__(self, memo) -> "CopyOnWriteMap[K, V]":
+        # The values are copied before they are modified, so sharing them is safe.
+        return self.__copy__()
+
+    def snapshot(self) -> dict[K, V]:
+        """Returns the current state as a read-only dict."""
+
+        self._shared = True
+        self._owned = set()
+
+        return self._data
+
+    def mutable(self, key: K) -> V:
+        """Returns the value for the key that could be modified without affecting the snapshots."""
+
+        if key not in self._owned:
+            self[key] = copy(self._data[key])
+
+        return self._data[key]
+
+    def __detach(self) -> None:
+        """Stops sharing the dict with the snapshots before it is modified."""
+
+        if self._shared:
+            self._data = dict(self._data)
+            self._shared = False
+
+
+def merge_actions(*sources: Iterable[U]) -> Iterator[U]:
+    """
+    Lazily merges action sources that are already ordered by date into a single date ordered stream.
+
+    Actions on the same date keep the order of the sources they come from.
+    """
+
+    return iter(merge(*sources, key=lambda action: cast(DateBound, action).date))
 
 
 def generate_snapshot_series(
     initial: T,
-    actions: list[U],
+    actions: Iterable[U],
     series: list[date],
     operation: Callable[[T, U], T],
-    take_snapshot: Callable[[T, date], T],
-) -> dict[date, T]:
-    """Base function that replays an event stream and takes snapshot at each date provided in the series parameter."""
+    take_snapshot: Callable[[T, date], S],
+) -> dict[date, S]:
+    """
+    Base function that replays an event stream and takes snapshot at each date provided in the series parameter.
+
+    The actions are consumed one by one, so they could be streamed. The initial state is shallow copied,
+    so states holding collections should use a copy-on-write map.
+    """
 
     if not series:
         return {}
 
     series = sorted(series)
-    current_state = deepcopy(initial)
+    current_state = copy(initial)
 
+    # Index of the next snapshot date to take.
+    cursor = 0
     snapshot_series = {}
     for action in actions:
         # Take a snapshot if the next action would not affect the next snapshot date.
-        while series and cast(DateBound, action).date > series[0]:
-            snapshot_date = series[0]
-            series = series[1:]
-            snapshot_series[snapshot_date] = take_snapshot(current_state, snapshot_date)
+        while cursor < len(series) and cast(DateBound, action).date > series[cursor]:
+            snapshot_series[series[cursor]] = take_snapshot(
+                current_state, series[cursor]
+            )
+            cursor += 1
 
         current_state = operation(current_state, action)
 
     # When we are done with the replay we take all the snapshots after the last action.
-    while series:
-        snapshot_date = series.pop()
+    for snapshot_date in series[cursor:]:
         snapshot_series[snapshot_date] = take_snapshot(current_state, snapshot_date)
 
     return snapshot_series
+
+
+@dataclass
+class _Reducer:
+    """Reducer registered for a fused replay."""
+
+    initial: Any
+    operation: Callable[[Any, Any], Any]
+    take_snapshot: Callable[[Any, date], Any]
+    # Only the actions that are instances of these types are passed to the operation.
+    accepts: tuple[type, ...]
+
+
+class FusedReplay:
+    """
+    Replays a single event stream through several registered reducers at once.
+
+    The reducers are applied in the order of their registration, so a reducer could read
+    the current state of the reducers registered before it.
+    """
+
+    def __init__(self) -> None:
+        # pylint: disable=missing-function-docstring
+
+        self.__reducers: dict[str, _Reducer] = {}
+        self.__states: dict[str, Any] = {}
+
+    def register(
+        self,
+        name: str,
+        initial: T,
+        operation: Callable[[T, U], T],
+        take_snapshot: Callable[[T, date], S],
+        accepts: tuple[type, ...],
+    ) -> None:
+        """Registers a reducer for the actions that are instances of the accepted types."""
+
+        # pylint: disable=too-many-arguments
+
+        if name in self.__reducers:
+            raise Exception(f"Reducer {name} is already registered.")
+
+        self.__reducers[name] = _Reducer(initial, operation, take_snapshot, accepts)
+
+    def state(self, name: str) -> Any:
+        """Returns the current state of a reducer during the replay."""
+
+        return self.__states[name]
+
+    def run(
+        self, actions: Iterable[Any], series: list[date]
+    ) -> dict[str, dict[date, Any]]:
+        """Replays the actions and takes a snapshot of every reducer at each date in the series."""
+
+        series = sorted(series)
+        self.__states = {
+            name: copy(reducer.initial) for name, reducer in self.__reducers.items()
+        }
+        snapshot_series: dict[str, dict[date, Any]] = {
+            name: {} for name in self.__reducers
+        }
+
+        if not series:
+            return snapshot_series
+
+        cursor = 0
+        for action in actions:
+            # Take a snapshot if the next action would not affect the next snapshot date.
+            while (
+                cursor < len(series) and cast(DateBound, action).date > series[cursor]
+            ):
+                self.__take_snapshots(snapshot_series, series[cursor])
+                cursor += 1
+
+            for name, reducer in self.__reducers.items():
+                if isinstance(action, reducer.accepts):
+                    self.__states[name] = reducer.operation(self.__states[name], action)
+
+        # When we are done with the replay we take all the snapshots after the last action.
+        for snapshot_date in series[cursor:]:
+            self.__take_snapshots(snapshot_series, snapshot_date)
+
+        return snapshot_series
+
+    def __take_snapshots(
+        self, snapshot_series: dict[str, dict[date, Any]], snapshot_date: date
+    ) -> None:
+        """Takes a snapshot of every reducer at the snapshot date."""
+
+        for name, reducer in self.__reducers.items():
+            snapshot_series[name][snapshot_date] = reducer.take_snapshot(
+                self.__states[name], snapshot_date
+            )
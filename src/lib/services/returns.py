@@ -0,0 +1,171 @@
+"""
+Vectorized return calculations on the period values and cash flows of portfolios or positions.
+
+Every function works on the last axis, so many portfolios or positions are calculated at once
+by passing a matrix with one row per portfolio or position.
+"""
+
+from logging import getLogger
+from typing import Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from numpy.typing import ArrayLike
+
+LOGGER = getLogger(__name__)
+
+DAYS_IN_YEAR = 365
+
+# Bracket of the annual rates searched by the XIRR solver.
+XIRR_BRACKET = (-0.999999, 1_000.0)
+
+
+def period_returns(
+    base_values: ArrayLike, end_values: ArrayLike, cash_flows: ArrayLike
+) -> np.ndarray:
+    """
+    Return of each period, where the cash flow of a period is part of its invested capital.
+
+    The periods without invested capital have no return.
+    """
+
+    base_values = np.asarray(base_values, dtype=np.float64)
+    invested = base_values + np.asarray(cash_flows, dtype=np.float64)
+    end_values = np.asarray(end_values, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = end_values / invested - 1
+
+    return np.where((base_values != 0) & (invested != 0), returns, 0.0)
+
+
+def time_weighted_return(returns: ArrayLike) -> Union[np.ndarray, float]:
+    """Chain links the period returns into the time weighted return."""
+
+    return __unwrap(np.prod(1 + np.asarray(returns, dtype=np.float64), axis=-1) - 1)
+
+
+def cumulative_returns(returns: ArrayLike) -> np.ndarray:
+    """Time weighted return from the first period until the end of each period."""
+
+    return np.cumprod(1 + np.asarray(returns, dtype=np.float64), axis=-1) - 1
+
+
+def rolling_returns(returns: ArrayLike, window: int) -> np.ndarray:
+    """
+    Time weighted return of every window of consecutive periods.
+
+    The result of a window is at the index of its last period, the periods before the first full window are NaN.
+    """
+
+    returns = np.asarray(returns, dtype=np.float64)
+    if window < 1 or window > returns.shape[-1]:
+        return np.full(returns.shape, np.nan, dtype=np.float64)
+
+    windows = np.prod(sliding_window_view(1 + returns, window, axis=-1), axis=-1) - 1
+
+    return np.concatenate(
+        (np.full(returns.shape[:-1] + (window - 1,), np.nan), windows), axis=-1
+    )
+
+
+def rri(
+    periods: ArrayLike, present_value: ArrayLike, future_value: ArrayLike
+) -> Union[np.ndarray, float]:
+    """
+    Rate of investment return.
+    Calculate Compound Annual Growth Rate (CAGR).
+
+    Rounding to four precision to avoid floating point math error.
+    """
+
+    LOGGER.debug("Calculating rate of investment return.")
+
+    periods = np.asarray(periods, dtype=np.float64)
+    present_value = np.asarray(present_value, dtype=np.float64)
+    future_value = np.asarray(future_value, dtype=np.float64)
+
+    # We can't interpret zero period count or zero starting capital.
+    # In these cases the return is 0.
+    valid = (periods != 0) & (present_value != 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = (future_value / present_value) ** (1 / periods) - 1
+
+    return __unwrap(np.round(np.where(valid, rates, 0.0), 4))
+
+
+def xirr(
+    amounts: ArrayLike,
+    days: ArrayLike,
+    tolerance: float = 1e-9,
+    max_iterations: int = 100,
+) -> Union[np.ndarray, float]:
+    """
+    Money weighted annual return of the cash flows, the rate where their net present value is zero.
+
+    The amounts are seen by the investor, so the invested capital is negative and the withdrawals and
+    the final value are positive. The days are counted from any common day, they can be shared by the rows.
+    Every row is solved at once with a Newton iteration that falls back to bisection when a step leaves
+    the bracket of the root. The rows without a root in the bracket are NaN.
+    """
+
+    # pylint: disable=too-many-locals
+
+    single = np.ndim(amounts) == 1
+    flows = np.atleast_2d(np.asarray(amounts, dtype=np.float64))
+    days = np.asarray(days, dtype=np.float64)
+    years = np.broadcast_to(
+        (days - days.min(axis=-1, keepdims=True)) / DAYS_IN_YEAR, flows.shape
+    )
+
+    def npv(rates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            discounted = flows * (1 + rates[:, None]) ** -years
+
+            return (
+                discounted.sum(axis=-1),
+                (-years * discounted / (1 + rates[:, None])).sum(axis=-1),
+            )
+
+    lower = np.full(len(flows), XIRR_BRACKET[0])
+    upper = np.full(len(flows), XIRR_BRACKET[1])
+    lower_sign = np.sign(npv(lower)[0])
+    solvable = lower_sign * np.sign(npv(upper)[0]) < 0
+
+    rates = np.full(len(flows), 0.1)
+    converged = ~solvable
+    for _ in range(max_iterations):
+        values, derivatives = npv(rates)
+        converged |= np.abs(values) < tolerance
+        if converged.all():
+            break
+
+        # The bracket is narrowed to the side of the root.
+        below = np.sign(values) == lower_sign
+        lower = np.where(below & ~converged, rates, lower)
+        upper = np.where(~below & ~converged, rates, upper)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            steps = rates - values / derivatives
+        steps = np.where(
+            np.isfinite(steps) & (steps > lower) & (steps < upper),
+            steps,
+            (lower + upper) / 2,
+        )
+
+        converged |= np.abs(steps - rates) < tolerance
+        rates = np.where(converged, rates, steps)
+
+    if not converged.all():
+        LOGGER.warning("XIRR did not converge for %s row(s).", (~converged).sum())
+
+    rates = np.where(solvable & converged, rates, np.nan)
+
+    return float(rates[0]) if single else rates
+
+
+def __unwrap(values: np.ndarray) -> Union[np.ndarray, float]:
+    """Scalar results are returned as float."""
+
+    return float(values) if values.ndim == 0 else values
@@ -1,91 +1,133 @@
 """Service functions for stock portfolio related operations."""
 
-from copy import deepcopy
-from datetime import date
+from dataclasses import replace
+from datetime import date, timedelta
 from logging import getLogger
-from typing import Optional
+from math import isnan
+from typing import Callable, Iterable, Optional
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import Q, QuerySet
 
 from ...raw_data.models import StockDividend, StockPrice, StockSplit
 from ...stocks.models import Stock, StockPortfolio
 from ...transactions.models import StockTransaction
-from ..dataclasses import StockPortfolioSnapshot, StockPositionSnapshot
-from .replay import generate_snapshot_series
+from ..dataclasses import (
+    Interval,
+    SnapshotSeries,
+    StockPortfolioSnapshot,
+    StockPositionSnapshot,
+)
+from .cache import LRUCache, bump_shared_versions, get_shared_versions
+from .columnar import load_actions, replay_portfolio
+from .checkpoints import get_latest_checkpoint, restore_positions, save_checkpoints
+from .date import get_month_ends
+from .events import SplitEvent, TransactionEvent, stream_events
+from .positions import (
+    PositionTimeline,
+    get_current_positions,
+    has_later_actions,
+    save_current_position,
+    save_position_history,
+)
+from .prices import get_price_matrix
+from .replay import CopyOnWriteMap, generate_snapshot_series, merge_actions
 
 LOGGER = getLogger(__name__)
 
+# Returns the latest price (if any) and the latest dividend for a ticker.
+Quote = Callable[[str], tuple[Optional[float], float]]
 
-def get_portfolio(
-    actions: list[StockTransaction | StockSplit],
-    series: list[date],
-    owner: User,
-) -> dict[date, StockPortfolioSnapshot]:
-    """Creates a timeseries from the portfolio at each date in the series."""
+# The latest price (if any) and the latest dividend by ticker.
+Quotes = dict[str, tuple[Optional[float], float]]
 
-    LOGGER.debug(
-        "Generate series for %s actions(s) at %s snapshot date(s) for a portfolio.",
-        len(actions),
-        len(series),
-    )
+# The latest quotes by ticker and snapshot date.
+QUOTE_CACHE: LRUCache[tuple[str, str, date], tuple[Optional[float], float]] = LRUCache(
+    size_setting="QUOTE_CACHE_SIZE", ttl_setting="QUOTE_CACHE_TTL"
+)
 
-    series = sorted(series)
-    if not series:
-        return {}
 
-    last_snapshot_date = series[-1]
+class StockLookup(dict[str, Stock]):
+    """Stocks of the replayed positions by ticker, the ones that were not prefetched are queried on first use."""
 
-    def sum_portfolio(
-        snapshot: StockPortfolioSnapshot, action: StockTransaction | StockSplit
-    ):
-        ticker = action.ticker.ticker
-        positions = snapshot.positions
+    # The mapping protocol methods are documented by the base class.
+    # pylint: disable=missing-function-docstring
 
-        if isinstance(action, StockTransaction) and ticker not in positions:
-            latest_price = __get_latest_stock_price(ticker, last_snapshot_date)
-            latest_dividend = __get_latest_dividend(ticker, last_snapshot_date)
+    def __init__(self, stocks: Iterable[Stock] = ()):
+        super().__init__((stock.ticker, stock) for stock in stocks)
 
-            # In this situation we consider a negative or zero value a spinoff sellout.
-            if action.amount > 0:
-                positions[ticker] = __create_position(
-                    action, latest_price, latest_dividend
-                )
-        elif isinstance(action, StockTransaction) and ticker in positions:
-            updated_position = __update_position(positions[ticker], action)
-            positions[ticker] = updated_position
+    def __missing__(self, ticker: str) -> Stock:
+        self[ticker] = Stock.objects.get(ticker=ticker)
 
-            if updated_position.shares == 0:
-                del positions[ticker]
-            elif updated_position.shares < 0:
-                raise Exception("Negative position size is not allowed.")
-        elif isinstance(action, StockSplit) and ticker in positions:
-            split_position = __split_position(positions[ticker], action)
-            positions[ticker] = split_position
+        return self[ticker]
 
-        return snapshot
 
-    def take_snapshot(
-        snapshot: StockPortfolioSnapshot, snapshot_date: date
-    ) -> StockPortfolioSnapshot:
-        return StockPortfolioSnapshot(
-            positions=deepcopy(snapshot.positions),
-            date=snapshot_date,
-            owner=owner,
+def get_portfolio(
+    actions: Iterable[TransactionEvent | SplitEvent],
+    series: list[date],
+    owner: User,
+    tickers: Optional[Iterable[str] | QuerySet] = None,
+) -> SnapshotSeries:
+    """
+    Creates a timeseries from the portfolio at each date in the series.
+
+    The actions must be ordered by date, they are consumed in a single pass. The latest quotes of
+    the transacted tickers are prefetched before the replay. The tickers could be provided
+    (e.g. as a subquery), otherwise the actions are loaded first to find them.
+    Each snapshot is valued at the prices of its own date.
+    """
+
+    LOGGER.debug("Generate series at %s snapshot date(s) for a portfolio.", len(series))
+
+    series = sorted(series)
+    if not series:
+        return SnapshotSeries()
+
+    if settings.REPLAY_ENGINE == "columnar":
+        columns = load_actions(actions)
+        get_quote = __get_quote_lookup(
+            get_latest_quotes(
+                columns.tickers if tickers is None else tickers, series[-1]
+            )
         )
 
-    return generate_snapshot_series(
-        initial=StockPortfolioSnapshot(positions={}, date=date.today(), owner=owner),
-        actions=actions,
-        series=series,
-        operation=sum_portfolio,
-        take_snapshot=take_snapshot,
+        return __price_snapshots(replay_portfolio(columns, series, owner, get_quote))
+
+    if tickers is None:
+        actions = list(actions)
+        tickers = {
+            action.ticker_id
+            for action in actions
+            if isinstance(action, TransactionEvent)
+        }
+
+    get_quote = __get_quote_lookup(get_latest_quotes(tickers, series[-1]))
+    stocks = StockLookup(
+        Stock.objects.filter(
+            ticker__in=tickers.values("ticker")
+            # The QuerySet of the stubs is a parameterized alias of the runtime class.
+            if isinstance(tickers, QuerySet)  # type: ignore[misc]
+            else tickers
+        )
+    )
+
+    return __price_snapshots(
+        __replay_portfolio(actions, series, owner, get_quote=get_quote, stocks=stocks)
     )
 
 
 def get_portfolio_snapshot(
     portfolios: list[StockPortfolio], snapshot_date: date = date.today()
 ) -> StockPortfolioSnapshot:
-    """Summarizes the positions by ticker for each snapshot date."""
+    """
+    Summarizes the positions by ticker for each snapshot date.
+
+    The replay starts from the latest checkpoint before the snapshot date and only the
+    later actions are applied. Checkpoints are saved for the month ends passed during the replay.
+    The current positions of a single portfolio are read without a replay from today on,
+    unless it has actions after the snapshot date.
+    """
 
     LOGGER.debug(
         "Calculate portfolio snapshot for %s portfolio at %s.",
@@ -93,13 +135,24 @@ def get_portfolio_snapshot(
         snapshot_date,
     )
 
-    transactions = StockTransaction.objects.filter(
-        portfolio__in=portfolios, date__lte=snapshot_date
-    )
-    splits = StockSplit.objects.filter(date__lte=snapshot_date)
-    actions = sorted([*transactions, *splits], key=lambda x: x.date)
+    if (
+        len(portfolios) == 1
+        and snapshot_date >= date.today()
+        and not has_later_actions(portfolios[0], snapshot_date)
+    ):
+        LOGGER.debug("Reading the current positions of the portfolio.")
+
+        return valuate_snapshots(
+            [
+                StockPortfolioSnapshot(
+                    positions=get_current_positions(portfolios[0]),
+                    date=snapshot_date,
+                    owner=portfolios[0].owner,
+                )
+            ]
+        )[0]
 
-    return get_portfolio(actions, [snapshot_date], portfolios[0].owner)[snapshot_date]
+    return __replay_book(portfolios, snapshot_date)
 
 
 def get_all_stocks_since_inceptions(
@@ -129,41 +182,397 @@ def get_first_transaction(portfolios: list[StockPortfolio]):
     )
 
 
-def __get_latest_stock_price(ticker: Stock, snapshot_date: date) -> Optional[float]:
-    """Queries the latest stock price info for the stock."""
+def get_latest_quotes(tickers: Iterable[str] | QuerySet, snapshot_date: date) -> Quotes:
+    """
+    Returns the latest price and dividend info of every ticker as of the snapshot date.
 
-    try:
-        return (
-            StockPrice.objects.filter(ticker=ticker, date__lte=snapshot_date)
-            .latest("date")
-            .value
+    The quotes are cached by ticker, shared data version and date, the missing ones are queried
+    once per table for all the tickers. The tickers could also be given as a queryset with a ticker field.
+    The tickers without any price info have no price and the ones without dividends pay 0.
+    """
+
+    if isinstance(tickers, QuerySet):  # type: ignore[misc]
+        tickers = tickers.values_list("ticker", flat=True)
+
+    # The quotes synced by another process are not served from the cache of this one.
+    versions = get_shared_versions("quotes", set(tickers))
+
+    quotes: Quotes = {}
+    missing = []
+    for ticker, version in versions.items():
+        quote = QUOTE_CACHE.get((ticker, version, snapshot_date))
+        if quote is None:
+            missing.append(ticker)
+        else:
+            quotes[ticker] = quote
+
+    if not missing:
+        return quotes
+
+    LOGGER.debug("Querying the latest quotes of %s ticker(s).", len(missing))
+
+    prices = dict(
+        StockPrice.objects.filter(ticker__in=missing, date__lte=snapshot_date)
+        .order_by("ticker", "-date", "id")
+        .distinct("ticker")
+        .values_list("ticker", "value")
+    )
+    dividends = dict(
+        StockDividend.objects.filter(ticker__in=missing, date__lte=snapshot_date)
+        .order_by("ticker", "-date", "id")
+        .distinct("ticker")
+        .values_list("ticker", "amount")
+    )
+
+    for ticker in missing:
+        quotes[ticker] = (prices.get(ticker), dividends.get(ticker, 0.0))
+        QUOTE_CACHE.set((ticker, versions[ticker], snapshot_date), quotes[ticker])
+
+    return quotes
+
+
+def invalidate_quotes(ticker: str) -> None:
+    """Removes the cached quotes of the ticker after its price or dividend info was synced."""
+
+    LOGGER.debug("Invalidating the cached quotes of %s.", ticker)
+
+    # The other processes skip their cached quotes of the previous version.
+    bump_shared_versions("quotes", [ticker])
+    QUOTE_CACHE.invalidate(lambda key: key[0] == ticker)
+
+
+def replay_current_positions(
+    portfolio: StockPortfolio,
+) -> tuple[dict[str, StockPositionSnapshot], PositionTimeline]:
+    """
+    Replays every transaction and split of the portfolio without quotes, regardless of their date.
+
+    Returns the positions after the last action and the timeline of the share counts.
+    """
+
+    transactions = StockTransaction.objects.filter(portfolio=portfolio)
+    actions = list(
+        merge_actions(
+            stream_events(transactions),
+            stream_events(
+                StockSplit.objects.filter(ticker__in=transactions.values("ticker"))
+            ),
         )
-    except StockPrice.DoesNotExist:
-        return None
+    )
+    stocks = StockLookup(Stock.objects.filter(ticker__in=transactions.values("ticker")))
 
+    return __replay_positions(actions, stocks), PositionTimeline(actions)
 
-def __get_latest_dividend(ticker: Stock, snapshot_date: date) -> float:
-    """Queries for the latest dividend info for the stock."""
+
+def refresh_current_position(
+    portfolio_id: int, ticker: str, excluded: Optional[int] = None
+) -> None:
+    """
+    Replays the transactions of the stock in the portfolio with its splits and stores the resulting position
+    and the history of its share count.
+
+    The positions of the stocks are independent, so only the actions of the stock are replayed.
+    The excluded transaction is left out, e.g. when it is moved to another portfolio or stock.
+    """
+
+    transactions = StockTransaction.objects.filter(
+        portfolio=portfolio_id, ticker=ticker
+    )
+    if excluded is not None:
+        transactions = transactions.exclude(pk=excluded)
+
+    actions = list(
+        merge_actions(
+            stream_events(transactions),
+            stream_events(StockSplit.objects.filter(ticker=ticker)),
+        )
+    )
 
     try:
-        latest_dividend_date = (
-            StockDividend.objects.filter(ticker=ticker, date__lte=snapshot_date)
-            .latest("date")
-            .date
+        positions = __replay_positions(
+            actions, StockLookup(Stock.objects.filter(ticker=ticker))
+        )
+        periods = PositionTimeline(actions).periods(ticker)
+    except Exception as error:  # pylint: disable=broad-except
+        # The replays of the portfolio fail the same way, the write itself is still accepted.
+        LOGGER.warning(
+            "The position of %s in %s can't be replayed: %s",
+            ticker,
+            portfolio_id,
+            error,
         )
+        positions, periods = {}, []
+
+    save_current_position(portfolio_id, ticker, positions.get(ticker))
+    save_position_history(portfolio_id, ticker, periods)
+
+
+def refresh_stock_positions(ticker: str) -> None:
+    """Refreshes the current position of the stock in every portfolio that transacted it, e.g. after a split."""
+
+    portfolio_ids = (
+        StockTransaction.objects.filter(ticker=ticker)
+        .order_by()
+        .values_list("portfolio_id", flat=True)
+        .distinct()
+    )
+
+    for portfolio_id in portfolio_ids:
+        refresh_current_position(portfolio_id, ticker)
+
+
+def apply_stock_action(
+    positions: CopyOnWriteMap[str, StockPositionSnapshot],
+    action: TransactionEvent | SplitEvent,
+    get_quote: Quote = lambda ticker: (None, 0.0),
+    stocks: Optional[StockLookup] = None,
+) -> CopyOnWriteMap[str, StockPositionSnapshot]:
+    """
+    Applies a single transaction or split on the positions of a book.
+
+    Without quotes the price of a position is its opening price, see valuate_snapshots.
+    The stock of an opened position is looked up in the stocks, or queried if they are not given.
+    """
+
+    ticker = action.ticker_id
+
+    if isinstance(action, TransactionEvent) and ticker not in positions:
+        latest_price, latest_dividend = get_quote(ticker)
+
+        # In this situation we consider a negative or zero value a spinoff sellout.
+        if action.amount > 0:
+            positions[ticker] = __create_position(
+                action,
+                (stocks if stocks is not None else StockLookup())[ticker],
+                latest_price,
+                latest_dividend,
+            )
+    elif isinstance(action, TransactionEvent) and ticker in positions:
+        updated_position = __update_position(positions.mutable(ticker), action)
+
+        if updated_position.shares == 0:
+            del positions[ticker]
+        elif updated_position.shares < 0:
+            raise Exception("Negative position size is not allowed.")
+    elif isinstance(action, SplitEvent) and ticker in positions:
+        __split_position(positions.mutable(ticker), action)
+
+    return positions
+
+
+def valuate_snapshots(
+    books: list[StockPortfolioSnapshot],
+) -> list[StockPortfolioSnapshot]:
+    """
+    Attaches the price and dividend information as of the snapshot date to portfolios
+    that were replayed without quotes.
+    """
+
+    tickers = set().union(*(book.positions for book in books))
+    snapshot_date = books[0].date if books else date.today()
+
+    splits = StockSplit.objects.filter(
+        ticker__in=tickers, date__lte=snapshot_date
+    ).order_by("date", "id")
+    get_quote = __get_quote_lookup(get_latest_quotes(tickers, snapshot_date))
+
+    valuated = []
+    for book in books:
+        positions = {}
+        for ticker, position in book.positions.items():
+            latest_price, dividend = get_quote(ticker)
+            dividend *= 4
+
+            # The dividend info is adjusted by every split since the position was opened.
+            for split in splits:
+                if (
+                    split.ticker_id == ticker
+                    and split.date >= position.first_purchase_date
+                ):
+                    dividend /= split.ratio
+
+            positions[ticker] = StockPositionSnapshot(
+                stock=position.stock,
+                shares=position.shares,
+                price=latest_price or position.price,
+                dividend=dividend,
+                purchase_price=position.purchase_price,
+                first_purchase_date=position.first_purchase_date,
+                latest_purchase_date=position.latest_purchase_date,
+            )
+
+        valuated.append(
+            StockPortfolioSnapshot(
+                positions=positions, date=book.date, owner=book.owner
+            )
+        )
+
+    return valuated
+
+
+def __replay_book(
+    portfolios: list[StockPortfolio], snapshot_date: date
+) -> StockPortfolioSnapshot:
+    """
+    Replays the stock transactions of the portfolios together as a single book of positions.
+
+    The replay resumes from the latest checkpoint of the portfolios and saves the month ends it passes.
+    """
+
+    owner = portfolios[0].owner
+    checkpoint = get_latest_checkpoint(portfolios, snapshot_date)
+
+    transactions = StockTransaction.objects.filter(
+        portfolio__in=portfolios, date__lte=snapshot_date
+    )
+    # Only the splits of the transacted stocks could affect the positions.
+    splits = StockSplit.objects.filter(
+        ticker__in=transactions.values("ticker"), date__lte=snapshot_date
+    )
+    stocks = StockLookup(
+        Stock.objects.filter(
+            Q(ticker__in=transactions.values("ticker"))
+            | Q(ticker__in=checkpoint.positions if checkpoint else [])
+        )
+    )
+
+    if checkpoint:
+        LOGGER.debug("Resuming the replay from the checkpoint at %s.", checkpoint.date)
+        transactions = transactions.filter(date__gt=checkpoint.date)
+        splits = splits.filter(date__gt=checkpoint.date)
+        replay_start = checkpoint.date + timedelta(days=1)
+    else:
+        first_transaction = get_first_transaction(portfolios)
+        replay_start = first_transaction.date if first_transaction else snapshot_date
+
+    # We don't save checkpoints for the future as those could still change.
+    checkpoint_end = min(snapshot_date, date.today())
+    checkpoint_dates = (
+        get_month_ends(Interval(replay_start, checkpoint_end))
+        if replay_start < checkpoint_end
+        else []
+    )
+
+    def apply_action(
+        positions: CopyOnWriteMap[str, StockPositionSnapshot],
+        action: TransactionEvent | SplitEvent,
+    ) -> CopyOnWriteMap[str, StockPositionSnapshot]:
+        # The positions are replayed without quotes, so the price of a position is its opening price
+        # and the valuation as of the snapshot date is attached at the end.
+        return apply_stock_action(positions, action, stocks=stocks)
+
+    def take_snapshot(
+        positions: CopyOnWriteMap[str, StockPositionSnapshot], target_date: date
+    ) -> StockPortfolioSnapshot:
+        return StockPortfolioSnapshot(
+            positions=positions.snapshot(), date=target_date, owner=owner
+        )
+
+    series = generate_snapshot_series(
+        initial=CopyOnWriteMap(
+            restore_positions(checkpoint, stocks) if checkpoint else {}
+        ),
+        actions=merge_actions(stream_events(transactions), stream_events(splits)),
+        series=list({snapshot_date, *checkpoint_dates}),
+        operation=apply_action,
+        take_snapshot=take_snapshot,
+    )
+
+    save_checkpoints(
+        portfolios, [series[checkpoint_date] for checkpoint_date in checkpoint_dates]
+    )
+
+    return valuate_snapshots([series[snapshot_date]])[0]
+
+
+def __replay_portfolio(
+    actions: Iterable[TransactionEvent | SplitEvent],
+    series: list[date],
+    owner: User,
+    get_quote: Quote,
+    stocks: StockLookup,
+) -> dict[date, StockPortfolioSnapshot]:
+    """Replays the actions and takes a snapshot at each date in the series."""
+
+    def sum_portfolio(
+        positions: CopyOnWriteMap[str, StockPositionSnapshot],
+        action: TransactionEvent | SplitEvent,
+    ) -> CopyOnWriteMap[str, StockPositionSnapshot]:
+        return apply_stock_action(positions, action, get_quote, stocks)
+
+    def take_snapshot(
+        positions: CopyOnWriteMap[str, StockPositionSnapshot], snapshot_date: date
+    ) -> StockPortfolioSnapshot:
+        return StockPortfolioSnapshot(
+            positions=positions.snapshot(),
+            date=snapshot_date,
+            owner=owner,
+        )
+
+    positions: CopyOnWriteMap[str, StockPositionSnapshot] = CopyOnWriteMap()
+
+    return generate_snapshot_series(
+        initial=positions,
+        actions=actions,
+        series=series,
+        operation=sum_portfolio,
+        take_snapshot=take_snapshot,
+    )
+
+
+def __replay_positions(
+    actions: Iterable[TransactionEvent | SplitEvent], stocks: StockLookup
+) -> dict[str, StockPositionSnapshot]:
+    """Replays the date ordered actions without quotes and returns the positions after the last one."""
+
+    positions: CopyOnWriteMap[str, StockPositionSnapshot] = CopyOnWriteMap()
+    for action in actions:
+        apply_stock_action(positions, action, stocks=stocks)
+
+    return positions.snapshot()
+
+
+def __price_snapshots(snapshots: dict[date, StockPortfolioSnapshot]) -> SnapshotSeries:
+    """
+    Values the positions of each snapshot at the price of the snapshot date.
+
+    The positions without a price at that date keep the price they were replayed with.
+    """
+
+    tickers = sorted(
+        set().union(*(snapshot.positions for snapshot in snapshots.values()))
+    )
+    if not tickers:
+        return SnapshotSeries(snapshots)
+
+    rows = {ticker: index for index, ticker in enumerate(tickers)}
+    prices = get_price_matrix().prices(tickers, list(snapshots)).tolist()
+
+    for column, snapshot in enumerate(snapshots.values()):
+        # The positions are shared between the snapshots, so the repriced ones are copies.
+        positions = {}
+        for ticker, position in snapshot.positions.items():
+            price = prices[rows[ticker]][column]
+            positions[ticker] = (
+                position
+                if isnan(price) or price == position.price
+                else replace(position, price=price)
+            )
+
+        snapshot.positions = positions
+
+    return SnapshotSeries(snapshots)
+
 
-        return StockDividend.objects.filter(ticker=ticker, date=latest_dividend_date)[
-            0
-        ].amount
+def __get_quote_lookup(quotes: Quotes) -> Quote:
+    """Looks up the prefetched quotes, the stocks without any info have no price and pay no dividend."""
 
-    except StockDividend.DoesNotExist:
-        # It is possible that the stock doesn't pay dividend
-        # in that case we just return 0.
-        return 0.0
+    return lambda ticker: quotes.get(ticker, (None, 0.0))
 
 
 def __create_position(
-    transaction: StockTransaction,
+    transaction: TransactionEvent,
+    stock: Stock,
     latest_price: Optional[float],
     latest_dividend: float,
 ) -> StockPositionSnapshot:
@@ -172,7 +581,7 @@ def __create_position(
     # The dividend info is multiplied by 4 to project the latest quarterly
     # value to the next year.
     return StockPositionSnapshot(
-        stock=transaction.ticker,
+        stock=stock,
         shares=transaction.amount,
         price=latest_price or transaction.price,
         dividend=latest_dividend * 4,
@@ -183,7 +592,7 @@ def __create_position(
 
 
 def __update_position(
-    current_position: StockPositionSnapshot, transaction: StockTransaction
+    current_position: StockPositionSnapshot, transaction: TransactionEvent
 ) -> StockPositionSnapshot:
     """Helper function to update a position entity."""
 
@@ -208,7 +617,7 @@ def __update_position(
 
 
 def __split_position(
-    current_position: StockPositionSnapshot, split: StockSplit
+    current_position: StockPositionSnapshot, split: SplitEvent
 ) -> StockPositionSnapshot:
     """Helper function to split a position entity."""
 
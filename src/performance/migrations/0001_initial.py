@@ -0,0 +1,59 @@
+# Generated by Django 4.0.5 on 2026-10-17 05:20
+
+# pylint: disable=missing-module-docstring, invalid-name, missing-class-docstring
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("stocks", "0008_position_history"),
+    ]
+
+    operations = [
+        # The schemas of the other apps are created with the database, this one is added to existing databases.
+        migrations.RunSQL(
+            "CREATE SCHEMA IF NOT EXISTS performance", migrations.RunSQL.noop
+        ),
+        migrations.CreateModel(
+            name="PortfolioNav",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("assets_under_management", models.FloatField()),
+                ("cash_flow", models.FloatField()),
+                ("dividends", models.FloatField()),
+                ("invested_capital", models.FloatField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "portfolio",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="stocks.stockportfolio",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": '"performance"."portfolio_nav"',
+                "ordering": ["date"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="portfolionav",
+            constraint=models.UniqueConstraint(
+                fields=("portfolio", "date"), name="unique portfolio nav"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+"""Models related to the performance schema."""
+
+from django.db.models import (
+    CASCADE,
+    DateField,
+    DateTimeField,
+    FloatField,
+    ForeignKey,
+    Model,
+    UniqueConstraint,
+)
+
+from ..stocks.models import StockPortfolio
+
+
+class PortfolioNav(Model):
+    """
+    Represents the materialized net asset value of a portfolio at the end of a day in USD.
+
+    The cash flow and the dividends are the amounts of the day, the invested capital is the sum of
+    every cash flow until the end of the day. The days are filled by the materialize_nav command
+    and removed by the signal handlers when an event changes them.
+    """
+
+    portfolio: ForeignKey = ForeignKey(StockPortfolio, CASCADE)
+    date: DateField = DateField()
+    assets_under_management: FloatField = FloatField()
+    cash_flow: FloatField = FloatField()
+    dividends: FloatField = FloatField()
+    invested_capital: FloatField = FloatField()
+
+    created_at: DateTimeField = DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = '"performance"."portfolio_nav"'
+        ordering = ["date"]
+        constraints = [
+            UniqueConstraint(fields=["portfolio", "date"], name="unique portfolio nav")
+        ]
+
+    def __str__(self):
+        # pylint: disable=no-member
+
+        return f"{self.portfolio_id} - {self.date}"
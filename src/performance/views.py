@@ -1,5 +1,6 @@
 """Business logic for the performance module."""
 
+from datetime import date
 from logging import getLogger
 from typing import cast
 
@@ -10,16 +11,28 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from ..lib.helpers import get_range
+from ..lib.dataclasses import PerformanceSnapshot
+from ..lib.enums import Resolution
+from ..lib.helpers import get_points, get_range
 from ..lib.services.date import get_resolution, get_timeseries
+from ..lib.services.downsample import downsample_performance
+from ..lib.services.events import (
+    load_dividend_events,
+    load_price_events,
+    load_transaction_events,
+    stream_events,
+)
+from ..lib.services.nav import get_portfolio_nav
 from ..lib.services.performance import (
-    get_portfolio_performance,
+    get_nav_performance,
     get_position_performance,
+    get_returns,
+    get_summary_performance,
 )
+from ..lib.services.performance_cache import get_cached_performance
 from ..lib.services.stocks import get_portfolio
-from ..raw_data.models import StockDividend, StockPrice
 from ..stocks.models import StockPortfolio
-from ..transactions.models import CashTransaction, StockTransaction
+from ..transactions.models import StockTransaction
 from .serializers import PerformanceSnapshotSerializer
 
 LOGGER = getLogger(__name__)
@@ -34,33 +47,46 @@ class PositionPerformanceView(APIView):
         """Timeseries of performance snapshot for a single position."""
 
         interval = get_range(request)
-        series = get_timeseries(interval, get_resolution(interval))
+        points = get_points(request)
+        # The daily series is downsampled to the requested number of points.
+        resolution = Resolution.DAY if points else get_resolution(interval)
+        series = get_timeseries(interval, resolution)
 
         portfolio = get_object_or_404(StockPortfolio, pk=pk)
-        stock_transactions = StockTransaction.objects.filter(portfolio=portfolio)
-        portfolio_snapshots = get_portfolio(
-            cast(list, stock_transactions),
-            series,
-            cast(User, request.user),
-        )
-
-        if not portfolio_snapshots:
-            raise NotFound("Position was not present in this portfolio.")
-
-        price_info = StockPrice.objects.filter(ticker=ticker)
-        dividends = StockDividend.objects.filter(ticker=ticker)
 
-        performance = get_position_performance(
-            portfolio_snapshots=portfolio_snapshots,
-            price_info=cast(list, price_info),
-            dividends=cast(list, dividends),
-            transactions=cast(list, stock_transactions),
-            series=series,
+        def calculate() -> dict[date, PerformanceSnapshot]:
+            stock_transactions = StockTransaction.objects.filter(portfolio=portfolio)
+            portfolio_snapshots = get_portfolio(
+                stream_events(stock_transactions),
+                series,
+                cast(User, request.user),
+                tickers=stock_transactions.values("ticker"),
+            )
+
+            if not portfolio_snapshots:
+                raise NotFound("Position was not present in this portfolio.")
+
+            # Only the rows of the position within the interval are loaded.
+            return get_position_performance(
+                portfolio_snapshots=portfolio_snapshots,
+                price_info=load_price_events(ticker, interval),
+                dividends=load_dividend_events(ticker, interval),
+                transactions=load_transaction_events(portfolio, ticker, interval),
+                series=series,
+            )
+
+        performance = get_cached_performance(
+            portfolio.id, ticker, interval, resolution, calculate  # type: ignore
         )
 
+        # The returns are calculated from the whole series before it is downsampled.
+        returns = get_returns(performance)
+        if points:
+            performance = downsample_performance(performance, points)
+
         serializer = PerformanceSnapshotSerializer(performance.values(), many=True)
 
-        return Response({"results": serializer.data})
+        return Response({"results": serializer.data, "returns": returns})
 
 
 class PortfolioPerformanceView(APIView):
@@ -72,37 +98,31 @@ class PortfolioPerformanceView(APIView):
         """Timeseries of performance snapshot for a portfolio."""
 
         interval = get_range(request)
-        series = get_timeseries(interval, get_resolution(interval))
+        points = get_points(request)
+        # The daily series is downsampled to the requested number of points.
+        resolution = Resolution.DAY if points else get_resolution(interval)
+        series = get_timeseries(interval, resolution)
 
         portfolio = get_object_or_404(StockPortfolio, pk=pk)
-        stock_transactions = StockTransaction.objects.filter(
-            portfolio=portfolio,
-            date__range=(interval.start_date, interval.end_date),
-        )
-        portfolio_snapshots = get_portfolio(
-            cast(list, stock_transactions),
-            series,
-            cast(User, request.user),
-        )
-        dividends = StockDividend.objects.filter(
-            ticker__in=portfolio_snapshots[series[-1]].positions.keys(),
-            date__range=(interval.start_date, interval.end_date),
-        )
-        cash_transactions = CashTransaction.objects.filter(
-            portfolio=portfolio,
-            date__range=(interval.start_date, interval.end_date),
+        # The materialized days are read from the NAV table, only the later dates are replayed.
+        performance = get_cached_performance(
+            portfolio.id,  # type: ignore
+            None,
+            interval,
+            resolution,
+            lambda: get_nav_performance(
+                get_portfolio_nav(portfolio, interval.start_date, series), series
+            ),
         )
 
-        performance = get_portfolio_performance(
-            portfolio_snapshots=portfolio_snapshots,
-            dividends=cast(list, dividends),
-            cash_transactions=cast(list, cash_transactions),
-            series=series,
-        )
+        # The returns are calculated from the whole series before it is downsampled.
+        returns = get_returns(performance)
+        if points:
+            performance = downsample_performance(performance, points)
 
         serializer = PerformanceSnapshotSerializer(performance.values(), many=True)
 
-        return Response({"results": serializer.data})
+        return Response({"results": serializer.data, "returns": returns})
 
 
 class PortfolioSummaryPerformanceView(APIView):
@@ -111,4 +131,19 @@ class PortfolioSummaryPerformanceView(APIView):
     def get(self, request: Request) -> Response:
         """Timeseries of performance snapshot for all user owned portfolio."""
 
-        return Response({"results": []})
+        interval = get_range(request)
+        points = get_points(request)
+        resolution = Resolution.DAY if points else get_resolution(interval)
+        series = get_timeseries(interval, resolution)
+
+        portfolios = list(StockPortfolio.objects.filter(owner=request.user))
+        performance = get_summary_performance(portfolios, interval.start_date, series)
+
+        # The returns are calculated from the whole series before it is downsampled.
+        returns = get_returns(performance)
+        if points:
+            performance = downsample_performance(performance, points)
+
+        serializer = PerformanceSnapshotSerializer(performance.values(), many=True)
+
+        return Response({"results": serializer.data, "returns": returns})
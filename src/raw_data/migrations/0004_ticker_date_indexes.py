@@ -0,0 +1,33 @@
+# Generated by Django 4.0.5 on 2026-10-17 04:51
+
+# pylint: disable=missing-module-docstring, invalid-name, missing-class-docstring
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("raw_data", "0003_alter_stockdividend_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="stockdividend",
+            index=models.Index(
+                fields=["ticker", "date"], name="stock_dividend_ticker_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockprice",
+            index=models.Index(
+                fields=["ticker", "date"], name="stock_price_ticker_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stocksplit",
+            index=models.Index(
+                fields=["ticker", "date"], name="stock_split_ticker_date"
+            ),
+        ),
+    ]
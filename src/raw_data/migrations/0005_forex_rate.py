@@ -0,0 +1,113 @@
+# Generated by Django 4.0.5 on 2026-10-17 05:16
+
+# pylint: disable=missing-module-docstring, invalid-name, missing-class-docstring
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("raw_data", "0004_ticker_date_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ForexRateSync",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("started", "Started"),
+                            ("finished", "Finished"),
+                            ("failed", "Failed"),
+                            ("aborted", "Aborted"),
+                        ],
+                        default="started",
+                        max_length=8,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": '"raw_data"."forex_rate_sync"',
+            },
+        ),
+        migrations.CreateModel(
+            name="ForexRate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source_currency",
+                    models.CharField(
+                        choices=[
+                            ("HUF", "Hungarian Forint"),
+                            ("USD", "Us Dollar"),
+                            ("EUR", "Euro"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                (
+                    "target_currency",
+                    models.CharField(
+                        choices=[
+                            ("HUF", "Hungarian Forint"),
+                            ("USD", "Us Dollar"),
+                            ("EUR", "Euro"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("rate", models.FloatField()),
+                (
+                    "sync",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        to="raw_data.forexratesync",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": '"raw_data"."forex_rate"',
+                "ordering": ["date"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="forexrate",
+            index=models.Index(
+                fields=["source_currency", "target_currency", "date"],
+                name="forex_rate_pair_date",
+            ),
+        ),
+    ]
@@ -8,6 +8,7 @@ from django.db.models import (
     DateTimeField,
     FloatField,
     ForeignKey,
+    Index,
     Model,
     TextField,
     URLField,
@@ -15,6 +16,7 @@ from django.db.models import (
 
 from ..lib.enums import SyncStatus
 from ..stocks.models import Stock
+from ..transactions.enums import Currency
 
 
 class StockPriceSync(Model):
@@ -42,6 +44,7 @@ class StockPrice(Model):
     class Meta:
         db_table = '"raw_data"."stock_price"'
         ordering = ["date"]
+        indexes = [Index(fields=["ticker", "date"], name="stock_price_ticker_date")]
 
 
 class StockSplitSync(Model):
@@ -69,6 +72,7 @@ class StockSplit(Model):
     class Meta:
         db_table = '"raw_data"."stock_split"'
         ordering = ["date"]
+        indexes = [Index(fields=["ticker", "date"], name="stock_split_ticker_date")]
 
 
 class StockDividendSync(Model):
@@ -98,6 +102,7 @@ class StockDividend(Model):
     class Meta:
         db_table = '"raw_data"."stock_dividend"'
         ordering = ["date"]
+        indexes = [Index(fields=["ticker", "date"], name="stock_dividend_ticker_date")]
 
 
 class StockFiling(Model):
@@ -112,3 +117,37 @@ class StockFiling(Model):
 
     class Meta:
         db_table = '"raw_data"."stock_filing"'
+
+
+class ForexRateSync(Model):
+    """Represents a sync action for forex rates."""
+
+    status: CharField = CharField(
+        max_length=8, choices=SyncStatus.choices, default=SyncStatus.STARTED
+    )
+    owner: ForeignKey = ForeignKey(User, RESTRICT)
+    created_at: DateTimeField = DateTimeField(auto_now_add=True)
+    updated_at: DateTimeField = DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = '"raw_data"."forex_rate_sync"'
+
+
+class ForexRate(Model):
+    """Represents the price of one unit of the source currency in the target currency on a given date."""
+
+    source_currency: CharField = CharField(max_length=3, choices=Currency.choices)
+    target_currency: CharField = CharField(max_length=3, choices=Currency.choices)
+    date: DateField = DateField()
+    rate: FloatField = FloatField()
+    sync: ForeignKey = ForeignKey(ForexRateSync, RESTRICT)
+
+    class Meta:
+        db_table = '"raw_data"."forex_rate"'
+        ordering = ["date"]
+        indexes = [
+            Index(
+                fields=["source_currency", "target_currency", "date"],
+                name="forex_rate_pair_date",
+            )
+        ]
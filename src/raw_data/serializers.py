@@ -2,7 +2,7 @@
 
 from rest_framework import serializers
 
-from .models import StockPrice, StockDividend, StockSplit
+from .models import ForexRate, StockPrice, StockDividend, StockSplit
 
 
 class StockPriceSerializer(serializers.ModelSerializer):
@@ -27,3 +27,11 @@ class StockSplitSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockSplit
         fields = ["date", "ratio"]
+
+
+class ForexRateSerializer(serializers.ModelSerializer):
+    """Serializer of the forex rate model."""
+
+    class Meta:
+        model = ForexRate
+        fields = ["date", "rate"]
@@ -3,6 +3,7 @@
 from django.urls import path
 
 from .views import (
+    ForexRateView,
     StockDividendStatsView,
     StockDividendView,
     StockPriceStatsView,
@@ -18,4 +19,5 @@ urlpatterns = [
     path("stocks/<slug:ticker>/stock-dividends", StockDividendView.as_view()),
     path("stocks/stock-splits", StockSplitStatsView.as_view()),
     path("stocks/<slug:ticker>/stock-splits", StockSplitView.as_view()),
+    path("forex/<slug:source>/<slug:target>/forex-rates", ForexRateView.as_view()),
 ]
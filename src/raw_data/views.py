@@ -1,13 +1,16 @@
 """Business logic for the raw data module."""
 
 import json
+from datetime import date
 from logging import getLogger
 from re import findall
 
 from dateutil import parser
+from django.db import transaction
 from django.db.models import Avg, Count, Max, Min
 from django.shortcuts import get_object_or_404
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
@@ -16,8 +19,19 @@ from rest_framework.views import APIView
 from ..lib.decorators import allow_content_types
 from ..lib.enums import SyncStatus
 from ..lib.permissions import IsBot
+from ..lib.services.forex import refresh_forex_rates
+from ..lib.services.performance_cache import (
+    invalidate_performance,
+    invalidate_stock_performance,
+)
+from ..lib.services.prices import refresh_prices, write_price_history
+from ..lib.services.stocks import invalidate_quotes
 from ..stocks.models import Stock
+from ..transactions.enums import Currency
+from ..transactions.models import CashTransaction
 from .models import (
+    ForexRate,
+    ForexRateSync,
     StockDividend,
     StockDividendSync,
     StockPrice,
@@ -26,6 +40,7 @@ from .models import (
     StockSplitSync,
 )
 from .serializers import (
+    ForexRateSerializer,
     StockDividendSerializer,
     StockPriceSerializer,
     StockSplitSerializer,
@@ -92,6 +107,14 @@ class StockPriceView(APIView):
             LOGGER.debug("Synced price information successfully.")
             sync.status = SyncStatus.FINISHED
             sync.save()
+            invalidate_quotes(stock.ticker)
+            refresh_prices(stock.ticker)
+            write_price_history(stock.ticker)
+            if serializer.validated_data:
+                invalidate_stock_performance(
+                    stock.ticker,
+                    min(price["date"] for price in serializer.validated_data),
+                )
 
             return Response(None, status=status.HTTP_201_CREATED)
 
@@ -179,6 +202,12 @@ class StockDividendView(APIView):
             LOGGER.debug("Synced dividend information successfully.")
             sync.status = SyncStatus.FINISHED
             sync.save()
+            invalidate_quotes(stock.ticker)
+            if serializer.validated_data:
+                invalidate_stock_performance(
+                    stock.ticker,
+                    min(dividend["date"] for dividend in serializer.validated_data),
+                )
 
             return Response(None, status=status.HTTP_201_CREATED)
 
@@ -264,7 +293,9 @@ class StockSplitView(APIView):
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
             LOGGER.debug("Saving split data for %s as part of sync %s.", stock, sync)
-            serializer.save(ticker=stock, sync=sync)
+            # The current positions of the stock are refreshed along with the splits.
+            with transaction.atomic():
+                serializer.save(ticker=stock, sync=sync)
         except Exception as error:
             LOGGER.exception(error)
             LOGGER.error("An error happened during split sync.")
@@ -277,6 +308,7 @@ class StockSplitView(APIView):
             LOGGER.debug("Synced dividend information successfully.")
             sync.status = SyncStatus.FINISHED
             sync.save()
+            invalidate_quotes(stock.ticker)
 
             return Response(None, status=status.HTTP_201_CREATED)
 
@@ -297,3 +329,87 @@ class StockSplitStatsView(APIView):
         )
 
         return Response(stats)
+
+
+class ForexRateView(APIView):
+    """Business logic for the forex rate API."""
+
+    permission_classes = [IsAuthenticated, IsBot]
+
+    @allow_content_types(("application/json",))
+    def post(self, request: Request, source: str, target: str) -> Response:
+        """Sync rate timeseries for a given currency pair."""
+
+        LOGGER.info(
+            "Syncing forex rates for %s/%s initiated by %s.",
+            source,
+            target,
+            request.user,
+        )
+
+        if source not in Currency.values or target not in Currency.values:
+            raise NotFound("The currency pair is not supported.")
+
+        LOGGER.debug(
+            "Starting a new forex rate sync for %s/%s owned by %s.",
+            source,
+            target,
+            request.user,
+        )
+        sync = ForexRateSync(owner=request.user)
+        sync.save()
+
+        try:
+            rates = json.loads(request.body)["data"]
+            LOGGER.debug(
+                "Looking up rates for %s/%s from the latest sync.", source, target
+            )
+            latest_saved = (
+                ForexRate.objects.all()
+                .filter(source_currency=source, target_currency=target)
+                .aggregate(Max("date"))["date__max"]
+            )
+            rates = [
+                rate
+                for rate in rates
+                if not latest_saved or parser.parse(rate["date"]).date() > latest_saved
+            ]
+
+            LOGGER.debug("Validating rate data parsed from JSON.")
+            serializer = ForexRateSerializer(data=rates, many=True)
+            if not serializer.is_valid():
+                LOGGER.warning("The rate data from JSON was invalid.")
+                sync.status = SyncStatus.FAILED
+                sync.save()
+
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            LOGGER.debug(
+                "Saving rate data for %s/%s as part of sync %s.", source, target, sync
+            )
+            serializer.save(source_currency=source, target_currency=target, sync=sync)
+        except Exception as error:
+            LOGGER.exception(error)
+            LOGGER.error("An error happened during forex rate sync.")
+
+            sync.status = SyncStatus.FAILED
+            sync.save()
+
+            raise
+        else:
+            LOGGER.debug("Synced forex rates successfully.")
+            sync.status = SyncStatus.FINISHED
+            sync.save()
+            refresh_forex_rates()
+            if serializer.validated_data:
+                # The first rates of a pair are used before their date too.
+                invalidate_performance(
+                    CashTransaction.objects.filter(currency__in=[source, target])
+                    .values_list("portfolio_id", flat=True)
+                    .distinct(),
+                    min(rate["date"] for rate in serializer.validated_data)
+                    if latest_saved
+                    else date.min,
+                )
+
+            return Response(None, status=status.HTTP_201_CREATED)
@@ -8,3 +8,8 @@ class StocksConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "src.stocks"
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel, unused-import
+
+        from . import signals  # noqa: F401
@@ -0,0 +1,48 @@
+# Generated by Django 4.0.5 on 2026-10-17 04:00
+
+# pylint: disable=missing-module-docstring, invalid-name, missing-class-docstring
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stocks", "0005_remove_positionsize_description_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockPortfolioCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "portfolios",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.BigIntegerField(), size=None
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("positions", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": '"stocks"."stock_portfolio_checkpoint"',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stockportfoliocheckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("portfolios", "date"), name="unique checkpoint"
+            ),
+        ),
+    ]
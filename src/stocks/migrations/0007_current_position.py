@@ -0,0 +1,92 @@
+# Generated by Django 4.0.5 on 2026-10-17 05:00
+
+# pylint: disable=missing-module-docstring, invalid-name, missing-class-docstring
+
+from logging import getLogger
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+LOGGER = getLogger(__name__)
+
+
+def backfill_current_positions(apps, schema_editor):
+    """
+    Replays the current positions of the existing portfolios, later on the signals keep them in sync.
+
+    The replay uses the current models, the tables it reads are not changed by the later migrations.
+    """
+
+    # pylint: disable=unused-argument, import-outside-toplevel
+
+    from src.lib.services.positions import save_current_position
+    from src.lib.services.stocks import replay_current_positions
+    from src.stocks.models import StockPortfolio
+
+    for portfolio in StockPortfolio.objects.order_by("id"):
+        try:
+            positions, _ = replay_current_positions(portfolio)
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning(
+                "The portfolio %s can't be replayed: %s", portfolio.id, error
+            )
+
+            continue
+
+        for ticker, position in positions.items():
+            save_current_position(portfolio.id, ticker, position)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stocks", "0006_stockportfoliocheckpoint"),
+        ("raw_data", "0004_ticker_date_indexes"),
+        ("transactions", "0004_portfolio_owner_date_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CurrentPosition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shares", models.FloatField()),
+                ("opening_price", models.FloatField()),
+                ("purchase_price", models.FloatField()),
+                ("first_purchase_date", models.DateField()),
+                ("latest_purchase_date", models.DateField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "portfolio",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="stocks.stockportfolio",
+                    ),
+                ),
+                (
+                    "ticker",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.RESTRICT, to="stocks.stock"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": '"stocks"."current_position"',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="currentposition",
+            constraint=models.UniqueConstraint(
+                fields=("portfolio", "ticker"), name="unique position"
+            ),
+        ),
+        migrations.RunPython(backfill_current_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.0.5 on 2026-10-17 05:07
+
+# pylint: disable=missing-module-docstring, invalid-name, missing-class-docstring
+
+from logging import getLogger
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.expressions
+
+LOGGER = getLogger(__name__)
+
+
+def backfill_position_history(apps, schema_editor):
+    """
+    Replays the share count periods of the existing portfolios, later on the signals keep them in sync.
+
+    The replay uses the current models, the tables it reads are not changed by the later migrations.
+    """
+
+    # pylint: disable=unused-argument, import-outside-toplevel
+
+    from src.lib.services.positions import save_position_history
+    from src.lib.services.stocks import replay_current_positions
+    from src.stocks.models import StockPortfolio
+
+    for portfolio in StockPortfolio.objects.order_by("id"):
+        try:
+            _, timeline = replay_current_positions(portfolio)
+        except Exception as error:  # pylint: disable=broad-except
+            LOGGER.warning(
+                "The portfolio %s can't be replayed: %s", portfolio.id, error
+            )
+
+            continue
+
+        for ticker in timeline.tickers:
+            save_position_history(portfolio.id, ticker, timeline.periods(ticker))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stocks", "0007_current_position"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PositionHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("valid_from", models.DateField()),
+                ("valid_to", models.DateField(null=True)),
+                ("shares", models.FloatField()),
+                (
+                    "portfolio",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="stocks.stockportfolio",
+                    ),
+                ),
+                (
+                    "ticker",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.RESTRICT, to="stocks.stock"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": '"stocks"."position_history"',
+            },
+        ),
+        migrations.AddIndex(
+            model_name="positionhistory",
+            index=models.Index(
+                fields=["portfolio", "ticker"], name="position_history_portfolio"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="positionhistory",
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.db.models.expressions.Func(
+                    "valid_from",
+                    "valid_to",
+                    function="daterange",
+                    output_field=django.contrib.postgres.fields.ranges.DateRangeField(),
+                ),
+                name="position_history_validity",
+            ),
+        ),
+        migrations.RunPython(backfill_position_history, migrations.RunPython.noop),
+    ]
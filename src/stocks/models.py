@@ -1,13 +1,20 @@
 """Models related to the stocks schema."""
 
 from django.contrib.auth.models import User
+from django.contrib.postgres.fields import ArrayField, DateRangeField
+from django.contrib.postgres.indexes import GistIndex
 from django.db.models import (
     CASCADE,
     RESTRICT,
+    BigIntegerField,
     BooleanField,
     CharField,
+    DateField,
     DateTimeField,
     ForeignKey,
+    Func,
+    Index,
+    JSONField,
     Model,
     TextField,
     UniqueConstraint,
@@ -126,3 +133,95 @@ class PositionSize(Model):
 
     def __str__(self):
         return f"{self.watchlist_item} - {self.size}"
+
+
+class StockPortfolioCheckpoint(Model):
+    """
+    Represents the replayed state of a set of portfolios at a given date.
+
+    Only the date independent part of the positions is stored (shares, purchase price and dates),
+    the price and dividend information is attached when the checkpoint is restored.
+    """
+
+    # Sorted list of the portfolio ids the state was replayed for.
+    portfolios: ArrayField = ArrayField(BigIntegerField())
+    date: DateField = DateField()
+    positions: JSONField = JSONField()
+
+    created_at: DateTimeField = DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = '"stocks"."stock_portfolio_checkpoint"'
+        constraints = [
+            UniqueConstraint(fields=["portfolios", "date"], name="unique checkpoint")
+        ]
+
+    def __str__(self):
+        return f"{self.portfolios} - {self.date}"
+
+
+class CurrentPosition(Model):
+    """
+    Represents the replayed position of a stock in a portfolio after every transaction and split.
+
+    The positions are kept in sync with the transactions and splits by the signal handlers,
+    only the date independent part of a position is stored like in the checkpoints.
+    """
+
+    portfolio: ForeignKey = ForeignKey(StockPortfolio, CASCADE)
+    ticker: ForeignKey = ForeignKey(Stock, RESTRICT)
+    shares: FloatField = FloatField()
+    opening_price: FloatField = FloatField()
+    purchase_price: FloatField = FloatField()
+    first_purchase_date: DateField = DateField()
+    latest_purchase_date: DateField = DateField()
+
+    updated_at: DateTimeField = DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = '"stocks"."current_position"'
+        constraints = [
+            UniqueConstraint(fields=["portfolio", "ticker"], name="unique position")
+        ]
+
+    def __str__(self):
+        # pylint: disable=no-member
+
+        return f"{self.portfolio_id} - {self.ticker_id}"
+
+
+class PositionHistory(Model):
+    """
+    Represents the number of shares held of a stock in a portfolio during a period.
+
+    The shares are held after the actions of the valid from date until the day before the valid to date,
+    the open periods are still held. The periods of the stock are rebuilt by the signal handlers
+    whenever a transaction or a split is written.
+    """
+
+    portfolio: ForeignKey = ForeignKey(StockPortfolio, CASCADE)
+    ticker: ForeignKey = ForeignKey(Stock, RESTRICT)
+    valid_from: DateField = DateField()
+    valid_to: DateField = DateField(null=True)
+    shares: FloatField = FloatField()
+
+    class Meta:
+        db_table = '"stocks"."position_history"'
+        indexes = [
+            Index(fields=["portfolio", "ticker"], name="position_history_portfolio"),
+            # The queries look up the periods with the daterange(valid_from, valid_to) expression.
+            GistIndex(
+                Func(
+                    "valid_from",
+                    "valid_to",
+                    function="daterange",
+                    output_field=DateRangeField(),
+                ),
+                name="position_history_validity",
+            ),
+        ]
+
+    def __str__(self):
+        # pylint: disable=no-member
+
+        return f"{self.portfolio_id} - {self.ticker_id} ({self.valid_from} - {self.valid_to})"
@@ -0,0 +1,116 @@
+"""Signal handlers keeping the derived portfolio data in sync with the transactions."""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from ..lib.services.checkpoints import invalidate_checkpoints
+from ..lib.services.performance_cache import invalidate_performance
+from ..lib.services.stocks import refresh_current_position, refresh_stock_positions
+from ..raw_data.models import StockSplit
+from ..transactions.models import CashTransaction, StockTransaction
+from .models import StockPortfolio, StockPortfolioCheckpoint
+
+
+@receiver(pre_save, sender=StockTransaction)
+def invalidate_previous_transaction(sender, instance: StockTransaction, **kwargs):
+    """An updated transaction could have been moved to another date or portfolio."""
+
+    # pylint: disable=unused-argument
+
+    if not instance.pk:
+        return
+
+    previous = (
+        StockTransaction.objects.filter(pk=instance.pk)
+        .values("portfolio_id", "ticker_id", "date")
+        .first()
+    )
+    if not previous:
+        return
+
+    invalidate_checkpoints([previous["portfolio_id"]], previous["date"])
+    invalidate_performance([previous["portfolio_id"]], previous["date"])
+
+    # The position the transaction is moved from is refreshed without it,
+    # the one it is moved to is refreshed after the save.
+    if (previous["portfolio_id"], previous["ticker_id"]) != (
+        instance.portfolio_id,  # type: ignore
+        instance.ticker_id,  # type: ignore
+    ):
+        refresh_current_position(
+            previous["portfolio_id"], previous["ticker_id"], excluded=instance.pk
+        )
+
+
+@receiver(post_save, sender=StockTransaction)
+@receiver(post_delete, sender=StockTransaction)
+def invalidate_transaction(sender, instance: StockTransaction, **kwargs):
+    """A written transaction changes every checkpoint of its portfolio from its date and its current position."""
+
+    # pylint: disable=unused-argument
+
+    invalidate_checkpoints([instance.portfolio_id], instance.date)  # type: ignore
+    invalidate_performance([instance.portfolio_id], instance.date)  # type: ignore
+    refresh_current_position(instance.portfolio_id, instance.ticker_id)  # type: ignore
+
+
+@receiver(post_save, sender=StockSplit)
+@receiver(post_delete, sender=StockSplit)
+def invalidate_split(sender, instance: StockSplit, **kwargs):
+    """
+    A split changes the checkpoints of every portfolio that held the stock before the split
+    and the current position of every portfolio that transacted it.
+    """
+
+    # pylint: disable=unused-argument
+
+    portfolio_ids = (
+        StockTransaction.objects.filter(
+            ticker_id=instance.ticker_id, date__lte=instance.date  # type: ignore
+        )
+        .values_list("portfolio_id", flat=True)
+        .distinct()
+    )
+
+    invalidate_checkpoints(portfolio_ids, instance.date)
+    invalidate_performance(portfolio_ids, instance.date)
+    refresh_stock_positions(instance.ticker_id)  # type: ignore
+
+
+@receiver(pre_save, sender=CashTransaction)
+def invalidate_previous_cash_transaction(sender, instance: CashTransaction, **kwargs):
+    """An updated cash transaction could have been moved to another date or portfolio."""
+
+    # pylint: disable=unused-argument
+
+    if not instance.pk:
+        return
+
+    previous = (
+        CashTransaction.objects.filter(pk=instance.pk)
+        .values("portfolio_id", "date")
+        .first()
+    )
+    if previous:
+        invalidate_performance([previous["portfolio_id"]], previous["date"])
+
+
+@receiver(post_save, sender=CashTransaction)
+@receiver(post_delete, sender=CashTransaction)
+def invalidate_cash_transaction(sender, instance: CashTransaction, **kwargs):
+    """A written cash transaction changes the cash flows and the invested capital of its portfolio from its date."""
+
+    # pylint: disable=unused-argument
+
+    invalidate_performance([instance.portfolio_id], instance.date)  # type: ignore
+
+
+@receiver(post_delete, sender=StockPortfolio)
+def remove_portfolio_checkpoints(sender, instance: StockPortfolio, **kwargs):
+    """Checkpoints are not bound by foreign keys, so we have to remove them manually."""
+
+    # pylint: disable=unused-argument
+
+    StockPortfolioCheckpoint.objects.filter(
+        portfolios__contains=[instance.id]  # type: ignore
+    ).delete()
@@ -0,0 +1,57 @@
+# Generated by Django 4.0.5 on 2026-10-17 04:57
+
+# pylint: disable=missing-module-docstring, invalid-name, missing-class-docstring
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0003_auto_20220122_0800"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="cashtransaction",
+            options={"ordering": ["-date"]},
+        ),
+        migrations.AlterModelOptions(
+            name="forextransaction",
+            options={"ordering": ["-date"]},
+        ),
+        migrations.AlterModelOptions(
+            name="stocktransaction",
+            options={"ordering": ["-date"]},
+        ),
+        migrations.AddIndex(
+            model_name="cashtransaction",
+            index=models.Index(
+                fields=["portfolio", "date"], name="cash_tx_portfolio_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cashtransaction",
+            index=models.Index(fields=["owner", "date"], name="cash_tx_owner_date"),
+        ),
+        migrations.AddIndex(
+            model_name="forextransaction",
+            index=models.Index(
+                fields=["portfolio", "date"], name="forex_tx_portfolio_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="forextransaction",
+            index=models.Index(fields=["owner", "date"], name="forex_tx_owner_date"),
+        ),
+        migrations.AddIndex(
+            model_name="stocktransaction",
+            index=models.Index(
+                fields=["portfolio", "date"], name="stock_tx_portfolio_date"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stocktransaction",
+            index=models.Index(fields=["owner", "date"], name="stock_tx_owner_date"),
+        ),
+    ]
@@ -8,6 +8,7 @@ from django.db.models import (
     DateTimeField,
     FloatField,
     ForeignKey,
+    Index,
     Model,
     TextField,
 )
@@ -31,6 +32,10 @@ class CashTransaction(Model):
     class Meta:
         db_table = '"transactions"."cash_transaction"'
         ordering = ["-date"]
+        indexes = [
+            Index(fields=["portfolio", "date"], name="cash_tx_portfolio_date"),
+            Index(fields=["owner", "date"], name="cash_tx_owner_date"),
+        ]
 
 
 class ForexTransaction(Model):
@@ -50,6 +55,10 @@ class ForexTransaction(Model):
     class Meta:
         db_table = '"transactions"."forex_transaction"'
         ordering = ["-date"]
+        indexes = [
+            Index(fields=["portfolio", "date"], name="forex_tx_portfolio_date"),
+            Index(fields=["owner", "date"], name="forex_tx_owner_date"),
+        ]
 
 
 class StockTransaction(Model):
@@ -69,3 +78,7 @@ class StockTransaction(Model):
     class Meta:
         db_table = '"transactions"."stock_transaction"'
         ordering = ["-date"]
+        indexes = [
+            Index(fields=["portfolio", "date"], name="stock_tx_portfolio_date"),
+            Index(fields=["owner", "date"], name="stock_tx_owner_date"),
+        ]
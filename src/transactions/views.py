@@ -2,6 +2,7 @@
 
 from logging import getLogger
 
+from django.db import transaction
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 
@@ -55,7 +56,18 @@ class StockTransactionViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         LOGGER.debug("Inserting a new stock transaction for %s.", self.request.user)
-        serializer.save(owner=self.request.user)
+
+        # The signal handlers refresh the current position in the same database transaction.
+        with transaction.atomic():
+            serializer.save(owner=self.request.user)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
 
     def filter_queryset(self, queryset):
         return queryset.filter(owner=self.request.user)
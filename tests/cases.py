@@ -0,0 +1,24 @@
+"""Custom test cases for the project."""
+
+from django.apps import apps
+from django.db import connection
+from django.test import TransactionTestCase
+
+
+class CommittedTestCase(TransactionTestCase):
+    """
+    Test case that commits its data, so the connections of other threads could read it.
+
+    The flush of Django skips the tables in the Postgres schemas, so every table of the models
+    is truncated after each test instead.
+    """
+
+    def _fixture_teardown(self):
+        tables = ", ".join(
+            model._meta.db_table  # pylint: disable=protected-access
+            for model in apps.get_models()
+            if model._meta.managed  # pylint: disable=protected-access
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {tables} CASCADE")
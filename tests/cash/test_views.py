@@ -46,6 +46,43 @@ class TestCashBalanceDetail(TestCase):
         self.assertEqual(response.status_code, 404)
 
 
+class TestCashBalanceHistory(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.PORTFOLIOS = data.PORTFOLIOS
+
+        cls.url = f"/cash/{cls.PORTFOLIOS.main.id}/history"
+        cls.token = generate_token(data.USERS.owner)
+
+    def test_cannot_access_unauthenticated(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_fetch_history(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        response = self.client.get(self.url, {"from": "2021-01-01", "to": "2021-01-15"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 14)
+        self.assertEqual(
+            response.data["results"][0],
+            {"date": "2021-01-01", "usd": 0.0, "huf": 0.0, "eur": 0.0},
+        )
+
+    def test_cannot_access_other_users_portfolio(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        response = self.client.get(f"/cash/{self.PORTFOLIOS.other_users.id}/history")
+
+        self.assertEqual(response.status_code, 404)
+
+
 class TestCashBalanceSummary(TestCase):
     def setUp(self):
         self.client = APIClient()
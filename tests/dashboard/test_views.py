@@ -1,10 +1,9 @@
 """Integration tests for the dashboard API."""
 
 from datetime import date
-from os import environ
 
 from django.db.models import Q
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
 from src.auth.helpers import generate_token
 from src.dashboard.models import Strategy, UserStrategy
@@ -90,6 +89,7 @@ class TestStrategyDetail(TestCase):
         self.assertEqual(response.status_code, 404)
 
 
+@override_settings(USD_HUF_FX_RATE=300.0, EUR_USD_FX_RATE=1.1)
 class TestCurrentStrategy(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -103,9 +103,6 @@ class TestCurrentStrategy(TestCase):
         cls.url = "/dashboard/strategies/me"
         cls.token = generate_token(data.USERS.owner)
 
-        environ["USD_HUF_FX_RATE"] = "300.00"
-        environ["EUR_USD_FX_RATE"] = "1.1"
-
     def test_cannot_access_unauthenticated(self):
         response = self.client.get(self.url)
 
@@ -433,6 +430,7 @@ class TestStrategyDelete(TestCase):
         self.assertTrue(Strategy.objects.get(pk=self.STRATEGIES.main.id))
 
 
+@override_settings(USD_HUF_FX_RATE=300.0, EUR_USD_FX_RATE=1.1)
 class TestPortfolioIndicators(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -465,9 +463,6 @@ class TestPortfolioIndicators(TestCase):
     def test_fetch_portfolio_indicators(self):
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
 
-        environ["EUR_USD_FX_RATE"] = "1.10"
-        environ["USD_HUF_FX_RATE"] = "300.00"
-
         response = self.client.get(self.url)
 
         self.assertEqual(response.status_code, 200)
@@ -475,8 +470,6 @@ class TestPortfolioIndicators(TestCase):
     def test_roic_should_only_consider_invested_capital(self):
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
 
-        environ["USD_HUF_FX_RATE"] = "300.00"
-
         CashTransaction.objects.create(
             currency="HUF",
             amount=90_000,
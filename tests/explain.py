@@ -0,0 +1,37 @@
+"""Helpers to inspect the query plans of the database in test cases."""
+
+from typing import Any, Callable, Iterator
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def explain(function: Callable[[], Any]) -> list[dict]:
+    """Runs the function and returns the plan of every select query it executed."""
+
+    with CaptureQueriesContext(connection) as context:
+        function()
+
+    plans = []
+    with connection.cursor() as cursor:
+        for query in context.captured_queries:
+            if not query["sql"].lstrip().upper().startswith("SELECT"):
+                continue
+
+            # The captured queries have their parameters inlined already.
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {query['sql']}")
+            plans.append(cursor.fetchone()[0][0]["Plan"])
+
+    return plans
+
+
+def get_scans(plan: dict) -> Iterator[tuple[str, str, str]]:
+    """Yields the node type, the table and the index (if any) of every scan in the plan."""
+
+    if "Relation Name" in plan or "Index Name" in plan:
+        yield plan["Node Type"], plan.get("Relation Name", ""), plan.get(
+            "Index Name", ""
+        )
+
+    for child in plan.get("Plans", []):
+        yield from get_scans(child)
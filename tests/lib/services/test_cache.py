@@ -0,0 +1,93 @@
+"""Test cases for the cache service."""
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from src.lib.services.cache import (
+    LRUCache,
+    bump_shared_versions,
+    get_shared_versions,
+)
+
+
+@override_settings(TEST_CACHE_SIZE=2, TEST_CACHE_TTL=60)
+class TestLRUCache(TestCase):
+    def setUp(self):
+        self.cache = LRUCache(
+            size_setting="TEST_CACHE_SIZE", ttl_setting="TEST_CACHE_TTL"
+        )
+
+    def test_get(self):
+        self.cache.set("a", 1)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_evicts_the_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("c"), 3)
+
+    def test_expires(self):
+        with patch("src.lib.services.cache.monotonic", return_value=100):
+            self.cache.set("a", 1)
+        with patch("src.lib.services.cache.monotonic", return_value=159):
+            self.assertEqual(self.cache.get("a"), 1)
+        with patch("src.lib.services.cache.monotonic", return_value=160):
+            self.assertIsNone(self.cache.get("a"))
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate(self):
+        self.cache.set(("MSFT", 1), 1)
+        self.cache.set(("PM", 1), 2)
+
+        self.cache.invalidate(lambda key: key[0] == "MSFT")
+
+        self.assertIsNone(self.cache.get(("MSFT", 1)))
+        self.assertEqual(self.cache.get(("PM", 1)), 2)
+
+    def test_clear(self):
+        self.cache.set("a", 1)
+        self.cache.get("a")
+
+        self.cache.clear()
+
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 0))
+
+    @override_settings(TEST_CACHE_SIZE=0)
+    def test_disabled(self):
+        self.cache.set("a", 1)
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(len(self.cache), 0)
+
+
+class TestSharedVersions(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_get(self):
+        versions = get_shared_versions("test", ["a", "b"])
+
+        self.assertNotEqual(versions["a"], versions["b"])
+        self.assertEqual(get_shared_versions("test", ["a", "b"]), versions)
+        self.assertNotEqual(get_shared_versions("other", ["a"])["a"], versions["a"])
+
+    def test_bump(self):
+        versions = get_shared_versions("test", ["a", "b"])
+        bump_shared_versions("test", ["a"])
+        bumped = get_shared_versions("test", ["a", "b"])
+
+        self.assertNotEqual(bumped["a"], versions["a"])
+        self.assertEqual(bumped["b"], versions["b"])
@@ -1,97 +1,26 @@
 """Test cases for cash service."""
 
 from datetime import date
-from os import environ
 
-from django.test import TestCase
-from src.lib.dataclasses import (
-    CashBalanceSnapshot,
-    StockPortfolioSnapshot,
-    StockPositionSnapshot,
-)
+from django.test import TestCase, override_settings
+from src.lib.dataclasses import CashBalanceSnapshot
 from src.lib.services.cash import (
+    CashFlow,
     balance_to_usd,
+    convert_cash_flows,
+    get_cash_balance_series,
     get_invested_capital,
     get_invested_capital_snapshot,
-    get_portfolio_cash_balance,
     get_portfolio_cash_balance_snapshot,
-    transaction_to_usd,
 )
-from src.raw_data.models import StockDividend
+from src.raw_data.models import ForexRate, ForexRateSync
 from src.transactions.enums import Currency
 from src.transactions.models import CashTransaction, ForexTransaction, StockTransaction
+from tests.stubs import to_events
 
 from ...seed import generate_test_data
 
 
-class TestGetPortfolioCashBalance(TestCase):
-    @classmethod
-    def setUpTestData(cls):
-        data = generate_test_data()
-        cls.USERS = data.USERS
-        cls.PORTFOLIOS = data.PORTFOLIOS
-        cls.STOCKS = data.STOCKS
-
-        cls.snapshot_date = date(2022, 1, 1)
-        cls.dividends = [
-            StockDividend(ticker=cls.STOCKS.PM, date=date(2022, 1, 1), amount=10.0)
-        ]
-        cls.snapshots = {
-            cls.snapshot_date: StockPortfolioSnapshot(
-                positions={
-                    "PM": StockPositionSnapshot(
-                        stock=cls.STOCKS.PM,
-                        shares=2,
-                        price=100.0,
-                        dividend=2.5,
-                        purchase_price=10.0,
-                        first_purchase_date=date(2021, 1, 1),
-                        latest_purchase_date=date(2021, 6, 1),
-                    )
-                },
-                date=cls.snapshot_date,
-                owner=cls.USERS.owner,
-            )
-        }
-
-    def test_empty(self):
-        self.assertEqual(
-            get_portfolio_cash_balance([], [], CashBalanceSnapshot(), {}), {}
-        )
-
-    def test_no_payouts(self):
-        result = get_portfolio_cash_balance(
-            [], [self.snapshot_date], CashBalanceSnapshot(), self.snapshots
-        )
-
-        self.assertEqual(result[self.snapshot_date], CashBalanceSnapshot())
-
-    def test_no_series(self):
-        result = get_portfolio_cash_balance(
-            self.dividends, [], CashBalanceSnapshot(), self.snapshots
-        )
-
-        self.assertEqual(result, {})
-
-    def test_generate_balance_series(self):
-
-        result = get_portfolio_cash_balance(
-            self.dividends, [self.snapshot_date], CashBalanceSnapshot(), self.snapshots
-        )
-
-        self.assertEqual(result[self.snapshot_date], CashBalanceSnapshot(USD=20.0))
-
-    def test_use_initial(self):
-        result = get_portfolio_cash_balance(
-            self.dividends,
-            [self.snapshot_date],
-            CashBalanceSnapshot(USD=5.0),
-            self.snapshots,
-        )
-
-        self.assertEqual(result[self.snapshot_date], CashBalanceSnapshot(USD=25.0))
-
-
 class TestGetPortfolioCashBalanceSnapshot(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -485,8 +414,27 @@ class TestGetPortfolioCashBalanceSnapshot(TestCase):
 
         self.assertEqual(result, CashBalanceSnapshot(USD=126))
 
+    def test_identical_stock_transactions(self):
+        """Every stock transaction is an outflow even if it is the same as another one."""
 
-class TestGetInvestedCapital(TestCase):
+        for _ in range(2):
+            StockTransaction.objects.create(
+                ticker=self.STOCKS.BABA,
+                amount=1,
+                price=100,
+                date=date(2021, 1, 1),
+                owner=self.USERS.owner,
+                portfolio=self.PORTFOLIOS.main,
+            )
+
+        result = get_portfolio_cash_balance_snapshot(
+            [self.PORTFOLIOS.main], date(2021, 1, 1)
+        )
+
+        self.assertEqual(result, CashBalanceSnapshot(USD=-200))
+
+
+class TestGetCashBalanceSeries(TestCase):
     @classmethod
     def setUpTestData(cls):
         data = generate_test_data()
@@ -494,23 +442,121 @@ class TestGetInvestedCapital(TestCase):
         cls.PORTFOLIOS = data.PORTFOLIOS
         cls.STOCKS = data.STOCKS
 
-        cls.snapshot_date = date(2021, 1, 1)
-        cls.transactions = [
-            CashTransaction(
-                currency=Currency.HUNGARIAN_FORINT,
-                amount=1_000.0,
-                date=date(2021, 1, 1),
-                owner=cls.USERS.owner,
-                portfolio=cls.PORTFOLIOS.main,
-            ),
-            CashTransaction(
-                currency=Currency.HUNGARIAN_FORINT,
-                amount=2_000.0,
-                date=date(2021, 1, 1),
+        CashTransaction.objects.create(
+            currency=Currency.HUNGARIAN_FORINT,
+            amount=90_000,
+            date=date(2020, 12, 1),
+            owner=cls.USERS.owner,
+            portfolio=cls.PORTFOLIOS.main,
+        )
+        CashTransaction.objects.create(
+            currency=Currency.EURO,
+            amount=100,
+            date=date(2020, 12, 15),
+            owner=cls.USERS.owner,
+            portfolio=cls.PORTFOLIOS.main,
+        )
+        ForexTransaction.objects.create(
+            date=date(2020, 12, 20),
+            amount=90_000,
+            ratio=1 / 300,
+            source_currency=Currency.HUNGARIAN_FORINT,
+            target_currency=Currency.US_DOLLAR,
+            owner=cls.USERS.owner,
+            portfolio=cls.PORTFOLIOS.main,
+        )
+        for _ in range(2):
+            StockTransaction.objects.create(
+                ticker=cls.STOCKS.MSFT,
+                amount=1,
+                price=90,
+                date=date(2020, 12, 28),
                 owner=cls.USERS.owner,
                 portfolio=cls.PORTFOLIOS.main,
-            ),
-        ]
+            )
+        # Cash of another portfolio is not included.
+        CashTransaction.objects.create(
+            currency=Currency.US_DOLLAR,
+            amount=1_000,
+            date=date(2020, 12, 1),
+            owner=cls.USERS.owner,
+            portfolio=cls.PORTFOLIOS.other,
+        )
+
+    def test_empty_series(self):
+        self.assertEqual(get_cash_balance_series([self.PORTFOLIOS.main], []), {})
+
+    def test_empty_portfolio(self):
+        self.assertEqual(
+            get_cash_balance_series([], [date(2021, 1, 1)]),
+            {date(2021, 1, 1): CashBalanceSnapshot()},
+        )
+
+    def test_running_balance(self):
+        result = get_cash_balance_series(
+            [self.PORTFOLIOS.main],
+            [
+                date(2021, 1, 1),
+                date(2020, 11, 30),
+                date(2020, 12, 1),
+                date(2020, 12, 16),
+                date(2020, 12, 28),
+            ],
+        )
+
+        self.assertEqual(
+            result,
+            {
+                date(2020, 11, 30): CashBalanceSnapshot(),
+                date(2020, 12, 1): CashBalanceSnapshot(HUF=90_000),
+                date(2020, 12, 16): CashBalanceSnapshot(EUR=100, HUF=90_000),
+                date(2020, 12, 28): CashBalanceSnapshot(USD=120, EUR=100),
+                # The MSFT dividend is paid on the 2 shares.
+                date(2021, 1, 1): CashBalanceSnapshot(USD=126, EUR=100),
+            },
+        )
+
+    def test_matches_the_snapshots(self):
+        series = [date(2020, 12, 10), date(2020, 12, 25), date(2021, 1, 1)]
+
+        result = get_cash_balance_series([self.PORTFOLIOS.main], series)
+
+        for snapshot_date in series:
+            self.assertEqual(
+                result[snapshot_date],
+                get_portfolio_cash_balance_snapshot(
+                    [self.PORTFOLIOS.main], snapshot_date
+                ),
+            )
+
+
+class TestGetInvestedCapital(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.STOCKS = data.STOCKS
+
+        cls.snapshot_date = date(2021, 1, 1)
+        cls.transactions = to_events(
+            [
+                CashTransaction(
+                    currency=Currency.HUNGARIAN_FORINT,
+                    amount=1_000.0,
+                    date=date(2021, 1, 1),
+                    owner=cls.USERS.owner,
+                    portfolio=cls.PORTFOLIOS.main,
+                ),
+                CashTransaction(
+                    currency=Currency.HUNGARIAN_FORINT,
+                    amount=2_000.0,
+                    date=date(2021, 1, 1),
+                    owner=cls.USERS.owner,
+                    portfolio=cls.PORTFOLIOS.main,
+                ),
+            ]
+        )
 
     def test_empty_transactions(self):
         result = get_invested_capital([], [self.snapshot_date])
@@ -540,22 +586,24 @@ class TestGetInvestedCapital(TestCase):
         They should be summed up on the balance.
         """
 
-        self.transactions = [
-            CashTransaction(
-                currency=Currency.HUNGARIAN_FORINT,
-                amount=3_000.0,
-                date=date(2021, 1, 1),
-                owner=self.USERS.owner,
-                portfolio=self.PORTFOLIOS.main,
-            ),
-            CashTransaction(
-                currency=Currency.HUNGARIAN_FORINT,
-                amount=-1_000.0,
-                date=date(2021, 1, 1),
-                owner=self.USERS.owner,
-                portfolio=self.PORTFOLIOS.main,
-            ),
-        ]
+        self.transactions = to_events(
+            [
+                CashTransaction(
+                    currency=Currency.HUNGARIAN_FORINT,
+                    amount=3_000.0,
+                    date=date(2021, 1, 1),
+                    owner=self.USERS.owner,
+                    portfolio=self.PORTFOLIOS.main,
+                ),
+                CashTransaction(
+                    currency=Currency.HUNGARIAN_FORINT,
+                    amount=-1_000.0,
+                    date=date(2021, 1, 1),
+                    owner=self.USERS.owner,
+                    portfolio=self.PORTFOLIOS.main,
+                ),
+            ]
+        )
 
         result = get_invested_capital(self.transactions, [self.snapshot_date])
 
@@ -690,65 +738,89 @@ class TestGetInvestedCapitalSnapshot(TestCase):
         self.assertEqual(result, CashBalanceSnapshot(HUF=45_000 - 18_000))
 
 
+@override_settings(USD_HUF_FX_RATE=300.0, EUR_USD_FX_RATE=1.2)
 class TestBalanceToUsd(TestCase):
-    def test_conversion(self):
-        environ["USD_HUF_FX_RATE"] = "300"
-        environ["EUR_USD_FX_RATE"] = "1.2"
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.sync = ForexRateSync.objects.create(owner=data.USERS.bot)
 
+    def test_conversion(self):
         balance = CashBalanceSnapshot(USD=12, EUR=15, HUF=1500)
 
         self.assertEqual(balance_to_usd(balance), 35)
 
+    def test_conversion_with_stored_rates(self):
+        ForexRate.objects.create(
+            source_currency=Currency.EURO,
+            target_currency=Currency.US_DOLLAR,
+            date=date(2022, 1, 1),
+            rate=1.1,
+            sync=self.sync,
+        )
+        ForexRate.objects.create(
+            source_currency=Currency.US_DOLLAR,
+            target_currency=Currency.HUNGARIAN_FORINT,
+            date=date(2022, 1, 1),
+            rate=375,
+            sync=self.sync,
+        )
+
+        balance = CashBalanceSnapshot(USD=12, EUR=10, HUF=1500)
 
-class TestTransactionToUsd(TestCase):
+        self.assertAlmostEqual(balance_to_usd(balance, date(2022, 1, 2)), 27)
+
+
+@override_settings(USD_HUF_FX_RATE=300.0, EUR_USD_FX_RATE=1.2)
+class TestConvertCashFlows(TestCase):
     @classmethod
     def setUpTestData(cls):
         data = generate_test_data()
-        cls.USERS = data.USERS
-        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.sync = ForexRateSync.objects.create(owner=data.USERS.bot)
 
-    def test_convert_usd(self):
-        transaction = CashTransaction(
-            currency=Currency.US_DOLLAR,
-            amount=100,
-            date=date(2022, 1, 1),
-            owner=self.USERS.owner,
-            portfolio=self.PORTFOLIOS.main,
-        )
+    def test_empty(self):
+        self.assertEqual(convert_cash_flows([]), [])
 
-        result = transaction_to_usd(transaction)
+    def test_convert_usd(self):
+        result = convert_cash_flows([(date(2022, 1, 1), Currency.US_DOLLAR, 100)])
 
-        self.assertEqual(result.currency, Currency.US_DOLLAR)
-        self.assertEqual(result.amount, 100)
+        self.assertEqual(result, [CashFlow(date=date(2022, 1, 1), amount=100)])
 
     def test_convert_eur(self):
-        environ["EUR_USD_FX_RATE"] = "1.2"
+        result = convert_cash_flows([(date(2022, 1, 1), Currency.EURO, 10)])
 
-        transaction = CashTransaction(
-            currency=Currency.EURO,
-            amount=10,
-            date=date(2022, 1, 1),
-            owner=self.USERS.owner,
-            portfolio=self.PORTFOLIOS.main,
-        )
+        self.assertEqual(result, [CashFlow(date=date(2022, 1, 1), amount=12)])
 
-        result = transaction_to_usd(transaction)
+    def test_convert_huf(self):
+        result = convert_cash_flows(
+            [(date(2022, 1, 1), Currency.HUNGARIAN_FORINT, 3_000)]
+        )
 
-        self.assertEqual(result.currency, Currency.US_DOLLAR)
-        self.assertEqual(result.amount, 12)
+        self.assertEqual(result, [CashFlow(date=date(2022, 1, 1), amount=10)])
 
-    def test_convert_huf(self):
-        environ["USD_HUF_FX_RATE"] = "300"
+    def test_convert_with_the_rate_at_the_date(self):
+        for rate_date, rate in [(date(2022, 1, 1), 1.1), (date(2022, 2, 1), 1.2)]:
+            ForexRate.objects.create(
+                source_currency=Currency.EURO,
+                target_currency=Currency.US_DOLLAR,
+                date=rate_date,
+                rate=rate,
+                sync=self.sync,
+            )
 
-        transaction = CashTransaction(
-            currency=Currency.HUNGARIAN_FORINT,
-            amount=3_000,
-            date=date(2022, 1, 1),
-            owner=self.USERS.owner,
-            portfolio=self.PORTFOLIOS.main,
+        result = convert_cash_flows(
+            [
+                (date(2021, 12, 1), Currency.EURO, 100),
+                (date(2022, 1, 15), Currency.EURO, 100),
+                (date(2022, 1, 20), Currency.US_DOLLAR, 100),
+                (date(2022, 2, 1), Currency.EURO, 100),
+            ]
         )
 
-        result = transaction_to_usd(transaction)
-
-        self.assertEqual(result.currency, Currency.US_DOLLAR)
-        self.assertEqual(result.amount, 10)
+        self.assertEqual(
+            [flow.date for flow in result],
+            [date(2021, 12, 1), date(2022, 1, 15), date(2022, 1, 20), date(2022, 2, 1)],
+        )
+        # The dates before the first stored rate take the first one.
+        for flow, amount in zip(result, [110, 110, 100, 120]):
+            self.assertAlmostEqual(flow.amount, amount)
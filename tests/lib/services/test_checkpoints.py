@@ -0,0 +1,132 @@
+"""Test cases for the checkpoint service."""
+
+from datetime import date
+
+from django.test import TestCase
+from src.lib.services.stocks import get_portfolio, get_portfolio_snapshot
+from src.raw_data.models import StockSplit
+from src.stocks.models import StockPortfolioCheckpoint
+from src.transactions.models import StockTransaction
+from tests.stubs import to_events
+
+from ...seed import generate_test_data
+
+
+class TestPortfolioCheckpoints(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.STOCKS = data.STOCKS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.SPLIT_SYNCS = data.STOCK_SPLIT_SYNCS
+
+        cls.snapshot_date = date(2021, 3, 15)
+
+    def setUp(self):
+        StockTransaction.objects.create(
+            amount=2,
+            date=date(2021, 1, 2),
+            ticker=self.STOCKS.PM,
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+            price=90.0,
+        )
+        StockTransaction.objects.create(
+            amount=3,
+            date=date(2021, 2, 2),
+            ticker=self.STOCKS.MSFT,
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+            price=100.0,
+        )
+
+    def _checkpoint_dates(self):
+        """Dates of the saved checkpoints in chronological order."""
+
+        return list(
+            StockPortfolioCheckpoint.objects.order_by("date").values_list(
+                "date", flat=True
+            )
+        )
+
+    def test_saves_month_end_checkpoints(self):
+        get_portfolio_snapshot([self.PORTFOLIOS.main], self.snapshot_date)
+
+        self.assertEqual(
+            self._checkpoint_dates(), [date(2021, 1, 31), date(2021, 2, 28)]
+        )
+
+    def test_resumed_snapshot_matches_full_replay(self):
+        first = get_portfolio_snapshot([self.PORTFOLIOS.main], self.snapshot_date)
+        resumed = get_portfolio_snapshot([self.PORTFOLIOS.main], self.snapshot_date)
+
+        actions = sorted(
+            [
+                *StockTransaction.objects.filter(portfolio=self.PORTFOLIOS.main),
+                *StockSplit.objects.all(),
+            ],
+            key=lambda x: x.date,
+        )
+        replayed = get_portfolio(
+            to_events(actions), [self.snapshot_date], self.USERS.owner
+        )
+
+        self.assertEqual(first, replayed[self.snapshot_date])
+        self.assertEqual(resumed, replayed[self.snapshot_date])
+        # The split happened after the position was opened.
+        self.assertEqual(resumed.positions["PM"].shares, 4)
+        self.assertEqual(resumed.positions["PM"].dividend, 3.0)
+
+    def test_earlier_transaction_invalidates_later_checkpoints(self):
+        get_portfolio_snapshot([self.PORTFOLIOS.main], self.snapshot_date)
+
+        StockTransaction.objects.create(
+            amount=1,
+            date=date(2021, 2, 10),
+            ticker=self.STOCKS.MSFT,
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+            price=80.0,
+        )
+
+        self.assertEqual(self._checkpoint_dates(), [date(2021, 1, 31)])
+        self.assertEqual(
+            get_portfolio_snapshot([self.PORTFOLIOS.main], self.snapshot_date)
+            .positions["MSFT"]
+            .shares,
+            4,
+        )
+
+    def test_split_invalidates_checkpoints_of_holders(self):
+        get_portfolio_snapshot([self.PORTFOLIOS.main], self.snapshot_date)
+
+        StockSplit.objects.create(
+            ticker=self.STOCKS.MSFT,
+            date=date(2021, 2, 20),
+            ratio=3,
+            sync=self.SPLIT_SYNCS.main,
+        )
+
+        self.assertEqual(self._checkpoint_dates(), [date(2021, 1, 31)])
+        self.assertEqual(
+            get_portfolio_snapshot([self.PORTFOLIOS.main], self.snapshot_date)
+            .positions["MSFT"]
+            .shares,
+            9,
+        )
+
+    def test_checkpoints_are_not_shared_between_portfolio_sets(self):
+        get_portfolio_snapshot([self.PORTFOLIOS.main], self.snapshot_date)
+
+        result = get_portfolio_snapshot(
+            [self.PORTFOLIOS.main, self.PORTFOLIOS.other], self.snapshot_date
+        )
+
+        self.assertEqual(result.number_of_positions, 2)
+        self.assertEqual(
+            StockPortfolioCheckpoint.objects.filter(
+                portfolios=sorted([self.PORTFOLIOS.main.id, self.PORTFOLIOS.other.id])
+            ).count(),
+            2,
+        )
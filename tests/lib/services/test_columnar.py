@@ -0,0 +1,183 @@
+"""Test cases for the columnar replay engine."""
+
+from datetime import date, timedelta
+from random import Random
+
+from django.test import TestCase, override_settings
+from src.lib.services.columnar import load_actions
+from src.lib.services.stocks import get_portfolio
+from src.raw_data.models import StockSplit
+from src.transactions.models import StockTransaction
+from tests.stubs import to_events
+
+from ...seed import generate_test_data
+
+
+class TestColumnarReplay(TestCase):
+    """The columnar engine returns the same snapshots as the reference replay."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.STOCKS = data.STOCKS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.SPLIT_SYNCS = data.STOCK_SPLIT_SYNCS
+
+        cls.series = [date(2021, 1, 1) + timedelta(days=days) for days in range(40)]
+
+    def _transaction(self, stock, amount, day, price=10.0):
+        """Creates an unsaved stock transaction on a day of 2021."""
+
+        return StockTransaction(
+            ticker=stock,
+            amount=amount,
+            price=price,
+            date=date(2021, 1, 1) + timedelta(days=day),
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+        )
+
+    def _split(self, stock, ratio, day):
+        """Creates an unsaved stock split on a day of 2021."""
+
+        return StockSplit(
+            ticker=stock,
+            ratio=ratio,
+            date=date(2021, 1, 1) + timedelta(days=day),
+            sync=self.SPLIT_SYNCS.main,
+        )
+
+    def assertSameReplay(self, actions, series=None):
+        """Checks that both engines return the same snapshots in the same position order."""
+
+        # pylint: disable=invalid-name
+
+        series = series or self.series
+        actions = to_events(actions)
+
+        with override_settings(REPLAY_ENGINE="reference"):
+            expected = get_portfolio(actions, series, self.USERS.owner)
+        with override_settings(REPLAY_ENGINE="columnar"):
+            result = get_portfolio(actions, series, self.USERS.owner)
+
+        self.assertEqual(result, expected)
+        # The mapping methods of the snapshot series are not inferred by pylint.
+        # pylint: disable=no-member
+        for snapshot_date, snapshot in expected.items():
+            self.assertEqual(
+                list(result[snapshot_date].positions), list(snapshot.positions)
+            )
+
+    def test_load_actions(self):
+        columns = load_actions(
+            to_events(
+                [
+                    self._transaction(self.STOCKS.MSFT, 2, 0, price=100.0),
+                    self._split(self.STOCKS.PM, 2.0, 1),
+                    self._transaction(self.STOCKS.PM, 3, 2, price=50.0),
+                ]
+            )
+        )
+
+        self.assertEqual(columns.tickers, ["MSFT", "PM"])
+        self.assertEqual(columns.ticker_index.tolist(), [0, 1, 1])
+        self.assertEqual(columns.amounts.tolist(), [2, 0, 3])
+        self.assertEqual(columns.prices.tolist(), [100.0, 0.0, 50.0])
+        self.assertEqual(columns.ratios.tolist(), [1.0, 2.0, 1.0])
+        self.assertEqual(columns.is_split.tolist(), [False, True, False])
+
+    def test_empty(self):
+        self.assertSameReplay([])
+
+    def test_buys_and_sells(self):
+        self.assertSameReplay(
+            [
+                self._transaction(self.STOCKS.MSFT, 2, 0, price=100.01),
+                self._transaction(self.STOCKS.PM, 3, 0, price=50.02),
+                self._transaction(self.STOCKS.MSFT, 3, 3, price=103.33),
+                self._transaction(self.STOCKS.MSFT, -1, 5, price=110.0),
+                self._transaction(self.STOCKS.PM, 7, 8, price=49.99),
+            ]
+        )
+
+    def test_integer_splits(self):
+        self.assertSameReplay(
+            [
+                self._split(self.STOCKS.PM, 2.0, 0),
+                self._transaction(self.STOCKS.PM, 3, 1, price=50.03),
+                self._split(self.STOCKS.PM, 2.0, 4),
+                self._transaction(self.STOCKS.PM, 1, 6, price=26.11),
+                self._split(self.STOCKS.PM, 3.0, 6),
+                self._transaction(self.STOCKS.PM, -2, 9, price=9.0),
+            ]
+        )
+
+    def test_closed_and_reopened_positions(self):
+        self.assertSameReplay(
+            [
+                self._transaction(self.STOCKS.BABA, -1, 0),
+                self._transaction(self.STOCKS.BABA, 2, 1, price=150.0),
+                self._transaction(self.STOCKS.MSFT, 1, 2, price=90.0),
+                self._transaction(self.STOCKS.BABA, -2, 3, price=170.0),
+                self._split(self.STOCKS.BABA, 0.5, 4),
+                self._transaction(self.STOCKS.BABA, 5, 6, price=160.0),
+                self._split(self.STOCKS.BABA, 1.5, 7),
+            ]
+        )
+
+    def test_saved_actions(self):
+        actions = sorted(
+            [
+                *StockTransaction.objects.filter(portfolio=self.PORTFOLIOS.main),
+                *StockSplit.objects.all(),
+            ],
+            key=lambda x: x.date,
+        )
+
+        self.assertSameReplay(actions)
+
+    def test_negative_position(self):
+        actions = [
+            self._transaction(self.STOCKS.MSFT, 2, 0),
+            self._transaction(self.STOCKS.MSFT, -3, 1),
+        ]
+
+        for engine in ("reference", "columnar"):
+            with override_settings(REPLAY_ENGINE=engine):
+                self.assertRaisesMessage(
+                    Exception,
+                    "Negative position size is not allowed.",
+                    get_portfolio,
+                    to_events(actions),
+                    self.series,
+                    self.USERS.owner,
+                )
+
+    def test_random_histories(self):
+        randomizer = Random(42)
+        stocks = [self.STOCKS.MSFT, self.STOCKS.PM, self.STOCKS.BABA]
+
+        for _ in range(20):
+            actions, shares = [], {stock.ticker: 0 for stock in stocks}
+            for day in sorted(randomizer.randrange(40) for _ in range(30)):
+                stock = randomizer.choice(stocks)
+
+                if randomizer.random() < 0.1:
+                    ratio = randomizer.choice([2.0, 3.0, 0.5])
+                    shares[stock.ticker] = int(shares[stock.ticker] * ratio)
+                    actions.append(self._split(stock, ratio, day))
+                    continue
+
+                amount = randomizer.choice(
+                    [randomizer.randint(1, 10), -shares[stock.ticker]]
+                ) or randomizer.randint(1, 10)
+                shares[stock.ticker] += amount
+                actions.append(
+                    self._transaction(
+                        stock, amount, day, price=round(randomizer.uniform(5, 200), 2)
+                    )
+                )
+
+            self.assertSameReplay(actions)
+            self.assertSameReplay(actions, self.series[::7])
@@ -0,0 +1,132 @@
+"""Test cases for the dashboard service."""
+
+from datetime import date
+
+from django.test import TestCase
+from src.lib.dataclasses import CashBalanceSnapshot
+from src.lib.services.cash import (
+    get_invested_capital_snapshot,
+    get_portfolio_cash_balance_snapshot,
+)
+from src.lib.services.dashboard import get_portfolio_summary
+from src.lib.services.stocks import get_first_transaction, get_portfolio_snapshot
+from src.raw_data.models import StockDividend
+from src.transactions.enums import Currency
+from src.transactions.models import CashTransaction, ForexTransaction, StockTransaction
+
+from ...seed import generate_test_data
+
+
+class TestGetPortfolioSummary(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.STOCKS = data.STOCKS
+        cls.DIVIDEND_SYNCS = data.STOCK_DIVIDEND_SYNCS
+
+        cls.portfolios = [cls.PORTFOLIOS.main, cls.PORTFOLIOS.other]
+        cls.snapshot_date = date(2021, 3, 1)
+
+        for portfolio, ticker, amount, price, day in [
+            (cls.PORTFOLIOS.main, cls.STOCKS.MSFT, 2, 100.01, date(2020, 12, 2)),
+            (cls.PORTFOLIOS.other, cls.STOCKS.PM, 3, 50.02, date(2020, 12, 3)),
+            (cls.PORTFOLIOS.main, cls.STOCKS.PM, 4, 49.5, date(2021, 2, 1)),
+            (cls.PORTFOLIOS.main, cls.STOCKS.MSFT, 3, 95.0, date(2021, 4, 1)),
+        ]:
+            StockTransaction.objects.create(
+                ticker=ticker,
+                amount=amount,
+                price=price,
+                date=day,
+                owner=cls.USERS.owner,
+                portfolio=portfolio,
+            )
+
+        for portfolio, currency, amount, day in [
+            (cls.PORTFOLIOS.main, Currency.US_DOLLAR, 1_000.0, date(2020, 12, 1)),
+            (cls.PORTFOLIOS.other, Currency.EURO, 500.0, date(2020, 12, 1)),
+            (
+                cls.PORTFOLIOS.main,
+                Currency.HUNGARIAN_FORINT,
+                50_000.0,
+                date(2021, 1, 5),
+            ),
+        ]:
+            CashTransaction.objects.create(
+                currency=currency,
+                amount=amount,
+                date=day,
+                owner=cls.USERS.owner,
+                portfolio=portfolio,
+            )
+
+        ForexTransaction.objects.create(
+            source_currency=Currency.EURO,
+            target_currency=Currency.US_DOLLAR,
+            amount=200.0,
+            ratio=1.2,
+            date=date(2021, 1, 10),
+            owner=cls.USERS.owner,
+            portfolio=cls.PORTFOLIOS.other,
+        )
+
+        # Paid on the same day as the PM purchase in the main portfolio.
+        StockDividend.objects.create(
+            ticker=cls.STOCKS.PM,
+            amount=1.25,
+            date=date(2021, 2, 1),
+            sync=cls.DIVIDEND_SYNCS.main,
+        )
+
+    def test_matches_the_separate_calculations(self):
+        summary = get_portfolio_summary(self.portfolios, self.snapshot_date)
+
+        self.assertEqual(
+            summary.portfolio,
+            get_portfolio_snapshot(self.portfolios, self.snapshot_date),
+        )
+        # The database sums the cash flows in a different order than the replay.
+        cash_balance = get_portfolio_cash_balance_snapshot(
+            self.portfolios, self.snapshot_date
+        )
+        self.assertAlmostEqual(summary.cash_balance.USD, cash_balance.USD)
+        self.assertAlmostEqual(summary.cash_balance.EUR, cash_balance.EUR)
+        self.assertAlmostEqual(summary.cash_balance.HUF, cash_balance.HUF)
+        self.assertEqual(
+            summary.invested_capital,
+            get_invested_capital_snapshot(self.portfolios, self.snapshot_date),
+        )
+        self.assertEqual(
+            summary.first_transaction_date,
+            get_first_transaction(self.portfolios).date,
+        )
+
+    def test_dividend_income(self):
+        summary = get_portfolio_summary(self.portfolios, self.snapshot_date)
+
+        # 2 MSFT and 3 PM shares on 2021-01-01, then 10 PM shares after the split on 2021-02-01.
+        self.assertEqual(summary.dividend_income, 2 * 3 + 3 * 1.5 + 10 * 1.25)
+
+    def test_excludes_later_transactions(self):
+        summary = get_portfolio_summary(self.portfolios, date(2020, 12, 2))
+
+        self.assertEqual(summary.portfolio.positions["MSFT"].shares, 2)
+        self.assertEqual(
+            summary.cash_balance,
+            CashBalanceSnapshot(USD=1_000.0 - 200.02, EUR=500.0, HUF=0),
+        )
+        self.assertEqual(summary.dividend_income, 0)
+        self.assertEqual(summary.first_transaction_date, date(2020, 12, 2))
+
+    def test_no_transactions(self):
+        summary = get_portfolio_summary(
+            [self.PORTFOLIOS.other_users], self.snapshot_date
+        )
+
+        self.assertEqual(summary.portfolio.positions, {})
+        self.assertEqual(summary.cash_balance, CashBalanceSnapshot())
+        self.assertEqual(summary.invested_capital, CashBalanceSnapshot())
+        self.assertEqual(summary.dividend_income, 0)
+        self.assertIsNone(summary.first_transaction_date)
@@ -5,7 +5,7 @@ from datetime import date
 from django.test import TestCase
 from src.lib.dataclasses import Interval
 from src.lib.enums import Resolution
-from src.lib.services.date import get_resolution, get_timeseries
+from src.lib.services.date import get_month_ends, get_resolution, get_timeseries
 
 
 class TestGetResolution(TestCase):
@@ -55,3 +55,24 @@ class TestGetTimeseries(TestCase):
 
         with self.assertRaises(Exception):
             get_timeseries(interval, Resolution.WEEK)
+
+
+class TestGetMonthEnds(TestCase):
+    def test_zero_interval(self):
+        interval = Interval(start_date=date(2022, 1, 31), end_date=date(2022, 1, 31))
+
+        self.assertEqual(get_month_ends(interval), [])
+
+    def test_month_end_generation(self):
+        interval = Interval(start_date=date(2021, 12, 31), end_date=date(2022, 3, 31))
+
+        self.assertEqual(
+            get_month_ends(interval),
+            [date(2021, 12, 31), date(2022, 1, 31), date(2022, 2, 28)],
+        )
+
+    def test_inverse_interval(self):
+        interval = Interval(start_date=date(2022, 2, 1), end_date=date(2022, 1, 1))
+
+        with self.assertRaises(Exception):
+            get_month_ends(interval)
@@ -0,0 +1,67 @@
+"""Test cases for the downsampling service."""
+
+from datetime import date, timedelta
+
+import numpy as np
+from django.test import TestCase
+from src.lib.dataclasses import PerformanceSnapshot
+from src.lib.services.downsample import (
+    downsample_performance,
+    largest_triangle_three_buckets,
+)
+
+
+class TestLargestTriangleThreeBuckets(TestCase):
+    def test_keeps_the_peaks(self):
+        ordinals = np.arange(9, dtype=np.float64)
+        values = np.array([0, 1, 10, 0, 0, -10, 1, 0, 0], dtype=np.float64)
+
+        self.assertEqual(
+            largest_triangle_three_buckets(ordinals, values, 4).tolist(), [0, 2, 5, 8]
+        )
+
+    def test_small_input(self):
+        ordinals = np.arange(3, dtype=np.float64)
+
+        self.assertEqual(
+            largest_triangle_three_buckets(ordinals, ordinals, 5).tolist(), [0, 1, 2]
+        )
+        self.assertEqual(
+            largest_triangle_three_buckets(ordinals, ordinals, 2).tolist(), [0, 2]
+        )
+
+
+class TestDownsamplePerformance(TestCase):
+    def setUp(self):
+        start_date = date(2022, 1, 1)
+        self.performance = {}
+        base_size = 100.0
+        for offset, (appreciation, dividends, cash_flow) in enumerate(
+            [(1, 0, 0), (2, 1, 50), (-3, 0, 0), (4, 2, -20), (1, 0, 10), (0, 0, 0)]
+        ):
+            snapshot = PerformanceSnapshot(
+                date=start_date + timedelta(days=offset),
+                base_size=base_size,
+                appreciation=appreciation,
+                dividends=dividends,
+                cash_flow=cash_flow,
+            )
+            self.performance[snapshot.date] = snapshot
+            base_size = snapshot.capital_size
+
+    def test_sums_the_dropped_flows(self):
+        result = list(downsample_performance(self.performance, 3).values())
+        snapshots = list(self.performance.values())
+
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0], snapshots[0])
+        self.assertEqual(result[-1].capital_size, snapshots[-1].capital_size)
+        self.assertEqual(sum(snapshot.dividends for snapshot in result), 3)
+        self.assertEqual(sum(snapshot.cash_flow for snapshot in result), 40)
+
+        # The kept snapshots chain like a series calculated at their dates.
+        for previous, snapshot in zip(result, result[1:]):
+            self.assertEqual(snapshot.base_size, previous.capital_size)
+
+    def test_within_budget(self):
+        self.assertIs(downsample_performance(self.performance, 6), self.performance)
@@ -0,0 +1,116 @@
+"""Test cases for the replay event loaders."""
+
+from datetime import date
+from tempfile import TemporaryDirectory
+
+from django.test import TestCase, override_settings
+from src.lib.dataclasses import Interval
+from src.lib.services.events import (
+    DividendEvent,
+    PriceEvent,
+    TransactionEvent,
+    load_dividend_events,
+    load_price_events,
+    load_transaction_events,
+    stream_events,
+)
+from src.transactions.models import StockTransaction
+
+from ...seed import generate_test_data
+
+
+class TestLoadEvents(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.PORTFOLIOS = data.PORTFOLIOS
+
+        for transaction_date, ticker in [
+            (date(2020, 12, 30), data.STOCKS.MSFT),
+            (date(2021, 1, 2), data.STOCKS.MSFT),
+            (date(2021, 1, 2), data.STOCKS.PM),
+        ]:
+            StockTransaction.objects.create(
+                ticker=ticker,
+                amount=2,
+                price=85.0,
+                date=transaction_date,
+                owner=data.USERS.owner,
+                portfolio=data.PORTFOLIOS.main,
+            )
+
+    def test_load_price_events(self):
+        interval = Interval(date(2021, 1, 2), date(2021, 1, 5))
+
+        with self.assertNumQueries(3):
+            result = load_price_events("MSFT", interval)
+
+        # The latest price before the interval is the anchor.
+        self.assertEqual(
+            result,
+            [
+                PriceEvent(date(2021, 1, 1), "MSFT", 89),
+                PriceEvent(date(2021, 1, 2), "MSFT", 90),
+            ],
+        )
+
+    def test_load_price_events_without_anchor(self):
+        self.assertEqual(
+            load_price_events("MSFT", Interval(date(2020, 12, 1), date(2020, 12, 31))),
+            [PriceEvent(date(2020, 12, 31), "MSFT", 89)],
+        )
+
+    def test_load_price_events_from_the_store(self):
+        interval = Interval(date(2021, 1, 2), date(2021, 1, 5))
+        expected = load_price_events("MSFT", interval)
+
+        with TemporaryDirectory() as store, override_settings(PRICE_STORE_PATH=store):
+            self.assertEqual(load_price_events("MSFT", interval), expected)
+            self.assertEqual(
+                load_price_events(
+                    "MSFT", Interval(date(2020, 12, 1), date(2020, 12, 31))
+                ),
+                [PriceEvent(date(2020, 12, 31), "MSFT", 89)],
+            )
+            self.assertEqual(load_price_events("UNKNOWN", interval), [])
+
+    def test_load_dividend_events(self):
+        self.assertEqual(
+            load_dividend_events("PM", Interval(date(2021, 1, 1), date(2021, 1, 5))),
+            [DividendEvent(date(2021, 1, 1), "PM", 1.5)],
+        )
+        self.assertEqual(
+            load_dividend_events("PM", Interval(date(2021, 1, 2), date(2021, 1, 5))),
+            [],
+        )
+
+    def test_load_transaction_events(self):
+        result = load_transaction_events(
+            self.PORTFOLIOS.main, "MSFT", Interval(date(2021, 1, 1), date(2021, 1, 5))
+        )
+
+        self.assertEqual(
+            result,
+            [
+                TransactionEvent(
+                    date(2021, 1, 2), "MSFT", 2, 85.0, self.PORTFOLIOS.main.id
+                )
+            ],
+        )
+
+    def test_stream_events(self):
+        transactions = StockTransaction.objects.filter(portfolio=self.PORTFOLIOS.main)
+
+        # The rows are read without joining the stocks.
+        with self.assertNumQueries(1):
+            result = list(stream_events(transactions.order_by("-date")))
+
+        self.assertEqual(
+            [(event.date, event.ticker_id) for event in result],
+            [
+                (date(2020, 12, 30), "MSFT"),
+                (date(2021, 1, 2), "MSFT"),
+                (date(2021, 1, 2), "PM"),
+            ],
+        )
+        self.assertTrue(all(isinstance(event, TransactionEvent) for event in result))
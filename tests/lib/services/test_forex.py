@@ -0,0 +1,141 @@
+"""Test cases for the forex rate service."""
+
+from datetime import date
+
+from django.test import TestCase, override_settings
+from src.lib.services.cache import bump_shared_versions
+from src.lib.services.forex import (
+    FOREX_RATES,
+    ForexRates,
+    get_forex_rates,
+    refresh_forex_rates,
+)
+from src.raw_data.models import ForexRate, ForexRateSync
+from src.transactions.enums import Currency
+
+from ...seed import generate_test_data
+
+
+@override_settings(USD_HUF_FX_RATE=300.0, EUR_USD_FX_RATE=1.2)
+class TestForexRates(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        sync = ForexRateSync.objects.create(owner=data.USERS.bot)
+
+        # The later rate of a day wins.
+        for rate_date, rate in [
+            (date(2022, 1, 1), 1.1),
+            (date(2022, 2, 1), 1.15),
+            (date(2022, 2, 1), 1.05),
+        ]:
+            ForexRate.objects.create(
+                source_currency=Currency.EURO,
+                target_currency=Currency.US_DOLLAR,
+                date=rate_date,
+                rate=rate,
+                sync=sync,
+            )
+
+        # The rates against USD are inverted.
+        ForexRate.objects.create(
+            source_currency=Currency.US_DOLLAR,
+            target_currency=Currency.HUNGARIAN_FORINT,
+            date=date(2022, 1, 1),
+            rate=400,
+            sync=sync,
+        )
+
+    def setUp(self):
+        self.rates = ForexRates()
+
+    def test_rate(self):
+        self.assertEqual(self.rates.rate(Currency.US_DOLLAR, date(2022, 1, 1)), 1)
+        self.assertEqual(self.rates.rate(Currency.EURO, date(2021, 12, 31)), 1.1)
+        self.assertEqual(self.rates.rate(Currency.EURO, date(2022, 1, 31)), 1.1)
+        self.assertEqual(self.rates.rate(Currency.EURO, date(2022, 2, 1)), 1.05)
+        self.assertEqual(
+            self.rates.rate(Currency.HUNGARIAN_FORINT, date(2022, 3, 1)), 1 / 400
+        )
+
+    def test_rate_without_history(self):
+        ForexRate.objects.all().delete()
+
+        self.assertEqual(self.rates.rate(Currency.EURO, date(2022, 1, 1)), 1.2)
+        self.assertEqual(
+            self.rates.rate(Currency.HUNGARIAN_FORINT, date(2022, 1, 1)), 1 / 300
+        )
+
+    @override_settings(USD_HUF_FX_RATE=None, EUR_USD_FX_RATE=None)
+    def test_rate_without_history_and_setting(self):
+        ForexRate.objects.all().delete()
+
+        for currency in (Currency.EURO, Currency.HUNGARIAN_FORINT):
+            self.assertRaisesMessage(
+                Exception,
+                f"There is no synced or configured forex rate for {currency}.",
+                self.rates.rate,
+                currency,
+                date(2022, 1, 1),
+            )
+
+    def test_to_usd(self):
+        result = self.rates.to_usd(
+            [100, 100, 4_000, 100],
+            [
+                Currency.EURO,
+                Currency.US_DOLLAR,
+                Currency.HUNGARIAN_FORINT,
+                Currency.EURO,
+            ],
+            [
+                date(2022, 1, 15),
+                date(2022, 1, 15),
+                date(2022, 1, 15),
+                date(2022, 2, 15),
+            ],
+        )
+
+        self.assertEqual(result.round(6).tolist(), [110, 100, 10, 105])
+
+    def test_to_usd_queries_once(self):
+        with self.assertNumQueries(1):
+            self.rates.to_usd(
+                [100, 4_000],
+                [Currency.EURO, Currency.HUNGARIAN_FORINT],
+                [date(2022, 1, 15), date(2022, 1, 15)],
+            )
+            self.rates.rate(Currency.EURO, date(2022, 2, 15))
+
+    @override_settings(FOREX_RATE_CACHE=True)
+    def test_refresh_forex_rates(self):
+        self.addCleanup(FOREX_RATES.clear)
+        self.assertIs(get_forex_rates(), FOREX_RATES)
+        self.assertEqual(FOREX_RATES.rate(Currency.EURO, date(2022, 3, 1)), 1.05)
+
+        ForexRate.objects.create(
+            source_currency=Currency.EURO,
+            target_currency=Currency.US_DOLLAR,
+            date=date(2022, 3, 1),
+            rate=1.25,
+            sync=ForexRateSync.objects.get(),
+        )
+        refresh_forex_rates()
+
+        self.assertEqual(FOREX_RATES.rate(Currency.EURO, date(2022, 3, 1)), 1.25)
+
+    def test_synced_by_another_process(self):
+        self.assertEqual(self.rates.rate(Currency.EURO, date(2022, 3, 1)), 1.05)
+
+        ForexRate.objects.create(
+            source_currency=Currency.EURO,
+            target_currency=Currency.US_DOLLAR,
+            date=date(2022, 3, 1),
+            rate=1.25,
+            sync=ForexRateSync.objects.get(),
+        )
+        # Only the shared version is bumped by the process that handled the sync.
+        bump_shared_versions("forex", [Currency.EURO])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.rates.rate(Currency.EURO, date(2022, 3, 1)), 1.25)
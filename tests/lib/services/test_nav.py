@@ -0,0 +1,169 @@
+"""Test cases for the portfolio NAV service."""
+
+from datetime import date, timedelta
+
+from django.test import TestCase, override_settings
+from src.lib.services.nav import (
+    NavRow,
+    calculate_nav,
+    get_portfolio_nav,
+    materialize_nav,
+)
+from src.lib.services.performance import get_nav_performance
+from src.performance.models import PortfolioNav
+from src.stocks.models import StockPortfolio
+from src.transactions.enums import Currency
+from src.transactions.models import CashTransaction, StockTransaction
+
+from ...seed import generate_test_data
+
+
+def get_days(start_date: date, end_date: date) -> list[date]:
+    """Every day from the start date until the end date."""
+
+    return [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+
+
+@override_settings(USD_HUF_FX_RATE=300.0)
+class TestPortfolioNav(TestCase):
+    portfolio: StockPortfolio
+
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.STOCKS = data.STOCKS
+
+        cls.portfolio = cls.PORTFOLIOS.main
+        StockTransaction.objects.create(
+            ticker=cls.STOCKS.MSFT,
+            amount=2,
+            price=85.0,
+            date=date(2020, 12, 30),
+            owner=cls.USERS.owner,
+            portfolio=cls.portfolio,
+        )
+        StockTransaction.objects.create(
+            ticker=cls.STOCKS.PM,
+            amount=4,
+            price=40.0,
+            date=date(2021, 1, 1),
+            owner=cls.USERS.owner,
+            portfolio=cls.portfolio,
+        )
+        CashTransaction.objects.create(
+            currency=Currency.US_DOLLAR,
+            amount=1_000,
+            date=date(2020, 12, 29),
+            owner=cls.USERS.owner,
+            portfolio=cls.portfolio,
+        )
+        CashTransaction.objects.create(
+            currency=Currency.HUNGARIAN_FORINT,
+            amount=3_000,
+            date=date(2021, 1, 2),
+            owner=cls.USERS.owner,
+            portfolio=cls.portfolio,
+        )
+
+    def get_stored_rows(self) -> list[NavRow]:
+        """Returns the materialized days of the portfolio."""
+
+        return [
+            NavRow(*values)
+            for values in PortfolioNav.objects.filter(portfolio=self.portfolio)
+            .order_by("date")
+            .values_list(
+                "date",
+                "assets_under_management",
+                "cash_flow",
+                "dividends",
+                "invested_capital",
+            )
+        ]
+
+    def test_calculate_nav(self):
+        rows = calculate_nav(
+            self.portfolio, get_days(date(2020, 12, 29), date(2021, 1, 3))
+        )
+
+        self.assertEqual(
+            rows,
+            [
+                NavRow(date(2020, 12, 29), 0, 1_000, 0, 1_000),
+                # There is no price yet, so the position is valued at its opening price.
+                NavRow(date(2020, 12, 30), 170, 0, 0, 1_000),
+                NavRow(date(2020, 12, 31), 178, 0, 0, 1_000),
+                NavRow(date(2021, 1, 1), 362, 0, 12, 1_000),
+                NavRow(date(2021, 1, 2), 360, 10, 0, 1_010),
+                NavRow(date(2021, 1, 3), 360, 0, 0, 1_010),
+            ],
+        )
+
+    def test_calculate_nav_sums_the_flows_since_the_previous_date(self):
+        rows = calculate_nav(
+            self.portfolio,
+            [date(2021, 1, 1), date(2021, 1, 3)],
+            since=date(2020, 12, 29),
+        )
+
+        self.assertEqual(
+            rows,
+            [
+                NavRow(date(2021, 1, 1), 362, 0, 12, 1_000),
+                NavRow(date(2021, 1, 3), 360, 10, 0, 1_010),
+            ],
+        )
+
+    def test_materialize_nav(self):
+        self.assertEqual(materialize_nav(self.portfolio, date(2020, 12, 31)), 3)
+        self.assertEqual(materialize_nav(self.portfolio, date(2020, 12, 31)), 0)
+        self.assertEqual(materialize_nav(self.portfolio, date(2021, 1, 3)), 3)
+
+        self.assertEqual(
+            self.get_stored_rows(),
+            calculate_nav(
+                self.portfolio, get_days(date(2020, 12, 29), date(2021, 1, 3))
+            ),
+        )
+
+    def test_materialize_nav_without_transactions(self):
+        self.assertEqual(materialize_nav(self.PORTFOLIOS.other, date(2021, 1, 3)), 0)
+
+    def test_get_portfolio_nav(self):
+        series = [date(2020, 12, 29), date(2020, 12, 31), date(2021, 1, 2)]
+        expected = get_nav_performance(
+            calculate_nav(self.portfolio, series, since=date(2020, 12, 28)), series
+        )
+
+        materialize_nav(self.portfolio, date(2020, 12, 31))
+        rows = get_portfolio_nav(self.portfolio, date(2020, 12, 29), series)
+
+        # Only the dates after the last materialized day are replayed.
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(get_nav_performance(rows, series), expected)
+
+    def test_transactions_invalidate_the_nav(self):
+        materialize_nav(self.portfolio, date(2021, 1, 3))
+
+        transaction = CashTransaction.objects.create(
+            currency=Currency.US_DOLLAR,
+            amount=100,
+            date=date(2021, 1, 2),
+            owner=self.USERS.owner,
+            portfolio=self.portfolio,
+        )
+        self.assertEqual(self.get_stored_rows()[-1].date, date(2021, 1, 1))
+
+        materialize_nav(self.portfolio, date(2021, 1, 3))
+        transaction.date = date(2020, 12, 30)
+        transaction.save()
+        self.assertEqual(self.get_stored_rows()[-1].date, date(2020, 12, 29))
+
+        materialize_nav(self.portfolio, date(2021, 1, 3))
+        StockTransaction.objects.filter(ticker=self.STOCKS.PM).delete()
+        self.assertEqual(self.get_stored_rows()[-1].date, date(2020, 12, 31))
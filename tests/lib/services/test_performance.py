@@ -1,22 +1,29 @@
 """Test cases for the performance service."""
 
+from copy import copy
 from datetime import date
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from src.lib.dataclasses import (
     PerformanceSnapshot,
+    SnapshotSeries,
     StockPortfolioSnapshot,
     StockPositionSnapshot,
 )
+from src.lib.services.events import DividendEvent, PriceEvent, TransactionEvent
+from src.lib.services.nav import NavRow, get_portfolio_nav
 from src.lib.services.performance import (
-    get_portfolio_performance,
+    get_nav_performance,
     get_position_performance,
+    get_summary_performance,
+    merge_performances,
+    money_weighted_return,
     time_weighted_return,
 )
-from src.raw_data.models import StockDividend, StockPrice
 from src.transactions.enums import Currency
-from src.transactions.models import CashTransaction
+from src.transactions.models import CashTransaction, StockTransaction
 
+from ...cases import CommittedTestCase
 from ...seed import generate_test_data
 
 
@@ -29,40 +36,40 @@ class TestGetPositionPerformance(TestCase):
         cls.STOCKS = data.STOCKS
 
         cls.snapshot_date = date(2022, 1, 1)
-        cls.snapshots = {
-            cls.snapshot_date: StockPortfolioSnapshot(
-                positions={
-                    "PM": StockPositionSnapshot(
-                        stock=cls.STOCKS.PM,
-                        shares=2,
-                        price=100.0,
-                        dividend=2.5,
-                        purchase_price=10.0,
-                        first_purchase_date=date(2021, 1, 1),
-                        latest_purchase_date=date(2021, 6, 1),
-                    )
-                },
-                date=cls.snapshot_date,
-                owner=cls.USERS.owner,
-            )
-        }
+        cls.snapshots = SnapshotSeries(
+            {
+                cls.snapshot_date: StockPortfolioSnapshot(
+                    positions={
+                        "PM": StockPositionSnapshot(
+                            stock=cls.STOCKS.PM,
+                            shares=2,
+                            price=100.0,
+                            dividend=2.5,
+                            purchase_price=10.0,
+                            first_purchase_date=date(2021, 1, 1),
+                            latest_purchase_date=date(2021, 6, 1),
+                        )
+                    },
+                    date=cls.snapshot_date,
+                    owner=cls.USERS.owner,
+                )
+            }
+        )
         cls.price_info = [
-            StockPrice(ticker=cls.STOCKS.PM, date=cls.snapshot_date, value=100),
-            StockPrice(ticker=cls.STOCKS.PM, date=cls.snapshot_date, value=105),
-            StockPrice(ticker=cls.STOCKS.PM, date=cls.snapshot_date, value=102),
-        ]
-        cls.dividends = [
-            StockDividend(ticker=cls.STOCKS.PM, date=date(2022, 1, 1), amount=10.0)
+            PriceEvent(cls.snapshot_date, "PM", 100),
+            PriceEvent(cls.snapshot_date, "PM", 105),
+            PriceEvent(cls.snapshot_date, "PM", 102),
         ]
+        cls.dividends = [DividendEvent(date(2022, 1, 1), "PM", 10.0)]
         cls.transactions = []
 
     def test_empty(self):
-        self.assertEqual(get_position_performance({}, [], [], [], []), {})
+        self.assertEqual(get_position_performance(SnapshotSeries(), [], [], [], []), {})
 
     def test_no_snapshots(self):
         self.assertEqual(
             get_position_performance(
-                {},
+                SnapshotSeries(),
                 self.price_info,
                 self.dividends,
                 self.transactions,
@@ -103,6 +110,24 @@ class TestGetPositionPerformance(TestCase):
             ),
         )
 
+    def test_transactions(self):
+        result = get_position_performance(
+            self.snapshots,
+            [],
+            [],
+            [
+                TransactionEvent(
+                    self.snapshot_date, "PM", 1, 100.0, self.PORTFOLIOS.main.id
+                )
+            ],
+            [self.snapshot_date],
+        )
+
+        self.assertEqual(
+            result[self.snapshot_date],
+            PerformanceSnapshot(self.snapshot_date, base_size=200, cash_flow=100),
+        )
+
     def test_no_series(self):
         self.assertEqual(
             get_position_performance(
@@ -127,106 +152,139 @@ class TestGetPositionPerformance(TestCase):
             ),
         )
 
+    def test_uses_the_latest_snapshot(self):
+        earlier_date = date(2021, 12, 1)
+        earlier_position = copy(self.snapshots[self.snapshot_date].positions["PM"])
+        earlier_position.shares = 1
+        snapshots = SnapshotSeries(
+            {
+                earlier_date: StockPortfolioSnapshot(
+                    positions={"PM": earlier_position},
+                    date=earlier_date,
+                    owner=self.USERS.owner,
+                ),
+                **self.snapshots,
+            }
+        )
 
-class TestGetPortfolioPerformance(TestCase):
-    @classmethod
-    def setUpTestData(cls):
-        data = generate_test_data()
-        cls.USERS = data.USERS
-        cls.PORTFOLIOS = data.PORTFOLIOS
-        cls.STOCKS = data.STOCKS
+        result = get_position_performance(
+            snapshots, [], self.dividends, [], [earlier_date, self.snapshot_date]
+        )
+
+        # The dividend is paid on the shares of the latest snapshot.
+        self.assertEqual(result[self.snapshot_date].dividends, 20)
 
-        cls.snapshot_date = date(2022, 1, 1)
-        cls.snapshots = {
-            cls.snapshot_date: StockPortfolioSnapshot(
-                positions={
-                    "PM": StockPositionSnapshot(
-                        stock=cls.STOCKS.PM,
-                        shares=2,
-                        price=100.0,
-                        dividend=2.5,
-                        purchase_price=10.0,
-                        first_purchase_date=date(2021, 1, 1),
-                        latest_purchase_date=date(2021, 6, 1),
-                    )
-                },
-                date=cls.snapshot_date,
-                owner=cls.USERS.owner,
-            )
-        }
-        cls.dividends = [
-            StockDividend(ticker=cls.STOCKS.PM, date=date(2022, 1, 1), amount=10.0)
-        ]
-        cls.transactions = [
-            CashTransaction(
-                currency=Currency.HUNGARIAN_FORINT,
-                amount=3_000.0,
-                date=date(2021, 1, 1),
-                owner=cls.USERS.owner,
-                portfolio=cls.PORTFOLIOS.main,
-            ),
-            CashTransaction(
-                currency=Currency.HUNGARIAN_FORINT,
-                amount=-1_000.0,
-                date=date(2021, 1, 1),
-                owner=cls.USERS.owner,
-                portfolio=cls.PORTFOLIOS.main,
-            ),
-        ]
 
+@override_settings(USD_HUF_FX_RATE=300.0)
+class TestGetNavPerformance(TestCase):
     def test_empty(self):
-        self.assertEqual(get_portfolio_performance({}, [], [], []), {})
+        self.assertEqual(get_nav_performance([], []), {})
 
-    def test_no_snapshots(self):
+    def test_no_rows(self):
         self.assertEqual(
-            get_portfolio_performance(
-                {}, self.dividends, self.transactions, [self.snapshot_date]
-            ),
-            {},
+            get_nav_performance([], [date(2022, 1, 1)]),
+            {date(2022, 1, 1): PerformanceSnapshot(date=date(2022, 1, 1))},
         )
 
-    def test_no_dividends(self):
-        result = get_portfolio_performance(
-            self.snapshots, [], self.transactions, [self.snapshot_date]
-        )
+    def test_performance_calculation(self):
+        rows = [
+            NavRow(date(2022, 1, 1), 100, 0, 0, 100),
+            NavRow(date(2022, 1, 2), 120, 10, 2, 110),
+            NavRow(date(2022, 1, 3), 150, 0, 1, 110),
+        ]
+
+        result = get_nav_performance(rows, [date(2022, 1, 1), date(2022, 1, 3)])
 
         self.assertEqual(
-            result[self.snapshot_date],
-            PerformanceSnapshot(
-                date=self.snapshot_date, base_size=200, cash_flow=6.666666666666666
-            ),
+            result,
+            {
+                date(2022, 1, 1): PerformanceSnapshot(
+                    date=date(2022, 1, 1), base_size=100
+                ),
+                # The flows of every row since the previous snapshot are summed.
+                date(2022, 1, 3): PerformanceSnapshot(
+                    date=date(2022, 1, 3),
+                    base_size=100,
+                    appreciation=50,
+                    dividends=3,
+                    cash_flow=10,
+                ),
+            },
         )
 
-    def test_no_transactions(self):
-        result = get_portfolio_performance(
-            self.snapshots, self.dividends, [], [self.snapshot_date]
-        )
 
-        self.assertEqual(
-            result[self.snapshot_date],
-            PerformanceSnapshot(date=self.snapshot_date, base_size=200, dividends=20),
+class TestMergePerformances(TestCase):
+    def test_empty(self):
+        self.assertEqual(merge_performances([]), {})
+
+    def test_sums_the_snapshots_by_date(self):
+        result = merge_performances(
+            [
+                {
+                    date(2022, 1, 2): PerformanceSnapshot(
+                        date(2022, 1, 2), 100, 10, 1, 5
+                    ),
+                },
+                {
+                    date(2022, 1, 1): PerformanceSnapshot(date(2022, 1, 1), 50, 5),
+                    date(2022, 1, 2): PerformanceSnapshot(
+                        date(2022, 1, 2), 300, -10, 2, 15
+                    ),
+                },
+            ]
         )
 
-    def test_no_series(self):
         self.assertEqual(
-            get_portfolio_performance(
-                self.snapshots, self.dividends, self.transactions, []
-            ),
-            {},
+            result,
+            {
+                date(2022, 1, 1): PerformanceSnapshot(date(2022, 1, 1), 50, 5),
+                date(2022, 1, 2): PerformanceSnapshot(date(2022, 1, 2), 400, 0, 3, 20),
+            },
         )
+        self.assertEqual(list(result), [date(2022, 1, 1), date(2022, 1, 2)])
 
-    def test_performance_calculation(self):
-        result = get_portfolio_performance(
-            self.snapshots, self.dividends, self.transactions, [self.snapshot_date]
-        )
+
+class TestGetSummaryPerformance(CommittedTestCase):
+    # The portfolios are loaded by worker threads, so the test data must be committed.
+
+    def setUp(self):
+        data = generate_test_data()
+        self.portfolios = [data.PORTFOLIOS.main, data.PORTFOLIOS.other]
+
+        for portfolio, ticker in zip(
+            self.portfolios, [data.STOCKS.MSFT, data.STOCKS.PM]
+        ):
+            StockTransaction.objects.create(
+                ticker=ticker,
+                amount=2,
+                price=50.0,
+                date=date(2020, 12, 30),
+                owner=data.USERS.owner,
+                portfolio=portfolio,
+            )
+            CashTransaction.objects.create(
+                currency=Currency.US_DOLLAR,
+                amount=500,
+                date=date(2021, 1, 1),
+                owner=data.USERS.owner,
+                portfolio=portfolio,
+            )
+
+    def test_empty(self):
+        self.assertEqual(get_summary_performance([], date(2021, 1, 1), []), {})
+
+    @override_settings(PERFORMANCE_WORKERS=2)
+    def test_merges_the_portfolios(self):
+        start_date = date(2020, 12, 30)
+        series = [date(2020, 12, 30), date(2021, 1, 1), date(2021, 1, 3)]
 
         self.assertEqual(
-            result[self.snapshot_date],
-            PerformanceSnapshot(
-                date=self.snapshot_date,
-                base_size=200,
-                dividends=20,
-                cash_flow=6.666666666666666,
+            get_summary_performance(self.portfolios, start_date, series),
+            merge_performances(
+                get_nav_performance(
+                    get_portfolio_nav(portfolio, start_date, series), series
+                )
+                for portfolio in self.portfolios
             ),
         )
 
@@ -243,3 +301,22 @@ class TestTimeWeightedReturn(TestCase):
         ]
 
         self.assertEqual(round(time_weighted_return(snapshots), 2), 0.3)
+
+
+class TestMoneyWeightedReturn(TestCase):
+    def test_empty_snapshots(self):
+        self.assertIsNone(money_weighted_return([]))
+
+    def test_weighted_return_calculation(self):
+        snapshots = [
+            PerformanceSnapshot(date(2021, 1, 1), 100),
+            PerformanceSnapshot(date(2022, 1, 1), 100, 10, cash_flow=100),
+            PerformanceSnapshot(date(2023, 1, 1), 210, 21),
+        ]
+
+        self.assertAlmostEqual(money_weighted_return(snapshots), 0.1)
+
+    def test_unsolvable(self):
+        snapshots = [PerformanceSnapshot(date(2021, 1, 1), 0, 10)]
+
+        self.assertIsNone(money_weighted_return(snapshots))
@@ -0,0 +1,124 @@
+"""Test cases for the performance result cache service."""
+
+from datetime import date
+from unittest.mock import Mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from src.lib.dataclasses import Interval, PerformanceSnapshot
+from src.lib.enums import Resolution
+from src.lib.services.nav import materialize_nav
+from src.lib.services.performance_cache import (
+    bump_data_versions,
+    get_cached_performance,
+    invalidate_stock_performance,
+)
+from src.performance.models import PortfolioNav
+from src.transactions.models import StockTransaction
+
+from ...seed import generate_test_data
+
+
+@override_settings(PERFORMANCE_CACHE="default")
+class TestGetCachedPerformance(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.STOCKS = data.STOCKS
+
+        cls.interval = Interval(date(2021, 1, 1), date(2021, 1, 5))
+        cls.performance = {
+            date(2021, 1, 1): PerformanceSnapshot(date=date(2021, 1, 1), base_size=100)
+        }
+
+    def setUp(self):
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.calculate = Mock(return_value=self.performance)
+
+    def get(self, portfolio_id, ticker=None, interval=None, resolution=Resolution.DAY):
+        """Returns the cached performance with the mocked calculation."""
+
+        return get_cached_performance(
+            portfolio_id, ticker, interval or self.interval, resolution, self.calculate
+        )
+
+    def test_caches_the_results(self):
+        self.assertEqual(self.get(self.PORTFOLIOS.main.id), self.performance)
+        self.assertEqual(self.get(self.PORTFOLIOS.main.id), self.performance)
+
+        self.assertEqual(self.calculate.call_count, 1)
+
+    @override_settings(PERFORMANCE_CACHE="")
+    def test_disabled(self):
+        self.get(self.PORTFOLIOS.main.id)
+        self.get(self.PORTFOLIOS.main.id)
+
+        self.assertEqual(self.calculate.call_count, 2)
+
+    def test_keys(self):
+        self.get(self.PORTFOLIOS.main.id)
+        self.get(self.PORTFOLIOS.other.id)
+        self.get(self.PORTFOLIOS.main.id, ticker="MSFT")
+        self.get(self.PORTFOLIOS.main.id, resolution=Resolution.WEEK)
+        self.get(
+            self.PORTFOLIOS.main.id,
+            interval=Interval(date(2021, 1, 1), date(2021, 1, 6)),
+        )
+
+        self.assertEqual(self.calculate.call_count, 5)
+
+    def test_bump_data_versions(self):
+        self.get(self.PORTFOLIOS.main.id)
+        self.get(self.PORTFOLIOS.other.id)
+
+        bump_data_versions([self.PORTFOLIOS.main.id])
+        self.get(self.PORTFOLIOS.main.id)
+        self.get(self.PORTFOLIOS.other.id)
+
+        self.assertEqual(self.calculate.call_count, 3)
+
+    def test_transactions_bump_the_version(self):
+        self.get(self.PORTFOLIOS.main.id)
+        self.get(self.PORTFOLIOS.other.id)
+
+        StockTransaction.objects.create(
+            ticker=self.STOCKS.MSFT,
+            amount=2,
+            price=85.0,
+            date=date(2020, 12, 30),
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+        )
+        self.get(self.PORTFOLIOS.main.id)
+        self.get(self.PORTFOLIOS.other.id)
+
+        self.assertEqual(self.calculate.call_count, 3)
+
+    def test_invalidate_stock_performance(self):
+        StockTransaction.objects.create(
+            ticker=self.STOCKS.MSFT,
+            amount=2,
+            price=85.0,
+            date=date(2020, 12, 30),
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+        )
+        materialize_nav(self.PORTFOLIOS.main, date(2021, 1, 3))
+        self.get(self.PORTFOLIOS.main.id)
+
+        invalidate_stock_performance("BABA", date(2021, 1, 1))
+        self.get(self.PORTFOLIOS.main.id)
+        self.assertEqual(self.calculate.call_count, 1)
+        self.assertEqual(
+            PortfolioNav.objects.filter(portfolio=self.PORTFOLIOS.main).count(), 5
+        )
+
+        invalidate_stock_performance("MSFT", date(2021, 1, 2))
+        self.get(self.PORTFOLIOS.main.id)
+        self.assertEqual(self.calculate.call_count, 2)
+        self.assertEqual(
+            PortfolioNav.objects.filter(portfolio=self.PORTFOLIOS.main).count(), 3
+        )
@@ -0,0 +1,245 @@
+"""Test cases for the current position service."""
+
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import numpy as np
+
+from django.test import TestCase
+from src.lib.services.events import SplitEvent, TransactionEvent
+from src.lib.services.positions import (
+    PositionTimeline,
+    get_current_positions,
+    get_position_history,
+)
+from src.lib.services.stocks import get_portfolio_snapshot, replay_current_positions
+from src.raw_data.models import StockSplit
+from src.transactions.models import StockTransaction
+
+from ...seed import generate_test_data
+
+
+class TestCurrentPositions(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.STOCKS = data.STOCKS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.SPLIT_SYNCS = data.STOCK_SPLIT_SYNCS
+
+    def setUp(self):
+        self.purchase = StockTransaction.objects.create(
+            amount=2,
+            date=date(2021, 1, 2),
+            ticker=self.STOCKS.PM,
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+            price=90.0,
+        )
+        StockTransaction.objects.create(
+            amount=3,
+            date=date(2021, 2, 2),
+            ticker=self.STOCKS.MSFT,
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+            price=100.0,
+        )
+
+    def _assert_consistent(self):
+        """The stored positions and history of the main portfolio are the same as the replayed ones."""
+
+        positions, timeline = replay_current_positions(self.PORTFOLIOS.main)
+        periods = {ticker: timeline.periods(ticker) for ticker in timeline.tickers}
+
+        self.assertEqual(get_current_positions(self.PORTFOLIOS.main), positions)
+        self.assertEqual(
+            get_position_history(self.PORTFOLIOS.main),
+            {ticker: history for ticker, history in periods.items() if history},
+        )
+
+    def test_stores_the_positions_on_create(self):
+        positions = get_current_positions(self.PORTFOLIOS.main)
+
+        self.assertEqual(positions.keys(), {"PM", "MSFT"})
+        # The PM position was split after the purchase.
+        self.assertEqual(positions["PM"].shares, 4)
+        self.assertEqual(positions["PM"].purchase_price, 45.0)
+        self._assert_consistent()
+
+    def test_stores_the_position_history(self):
+        self.assertEqual(
+            get_position_history(self.PORTFOLIOS.main)["PM"],
+            [(date(2021, 1, 2), date(2021, 1, 9), 2), (date(2021, 1, 9), None, 4)],
+        )
+
+    def test_refreshes_the_positions_on_update(self):
+        self.purchase.ticker = self.STOCKS.BABA
+        self.purchase.save()
+
+        self.assertEqual(
+            get_current_positions(self.PORTFOLIOS.main).keys(), {"BABA", "MSFT"}
+        )
+        self._assert_consistent()
+
+        self.purchase.portfolio = self.PORTFOLIOS.other
+        self.purchase.save()
+
+        self.assertEqual(get_current_positions(self.PORTFOLIOS.main).keys(), {"MSFT"})
+        self.assertEqual(get_current_positions(self.PORTFOLIOS.other).keys(), {"BABA"})
+        self._assert_consistent()
+
+    def test_removes_the_closed_positions(self):
+        StockTransaction.objects.create(
+            amount=-3,
+            date=date(2021, 3, 2),
+            ticker=self.STOCKS.MSFT,
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+            price=110.0,
+        )
+        self.purchase.delete()
+
+        self.assertEqual(get_current_positions(self.PORTFOLIOS.main), {})
+
+    def test_refreshes_the_positions_on_split(self):
+        StockSplit.objects.create(
+            ticker=self.STOCKS.MSFT,
+            date=date(2021, 2, 10),
+            ratio=3,
+            sync=self.SPLIT_SYNCS.main,
+        )
+
+        self.assertEqual(get_current_positions(self.PORTFOLIOS.main)["MSFT"].shares, 9)
+        self._assert_consistent()
+
+    def test_snapshot_reads_the_current_positions(self):
+        today = date.today()
+        with patch("src.lib.services.stocks.has_later_actions", return_value=True):
+            replayed = get_portfolio_snapshot([self.PORTFOLIOS.main], today)
+
+        with self.assertNumQueries(6):
+            snapshot = get_portfolio_snapshot([self.PORTFOLIOS.main], today)
+
+        self.assertEqual(snapshot.positions, replayed.positions)
+
+    def test_snapshot_replays_with_later_actions(self):
+        StockTransaction.objects.create(
+            amount=5,
+            date=date.today() + timedelta(days=1),
+            ticker=self.STOCKS.MSFT,
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+            price=100.0,
+        )
+
+        snapshot = get_portfolio_snapshot([self.PORTFOLIOS.main], date.today())
+
+        self.assertEqual(snapshot.positions["MSFT"].shares, 3)
+
+
+class TestPositionTimeline(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.STOCKS = data.STOCKS
+
+    def _transaction(self, ticker, amount, action_date, price=10.0):
+        """Transaction event, the timeline only reads the ticker, the amount, the price and the date."""
+
+        return TransactionEvent(action_date, ticker.ticker, amount, price, 0)
+
+    def test_empty(self):
+        timeline = PositionTimeline([])
+
+        self.assertEqual(timeline.shares("MSFT", date(2021, 1, 1)), 0)
+        self.assertEqual(timeline.lookup([], []).tolist(), [])
+
+    def test_shares_at_date(self):
+        timeline = PositionTimeline(
+            [
+                self._transaction(self.STOCKS.MSFT, 3, date(2021, 1, 2)),
+                self._transaction(self.STOCKS.PM, 5, date(2021, 1, 3)),
+                SplitEvent(date(2021, 1, 5), "MSFT", 2.5),
+                self._transaction(self.STOCKS.MSFT, -7, date(2021, 1, 8)),
+                # A sell without a position is ignored.
+                self._transaction(self.STOCKS.MSFT, -1, date(2021, 1, 9)),
+                self._transaction(self.STOCKS.MSFT, 4, date(2021, 1, 10)),
+                self._transaction(self.STOCKS.MSFT, 1, date(2021, 1, 10)),
+            ]
+        )
+
+        self.assertEqual(timeline.shares("MSFT", date(2021, 1, 1)), 0)
+        self.assertEqual(timeline.shares("MSFT", date(2021, 1, 2)), 3)
+        # The shares are truncated after a split.
+        self.assertEqual(timeline.shares("MSFT", date(2021, 1, 6)), 7)
+        self.assertEqual(timeline.shares("MSFT", date(2021, 1, 9)), 0)
+        # Every action of the date is applied.
+        self.assertEqual(timeline.shares("MSFT", date(2021, 1, 10)), 5)
+        self.assertEqual(timeline.shares("BABA", date(2021, 1, 10)), 0)
+        self.assertEqual(
+            timeline.lookup(
+                ["PM", "MSFT", "PM", "BABA"],
+                [
+                    date(2021, 1, 2),
+                    date(2021, 1, 2),
+                    date(2022, 1, 1),
+                    date(2022, 1, 1),
+                ],
+            ).tolist(),
+            [0, 3, 5, 0],
+        )
+
+    def test_periods(self):
+        timeline = PositionTimeline(
+            [
+                self._transaction(self.STOCKS.MSFT, 3, date(2021, 1, 2)),
+                self._transaction(self.STOCKS.MSFT, 2, date(2021, 1, 2)),
+                self._transaction(self.STOCKS.MSFT, -5, date(2021, 1, 4)),
+                self._transaction(self.STOCKS.MSFT, 1, date(2021, 1, 6)),
+            ]
+        )
+
+        self.assertEqual(timeline.tickers, ["MSFT"])
+        self.assertEqual(
+            timeline.periods("MSFT"),
+            [(date(2021, 1, 2), date(2021, 1, 4), 5), (date(2021, 1, 6), None, 1)],
+        )
+        self.assertEqual(timeline.periods("PM"), [])
+
+    def test_opening_prices(self):
+        timeline = PositionTimeline(
+            [
+                self._transaction(self.STOCKS.MSFT, 3, date(2021, 1, 2), 20.0),
+                self._transaction(self.STOCKS.MSFT, 2, date(2021, 1, 3), 30.0),
+                SplitEvent(date(2021, 1, 4), "MSFT", 2),
+                self._transaction(self.STOCKS.MSFT, -10, date(2021, 1, 5), 40.0),
+                self._transaction(self.STOCKS.MSFT, 1, date(2021, 1, 6), 50.0),
+            ]
+        )
+
+        # The opening price is kept after the buys and the splits.
+        self.assertEqual(
+            timeline.opening_prices(
+                ["MSFT", "MSFT"], [date(2021, 1, 4), date(2021, 1, 6)]
+            ).tolist(),
+            [20.0, 50.0],
+        )
+        # There is no opening price without a position.
+        self.assertTrue(
+            np.isnan(
+                timeline.opening_prices(
+                    ["MSFT", "MSFT", "PM"],
+                    [date(2021, 1, 1), date(2021, 1, 5), date(2021, 1, 6)],
+                )
+            ).all()
+        )
+
+    def test_negative_position(self):
+        with self.assertRaises(Exception):
+            PositionTimeline(
+                [
+                    self._transaction(self.STOCKS.MSFT, 3, date(2021, 1, 2)),
+                    self._transaction(self.STOCKS.MSFT, -4, date(2021, 1, 3)),
+                ]
+            )
@@ -0,0 +1,231 @@
+"""Test cases for the price history service."""
+
+from datetime import date
+from os import path
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+
+import numpy as np
+from django.test import TestCase, override_settings
+from src.lib.services.cache import bump_shared_versions
+from src.lib.services.prices import (
+    PRICE_MATRIX,
+    PriceMatrix,
+    get_price_matrix,
+    read_price_history,
+    refresh_prices,
+    write_price_history,
+)
+from src.raw_data.models import StockPrice
+
+from ...seed import generate_test_data
+
+
+class TestPriceMatrix(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.STOCKS = data.STOCKS
+        cls.PRICE_SYNCS = data.STOCK_PRICE_SYNCS
+
+        # There is no price for MSFT on 2021-01-03 and 2021-01-04.
+        StockPrice.objects.create(
+            ticker=cls.STOCKS.MSFT,
+            date=date(2021, 1, 5),
+            value=95,
+            sync=cls.PRICE_SYNCS.main,
+        )
+
+    def setUp(self):
+        self.matrix = PriceMatrix()
+
+    def test_price(self):
+        self.assertIsNone(self.matrix.price("MSFT", date(2020, 12, 30)))
+        self.assertEqual(self.matrix.price("MSFT", date(2020, 12, 31)), 89)
+        self.assertEqual(self.matrix.price("MSFT", date(2021, 1, 2)), 90)
+        self.assertEqual(self.matrix.price("MSFT", date(2021, 1, 4)), 90)
+        self.assertEqual(self.matrix.price("MSFT", date(2021, 1, 5)), 95)
+        self.assertEqual(self.matrix.price("MSFT", date(2022, 1, 1)), 95)
+
+    def test_no_prices(self):
+        self.assertIsNone(self.matrix.price("GOOGL", date(2021, 1, 1)))
+
+    def test_prices(self):
+        with self.assertNumQueries(1):
+            result = self.matrix.prices(
+                ["MSFT", "PM", "GOOGL"],
+                [date(2020, 12, 31), date(2021, 1, 1), date(2021, 1, 4)],
+            )
+
+        np.testing.assert_array_equal(
+            result,
+            [
+                [89, 89, 90],
+                [np.nan, 46, 45],
+                [np.nan, np.nan, np.nan],
+            ],
+        )
+
+    def test_rows_are_loaded_once(self):
+        self.matrix.load(["MSFT", "PM"])
+
+        with self.assertNumQueries(0):
+            self.matrix.price("MSFT", date(2021, 1, 1))
+            self.matrix.prices(["PM"], [date(2021, 1, 1)])
+
+    def test_outdated_rows_are_reloaded(self):
+        self.matrix.load(["MSFT", "PM"])
+        StockPrice.objects.create(
+            ticker=self.STOCKS.MSFT,
+            date=date(2021, 1, 8),
+            value=99,
+            sync=self.PRICE_SYNCS.main,
+        )
+        # Only the shared version is bumped by the process that handled the sync.
+        bump_shared_versions("prices", ["MSFT"])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.matrix.price("MSFT", date(2021, 1, 8)), 99)
+        with self.assertNumQueries(0):
+            self.matrix.price("PM", date(2021, 1, 1))
+
+    def test_valuate(self):
+        result = self.matrix.valuate(
+            ["MSFT", "PM"],
+            np.array([[1, 2, 2], [3, 3, 0]]),
+            [date(2020, 12, 31), date(2021, 1, 1), date(2021, 1, 2)],
+        )
+
+        np.testing.assert_array_equal(result, [89, 89 * 2 + 46 * 3, 90 * 2])
+
+        # The positions without a price are valued at the fallback prices.
+        result = self.matrix.valuate(
+            ["MSFT", "PM"],
+            np.array([[1, 2, 2], [3, 3, 0]]),
+            [date(2020, 12, 31), date(2021, 1, 1), date(2021, 1, 2)],
+            np.full((2, 3), 40.0),
+        )
+
+        np.testing.assert_array_equal(result, [89 + 40 * 3, 89 * 2 + 46 * 3, 90 * 2])
+
+    def test_refresh(self):
+        self.matrix.load(["MSFT"])
+        StockPrice.objects.create(
+            ticker=self.STOCKS.MSFT,
+            date=date(2021, 1, 8),
+            value=99,
+            sync=self.PRICE_SYNCS.main,
+        )
+
+        self.matrix.refresh("MSFT")
+
+        self.assertEqual(self.matrix.price("MSFT", date(2021, 1, 5)), 95)
+        self.assertEqual(self.matrix.price("MSFT", date(2021, 1, 7)), 95)
+        self.assertEqual(self.matrix.price("MSFT", date(2021, 1, 8)), 99)
+
+    def test_refresh_without_prices(self):
+        self.matrix.load(["GOOGL"])
+        StockPrice.objects.create(
+            ticker=self.STOCKS.GOOGL,
+            date=date(2021, 1, 8),
+            value=1_500,
+            sync=self.PRICE_SYNCS.main,
+        )
+
+        self.matrix.refresh("GOOGL")
+
+        self.assertEqual(self.matrix.price("GOOGL", date(2021, 1, 9)), 1_500)
+
+    def test_refresh_is_lazy(self):
+        with self.assertNumQueries(0):
+            self.matrix.refresh("MSFT")
+
+    def test_refresh_prices(self):
+        PRICE_MATRIX.clear()
+        self.addCleanup(PRICE_MATRIX.clear)
+        PRICE_MATRIX.load(["MSFT"])
+        StockPrice.objects.create(
+            ticker=self.STOCKS.MSFT,
+            date=date(2021, 1, 8),
+            value=99,
+            sync=self.PRICE_SYNCS.main,
+        )
+
+        refresh_prices("MSFT")
+
+        # The refreshed row is current, so it is not reloaded.
+        with self.assertNumQueries(0):
+            self.assertEqual(PRICE_MATRIX.price("MSFT", date(2021, 1, 8)), 99)
+
+    def test_get_price_matrix(self):
+        self.assertIsNot(get_price_matrix(), PRICE_MATRIX)
+
+        with override_settings(PRICE_MATRIX_CACHE=True):
+            self.assertIs(get_price_matrix(), PRICE_MATRIX)
+
+
+class TestPriceStore(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.STOCKS = data.STOCKS
+        cls.PRICE_SYNCS = data.STOCK_PRICE_SYNCS
+
+    def setUp(self):
+        # The directory is removed by the cleanup.
+        directory = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(PRICE_STORE_PATH=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    @override_settings(PRICE_STORE_PATH=None)
+    def test_disabled(self):
+        self.assertIsNone(read_price_history("MSFT"))
+        self.assertEqual(write_price_history("MSFT"), 0)
+
+    def test_read_builds_the_history(self):
+        history = read_price_history("MSFT")
+
+        with self.assertNumQueries(0):
+            history = read_price_history("MSFT")
+
+        self.assertEqual(
+            history["date"].tolist(),
+            [
+                date(2020, 12, 31).toordinal(),
+                date(2021, 1, 1).toordinal(),
+                date(2021, 1, 2).toordinal(),
+            ],
+        )
+        self.assertEqual(history["value"].tolist(), [89, 89, 90])
+
+    def test_no_prices(self):
+        self.assertEqual(len(read_price_history("GOOGL")), 0)
+
+    def test_broken_store(self):
+        with NamedTemporaryFile() as file:
+            # The store can't be created under a file.
+            with override_settings(PRICE_STORE_PATH=path.join(file.name, "prices")):
+                history = read_price_history("MSFT")
+
+        self.assertEqual(history["value"].tolist(), [89, 89, 90])
+
+    def test_append(self):
+        self.assertEqual(write_price_history("MSFT"), 3)
+        StockPrice.objects.create(
+            ticker=self.STOCKS.MSFT,
+            date=date(2021, 1, 3),
+            value=91,
+            sync=self.PRICE_SYNCS.main,
+        )
+
+        self.assertEqual(write_price_history("MSFT"), 1)
+        self.assertEqual(write_price_history("MSFT"), 0)
+        self.assertEqual(read_price_history("MSFT")["value"].tolist(), [89, 89, 90, 91])
+
+    def test_rebuild(self):
+        write_price_history("MSFT")
+        StockPrice.objects.filter(ticker="MSFT", date=date(2021, 1, 1)).update(value=88)
+
+        self.assertEqual(write_price_history("MSFT", rebuild=True), 3)
+        self.assertEqual(read_price_history("MSFT")["value"].tolist(), [89, 88, 90])
@@ -1,9 +1,16 @@
 """Test cases for the replay service."""
 
+from copy import copy
 from datetime import date
+from types import SimpleNamespace
 
 from django.test import TestCase
-from src.lib.services.replay import generate_snapshot_series
+from src.lib.services.replay import (
+    CopyOnWriteMap,
+    FusedReplay,
+    generate_snapshot_series,
+    merge_actions,
+)
 from tests.stubs import DateBoundStub, InitialStub
 
 
@@ -56,3 +63,182 @@ class TestGenerateSnapshotSeries(TestCase):
         )
 
         self.assertEqual(result[self.snapshot_date], InitialStub(5))
+
+    def test_streamed_actions(self):
+        result = generate_snapshot_series(
+            self.initial,
+            iter(self.actions),
+            [date(2021, 6, 1), self.snapshot_date, date(2021, 1, 1)],
+            lambda x, y: InitialStub(x.value + y.value),
+            lambda x, y: x,
+        )
+
+        self.assertEqual(
+            result,
+            {
+                date(2021, 1, 1): InitialStub(3),
+                date(2021, 6, 1): InitialStub(3),
+                self.snapshot_date: InitialStub(5),
+            },
+        )
+
+    def test_snapshots_after_the_last_action_are_taken_in_order(self):
+        taken = []
+
+        generate_snapshot_series(
+            self.initial,
+            self.actions,
+            [date(2023, 1, 1), date(2022, 6, 1)],
+            lambda x, y: x,
+            lambda x, y: taken.append(y),
+        )
+
+        self.assertEqual(taken, [date(2022, 6, 1), date(2023, 1, 1)])
+
+
+class TestMergeActions(TestCase):
+    def test_empty(self):
+        self.assertEqual(list(merge_actions()), [])
+        self.assertEqual(list(merge_actions([], [])), [])
+
+    def test_merge_by_date(self):
+        first = [DateBoundStub(1, date(2021, 1, 1)), DateBoundStub(2, date(2021, 3, 1))]
+        second = [
+            DateBoundStub(3, date(2021, 2, 1)),
+            DateBoundStub(4, date(2021, 4, 1)),
+        ]
+
+        self.assertEqual(
+            [action.value for action in merge_actions(first, second)], [1, 3, 2, 4]
+        )
+
+    def test_same_date_keeps_the_source_order(self):
+        first = [DateBoundStub(1, date(2021, 1, 1))]
+        second = [DateBoundStub(2, date(2021, 1, 1))]
+
+        self.assertEqual(
+            [action.value for action in merge_actions(second, first)], [2, 1]
+        )
+
+    def test_merge_is_lazy(self):
+        def source():
+            yield DateBoundStub(1, date(2021, 1, 1))
+            raise AssertionError("The source was consumed eagerly.")
+
+        merged = merge_actions(source(), [DateBoundStub(2, date(2021, 2, 1))])
+
+        self.assertEqual(next(merged).value, 1)
+
+
+class TestFusedReplay(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.series = [date(2021, 2, 1), date(2022, 1, 1)]
+        cls.actions = [
+            DateBoundStub(3, date(2021, 1, 1)),
+            # Any other kind of action that is dated.
+            SimpleNamespace(value=5, date=date(2021, 6, 1)),
+            DateBoundStub(2, date(2022, 1, 1)),
+        ]
+
+    def test_empty_series(self):
+        replay = FusedReplay()
+        replay.register("sum", 0, lambda x, y: x + y.value, lambda x, _: x, (object,))
+
+        self.assertEqual(replay.run(self.actions, []), {"sum": {}})
+
+    def test_multiple_reducers(self):
+        replay = FusedReplay()
+        replay.register("sum", 0, lambda x, y: x + y.value, lambda x, _: x, (object,))
+        replay.register("count", 0, lambda x, _: x + 1, lambda x, _: x, (object,))
+
+        result = replay.run(self.actions, self.series)
+
+        self.assertEqual(
+            result,
+            {
+                "sum": {date(2021, 2, 1): 3, date(2022, 1, 1): 10},
+                "count": {date(2021, 2, 1): 1, date(2022, 1, 1): 3},
+            },
+        )
+
+    def test_accepted_types(self):
+        replay = FusedReplay()
+        replay.register(
+            "sum", 0, lambda x, y: x + y.value, lambda x, _: x, (DateBoundStub,)
+        )
+
+        result = replay.run(self.actions, self.series)
+
+        self.assertEqual(result["sum"], {date(2021, 2, 1): 3, date(2022, 1, 1): 5})
+
+    def test_reads_the_state_of_earlier_reducers(self):
+        replay = FusedReplay()
+        replay.register("sum", 0, lambda x, y: x + y.value, lambda x, _: x, (object,))
+        replay.register(
+            "running_total",
+            0,
+            lambda x, _: x + replay.state("sum"),
+            lambda x, _: x,
+            (object,),
+        )
+
+        result = replay.run(self.actions, self.series)
+
+        self.assertEqual(
+            result["running_total"], {date(2021, 2, 1): 3, date(2022, 1, 1): 21}
+        )
+
+    def test_duplicate_reducer(self):
+        replay = FusedReplay()
+        replay.register("sum", 0, lambda x, y: x + y.value, lambda x, _: x, (object,))
+
+        self.assertRaisesMessage(
+            Exception,
+            "Reducer sum is already registered.",
+            replay.register,
+            "sum",
+            0,
+            lambda x, y: x,
+            lambda x, _: x,
+            (object,),
+        )
+
+
+class TestCopyOnWriteMap(TestCase):
+    def test_snapshot_is_not_affected_by_writes(self):
+        state = CopyOnWriteMap({"a": InitialStub(1)})
+        snapshot = state.snapshot()
+
+        state["b"] = InitialStub(2)
+        del state["a"]
+
+        self.assertEqual(snapshot, {"a": InitialStub(1)})
+        self.assertEqual(dict(state), {"b": InitialStub(2)})
+
+    def test_mutable_copies_shared_values(self):
+        state = CopyOnWriteMap({"a": InitialStub(1), "b": InitialStub(2)})
+        snapshot = state.snapshot()
+
+        state.mutable("a").value = 3
+
+        self.assertEqual(snapshot["a"], InitialStub(1))
+        self.assertEqual(state["a"], InitialStub(3))
+        # Unchanged values are shared with the snapshot.
+        self.assertIs(snapshot["b"], state["b"])
+
+    def test_mutable_copies_once_per_snapshot(self):
+        state = CopyOnWriteMap({"a": InitialStub(1)})
+        state.snapshot()
+
+        self.assertIs(state.mutable("a"), state.mutable("a"))
+
+    def test_copy_is_independent(self):
+        state = CopyOnWriteMap({"a": InitialStub(1)})
+        duplicate = copy(state)
+
+        duplicate.mutable("a").value = 2
+        state["b"] = InitialStub(3)
+
+        self.assertEqual(dict(state), {"a": InitialStub(1), "b": InitialStub(3)})
+        self.assertEqual(dict(duplicate), {"a": InitialStub(2)})
@@ -0,0 +1,93 @@
+"""Test cases for the returns service."""
+
+import numpy as np
+from django.test import SimpleTestCase
+from src.lib.services.returns import (
+    cumulative_returns,
+    period_returns,
+    rolling_returns,
+    rri,
+    time_weighted_return,
+    xirr,
+)
+
+
+class TestRateOfInvestmentReturn(SimpleTestCase):
+    """
+    Different scenarios to check RRI calculation.
+    Reference values took from excel.
+    """
+
+    def test_one_year_period(self):
+        self.assertEqual(rri(1, 100, 160), 0.6000)
+
+    def test_multi_year_period(self):
+        self.assertEqual(rri(3, 100, 160), 0.1696)
+
+    def test_fractional_period(self):
+        self.assertEqual(rri(0.3, 100, 160), 3.7907)
+
+    def test_negative_return(self):
+        self.assertEqual(rri(2, 100, 60), -0.2254)
+
+    def test_batch(self):
+        self.assertEqual(
+            rri([1, 3, 0, 1], [100, 100, 100, 0], [160, 160, 160, 160]).tolist(),
+            [0.6, 0.1696, 0, 0],
+        )
+
+
+class TestTimeWeightedReturns(SimpleTestCase):
+    def test_period_returns(self):
+        # The periods without a base or invested capital have no return.
+        np.testing.assert_allclose(
+            period_returns([0, 100, 100], [10, 132, 50], [10, 10, -100]), [0, 0.2, 0]
+        )
+
+    def test_time_weighted_return(self):
+        self.assertAlmostEqual(time_weighted_return([0.1, 0.1, -0.5]), -0.395)
+        self.assertEqual(time_weighted_return([]), 0)
+
+        np.testing.assert_allclose(
+            time_weighted_return([[0.1, 0.1], [0.5, -0.5]]), [0.21, -0.25]
+        )
+
+    def test_cumulative_returns(self):
+        np.testing.assert_allclose(
+            cumulative_returns([0.1, 0.1, -0.5]), [0.1, 0.21, -0.395]
+        )
+
+    def test_rolling_returns(self):
+        np.testing.assert_allclose(
+            rolling_returns([[0.1, 0.1, -0.5], [0.5, -0.5, 1]], 2),
+            [[np.nan, 0.21, -0.45], [np.nan, -0.25, 0]],
+        )
+        self.assertTrue(np.isnan(rolling_returns([0.1], 2)).all())
+
+
+class TestXirr(SimpleTestCase):
+    def test_single_period(self):
+        self.assertAlmostEqual(xirr([-1_000, 1_100], [0, 365]), 0.1)
+
+    def test_multiple_flows(self):
+        amounts = np.array([-1_000, -500, 200, 1_500])
+        days = np.array([0, 90, 200, 400])
+
+        rate = xirr(amounts, days)
+
+        # The net present value of the flows is zero at the rate.
+        self.assertAlmostEqual(
+            (amounts * (1 + rate) ** (-days / 365)).sum(), 0, places=6
+        )
+        self.assertAlmostEqual(rate, 0.1411, places=4)
+
+    def test_batch(self):
+        result = xirr(
+            [[-1_000, 1_100, 0], [-1_000, 0, 800], [-100, -100, -100]],
+            [0, 365, 730],
+        )
+
+        self.assertAlmostEqual(result[0], 0.1)
+        self.assertAlmostEqual(result[1], 0.8**0.5 - 1)
+        # There is no rate for flows without a sign change.
+        self.assertTrue(np.isnan(result[2]))
@@ -1,19 +1,27 @@
+# pylint: disable=too-many-lines
 """Test cases for stocks service."""
 
 from datetime import date
-from typing import cast
 
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from src.lib.dataclasses import StockPortfolioSnapshot, StockPositionSnapshot
+from src.lib.services.cache import bump_shared_versions
 from src.lib.services.stocks import (
+    QUOTE_CACHE,
+    StockLookup,
     get_all_stocks_since_inceptions,
     get_first_transaction,
+    get_latest_quotes,
     get_portfolio,
     get_portfolio_snapshot,
+    invalidate_quotes,
 )
-from src.raw_data.models import StockPrice, StockSplit
+from src.raw_data.models import StockDividend, StockPrice, StockSplit
 from src.stocks.models import Stock
 from src.transactions.models import StockTransaction
+from tests.stubs import to_events
 
 from ...seed import generate_test_data
 
@@ -66,7 +74,7 @@ class TestGetPortfolio(TestCase):
     def test_no_series(self):
         self.assertEqual(
             get_portfolio(
-                cast(list[StockTransaction | StockSplit], self.transactions),
+                to_events(self.transactions),
                 [],
                 self.USERS.owner,
             ),
@@ -98,7 +106,7 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [self.snapshot_date],
             owner=self.USERS.owner,
         )[self.snapshot_date]
@@ -155,7 +163,7 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [self.snapshot_date],
             owner=self.USERS.owner,
         )[self.snapshot_date]
@@ -200,7 +208,7 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [self.snapshot_date],
             owner=self.USERS.owner,
         )[self.snapshot_date]
@@ -254,7 +262,7 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [snapshot_date],
             owner=self.USERS.owner,
         )[snapshot_date]
@@ -301,7 +309,7 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [snapshot_date],
             owner=self.USERS.owner,
         )[snapshot_date]
@@ -340,7 +348,7 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [self.snapshot_date],
             owner=self.USERS.owner,
         )[self.snapshot_date]
@@ -372,7 +380,7 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [date(2021, 1, 3)],
             owner=self.USERS.owner,
         )[date(2021, 1, 3)]
@@ -394,13 +402,71 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [snapshot_date],
             owner=self.USERS.owner,
         )[snapshot_date]
 
         self.assertEqual(snapshot_date, result.date)
 
+    def test_series_snapshots_are_independent(self):
+        """
+        Changing a position later in the series should not change the earlier snapshots.
+        Unchanged positions without a new price are shared between the snapshots.
+        """
+
+        transactions = [
+            StockTransaction(
+                amount=2,
+                date=date(2021, 1, 1),
+                ticker=self.STOCKS.MSFT,
+                owner=self.USERS.owner,
+                portfolio=self.PORTFOLIOS.main,
+                price=100.0,
+            ),
+            StockTransaction(
+                amount=3,
+                date=date(2021, 1, 1),
+                ticker=self.STOCKS.GOOGL,
+                owner=self.USERS.owner,
+                portfolio=self.PORTFOLIOS.main,
+                price=50.0,
+            ),
+            StockTransaction(
+                amount=1,
+                date=date(2021, 1, 2),
+                ticker=self.STOCKS.MSFT,
+                owner=self.USERS.owner,
+                portfolio=self.PORTFOLIOS.main,
+                price=100.0,
+            ),
+        ]
+
+        result = get_portfolio(
+            to_events(transactions),
+            [date(2021, 1, 1), date(2021, 1, 2)],
+            owner=self.USERS.owner,
+        )
+
+        self.assertEqual(result[date(2021, 1, 1)].positions["MSFT"].shares, 2)
+        self.assertEqual(result[date(2021, 1, 2)].positions["MSFT"].shares, 3)
+        self.assertIs(
+            result[date(2021, 1, 1)].positions["GOOGL"],
+            result[date(2021, 1, 2)].positions["GOOGL"],
+        )
+
+    def test_series_is_valued_at_each_date(self):
+        result = get_portfolio(
+            to_events(self.transactions),
+            [date(2021, 1, 1), date(2021, 1, 2), date(2021, 1, 3)],
+            owner=self.USERS.owner,
+        )
+
+        self.assertEqual(result[date(2021, 1, 1)].positions, {})
+        self.assertEqual(result[date(2021, 1, 2)].positions["MSFT"].price, 90)
+        self.assertEqual(result[date(2021, 1, 2)].positions["PM"].price, 45)
+        self.assertEqual(result[date(2021, 1, 3)].positions["MSFT"].price, 90)
+
     def test_stock_with_no_price_data(self):
         new_stock = Stock.objects.create(
             ticker="NEW", name="new stock", sector="Consumer goods", active=True
@@ -418,7 +484,7 @@ class TestGetPortfolio(TestCase):
         ]
 
         result = get_portfolio(
-            cast(list[StockTransaction | StockSplit], transactions),
+            to_events(transactions),
             [self.snapshot_date],
             self.USERS.owner,
         )
@@ -757,6 +823,160 @@ class TestGetPortfolioSnapshot(TestCase):
         self.assertEqual(result.annualized_pnls, {"MSFT": 0.1970, "PM": 0.0615})
 
 
+class TestGetLatestQuotes(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.STOCKS = data.STOCKS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.DIVIDEND_SYNCS = data.STOCK_DIVIDEND_SYNCS
+
+        StockDividend.objects.create(
+            ticker=cls.STOCKS.MSFT,
+            amount=4,
+            date=date(2021, 2, 1),
+            sync=cls.DIVIDEND_SYNCS.main,
+        )
+
+    def test_latest_quotes(self):
+        with self.assertNumQueries(2):
+            result = get_latest_quotes(
+                ["MSFT", "PM", "BABA", "GOOGL"], date(2021, 1, 1)
+            )
+
+        self.assertEqual(
+            result,
+            {
+                "MSFT": (89, 3),
+                "PM": (46, 1.5),
+                "BABA": (150, 0.0),
+                "GOOGL": (None, 0.0),
+            },
+        )
+
+    def test_snapshot_date(self):
+        result = get_latest_quotes(["MSFT"], date(2021, 3, 1))
+
+        self.assertEqual(result, {"MSFT": (90, 4)})
+
+    def test_no_quotes(self):
+        self.assertEqual(
+            get_latest_quotes(["MSFT"], date(2020, 1, 1)), {"MSFT": (None, 0.0)}
+        )
+        self.assertEqual(get_latest_quotes([], date(2021, 1, 1)), {})
+
+    def test_subquery(self):
+        StockTransaction.objects.create(
+            amount=2,
+            date=date(2021, 1, 1),
+            ticker=self.STOCKS.PM,
+            owner=self.USERS.owner,
+            portfolio=self.PORTFOLIOS.main,
+            price=50.02,
+        )
+
+        # The tickers are resolved first to look them up in the cache.
+        with self.assertNumQueries(3):
+            result = get_latest_quotes(
+                StockTransaction.objects.values("ticker"), date(2021, 1, 2)
+            )
+
+        self.assertEqual(result, {"PM": (45, 1.5)})
+
+    def test_replay_prefetches_the_quotes(self):
+        transactions = [
+            StockTransaction.objects.create(
+                amount=1,
+                date=date(2021, 1, 1),
+                ticker=stock,
+                owner=self.USERS.owner,
+                portfolio=self.PORTFOLIOS.main,
+                price=10.0,
+            )
+            for stock in (self.STOCKS.MSFT, self.STOCKS.PM, self.STOCKS.BABA)
+        ]
+
+        for tickers in (None, StockTransaction.objects.values("ticker")):
+            with CaptureQueriesContext(connection) as context:
+                get_portfolio(
+                    to_events(transactions),
+                    [date(2021, 1, 2)],
+                    self.USERS.owner,
+                    tickers=tickers,
+                )
+
+            self.assertEqual(
+                len(
+                    [
+                        query
+                        for query in context.captured_queries
+                        if 'FROM "raw_data"' in query["sql"]
+                    ]
+                ),
+                # The latest prices, the latest dividends and the price history.
+                3,
+            )
+
+    @override_settings(QUOTE_CACHE_SIZE=10)
+    def test_cache(self):
+        QUOTE_CACHE.clear()
+        self.addCleanup(QUOTE_CACHE.clear)
+
+        get_latest_quotes(["MSFT", "PM"], date(2021, 1, 1))
+        with self.assertNumQueries(0):
+            result = get_latest_quotes(["MSFT"], date(2021, 1, 1))
+
+        self.assertEqual(result, {"MSFT": (89, 3)})
+        self.assertEqual((QUOTE_CACHE.hits, QUOTE_CACHE.misses), (1, 2))
+
+        # Only the tickers missing from the cache are queried.
+        with CaptureQueriesContext(connection) as context:
+            get_latest_quotes(["MSFT", "BABA"], date(2021, 1, 1))
+
+        self.assertEqual((QUOTE_CACHE.hits, QUOTE_CACHE.misses), (2, 3))
+        self.assertTrue(
+            all("MSFT" not in query["sql"] for query in context.captured_queries)
+        )
+
+    @override_settings(QUOTE_CACHE_SIZE=10)
+    def test_invalidate_quotes(self):
+        QUOTE_CACHE.clear()
+        self.addCleanup(QUOTE_CACHE.clear)
+
+        get_latest_quotes(["MSFT", "PM"], date(2021, 1, 1))
+        StockPrice.objects.filter(ticker="MSFT", date=date(2021, 1, 1)).update(
+            value=100
+        )
+        invalidate_quotes("MSFT")
+
+        with self.assertNumQueries(2):
+            result = get_latest_quotes(["MSFT"], date(2021, 1, 1))
+        with self.assertNumQueries(0):
+            get_latest_quotes(["PM"], date(2021, 1, 1))
+
+        self.assertEqual(result, {"MSFT": (100, 3)})
+
+    @override_settings(QUOTE_CACHE_SIZE=10)
+    def test_synced_by_another_process(self):
+        QUOTE_CACHE.clear()
+        self.addCleanup(QUOTE_CACHE.clear)
+
+        get_latest_quotes(["MSFT", "PM"], date(2021, 1, 1))
+        StockPrice.objects.filter(ticker="MSFT", date=date(2021, 1, 1)).update(
+            value=100
+        )
+        # Only the shared version is bumped by the process that handled the sync.
+        bump_shared_versions("quotes", ["MSFT"])
+
+        with self.assertNumQueries(2):
+            result = get_latest_quotes(["MSFT"], date(2021, 1, 1))
+        with self.assertNumQueries(0):
+            get_latest_quotes(["PM"], date(2021, 1, 1))
+
+        self.assertEqual(result, {"MSFT": (100, 3)})
+
+
 class TestGetAllStocksSinceInception(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -892,3 +1112,27 @@ class TestGetFirstTransaction(TestCase):
         )
 
         self.assertEqual(get_first_transaction([self.PORTFOLIOS.main]), transaction)
+
+
+class TestStockLookup(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.STOCKS = data.STOCKS
+
+    def test_prefetched(self):
+        stocks = StockLookup(Stock.objects.filter(ticker="MSFT"))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(stocks["MSFT"], self.STOCKS.MSFT)
+
+    def test_missing(self):
+        stocks = StockLookup()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(stocks["PM"], self.STOCKS.PM)
+            self.assertEqual(stocks["PM"], self.STOCKS.PM)
+
+    def test_unknown(self):
+        with self.assertRaises(Stock.DoesNotExist):
+            StockLookup()["UNKNOWN"]  # pylint: disable=expression-not-assigned
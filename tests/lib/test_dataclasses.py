@@ -0,0 +1,45 @@
+"""Unit tests for the shared dataclasses."""
+
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from src.lib.dataclasses import SnapshotSeries, StockPortfolioSnapshot
+
+
+class TestSnapshotSeries(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User(username="owner")
+        cls.snapshots = {
+            snapshot_date: StockPortfolioSnapshot(
+                positions={}, date=snapshot_date, owner=owner
+            )
+            for snapshot_date in [date(2021, 3, 1), date(2021, 1, 1), date(2021, 2, 1)]
+        }
+
+    def test_empty(self):
+        series = SnapshotSeries()
+
+        self.assertEqual(len(series), 0)
+        self.assertIsNone(series.latest(date(2021, 1, 1)))
+
+    def test_ordered_by_date(self):
+        series = SnapshotSeries(self.snapshots)
+
+        self.assertEqual(
+            list(series), [date(2021, 1, 1), date(2021, 2, 1), date(2021, 3, 1)]
+        )
+        self.assertEqual(series, self.snapshots)
+        self.assertIs(series[date(2021, 2, 1)], self.snapshots[date(2021, 2, 1)])
+
+    def test_latest(self):
+        series = SnapshotSeries(self.snapshots)
+
+        self.assertIsNone(series.latest(date(2020, 12, 31)))
+        self.assertIs(series.latest(date(2021, 1, 1)), self.snapshots[date(2021, 1, 1)])
+        self.assertIs(
+            series.latest(date(2021, 2, 15)), self.snapshots[date(2021, 2, 1)]
+        )
+        self.assertIs(series.latest(date(2022, 1, 1)), self.snapshots[date(2021, 3, 1)])
@@ -4,10 +4,11 @@ from datetime import date, datetime, timedelta
 from typing import cast
 
 from django.test import TestCase
+from rest_framework.exceptions import ParseError
 from rest_framework.request import Request
 
 from src.lib.dataclasses import Interval
-from src.lib.helpers import get_range
+from src.lib.helpers import get_points, get_range
 
 from ..stubs import RequestStub
 
@@ -45,3 +46,20 @@ class TestGetRange(TestCase):
             get_range(cast(Request, request)),
             Interval(date(2022, 2, 14), today),
         )
+
+
+class TestGetPoints(TestCase):
+    def test_empty(self):
+        self.assertIsNone(get_points(cast(Request, RequestStub())))
+
+    def test_points_parsing(self):
+        request = RequestStub(query_params={"points": "120"})
+
+        self.assertEqual(get_points(cast(Request, request)), 120)
+
+    def test_invalid_input(self):
+        for points in ["test", "1"]:
+            request = RequestStub(query_params={"points": points})
+
+            with self.assertRaises(ParseError):
+                get_points(cast(Request, request))
@@ -1,8 +1,17 @@
 """Integration tests for the performance API."""
 
-from django.test import TestCase
+from datetime import date
+from tempfile import TemporaryDirectory
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
+from src.auth.helpers import generate_token
+from src.lib.services.nav import materialize_nav
+from src.transactions.enums import Currency
+from src.transactions.models import CashTransaction, StockTransaction
 
+from ..cases import CommittedTestCase
 from ..seed import generate_test_data
 
 
@@ -12,15 +21,38 @@ class TestPositionPerformance(TestCase):
 
     @classmethod
     def setUpTestData(cls):
-        generate_test_data()
+        data = generate_test_data()
 
         cls.url = "/performance/portfolios/1/MSFT"
+        cls.token = generate_token(data.USERS.owner)
+
+        StockTransaction.objects.create(
+            amount=2,
+            date=date(2020, 12, 30),
+            ticker=data.STOCKS.MSFT,
+            owner=data.USERS.owner,
+            portfolio=data.PORTFOLIOS.main,
+            price=85.0,
+        )
+        cls.position_url = f"/performance/portfolios/{data.PORTFOLIOS.main.id}/MSFT"
 
     def test_cannot_access_unauthenticated(self):
         response = self.client.get(self.url)
 
         self.assertEqual(response.status_code, 401)
 
+    def test_price_store(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        params = {"from": "2020-12-30", "to": "2021-01-04"}
+
+        expected = self.client.get(self.position_url, params)
+        with TemporaryDirectory() as store, override_settings(PRICE_STORE_PATH=store):
+            result = self.client.get(self.position_url, params)
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.data, expected.data)
+        self.assertEqual(len(result.data["results"]), 5)
+
 
 class TestPortfolioPerformance(TestCase):
     def setUp(self):
@@ -28,27 +60,156 @@ class TestPortfolioPerformance(TestCase):
 
     @classmethod
     def setUpTestData(cls):
-        generate_test_data()
+        data = generate_test_data()
 
         cls.url = "/performance/portfolios/1"
+        cls.token = generate_token(data.USERS.owner)
+        cls.portfolio = data.PORTFOLIOS.main
+
+        StockTransaction.objects.create(
+            amount=2,
+            date=date(2020, 12, 30),
+            ticker=data.STOCKS.MSFT,
+            owner=data.USERS.owner,
+            portfolio=data.PORTFOLIOS.main,
+            price=85.0,
+        )
+        CashTransaction.objects.create(
+            currency=Currency.US_DOLLAR,
+            amount=500,
+            date=date(2021, 1, 1),
+            owner=data.USERS.owner,
+            portfolio=data.PORTFOLIOS.main,
+        )
+        cls.portfolio_url = f"/performance/portfolios/{data.PORTFOLIOS.main.id}"
 
     def test_cannot_access_unauthenticated(self):
         response = self.client.get(self.url)
 
         self.assertEqual(response.status_code, 401)
 
+    def test_materialized_nav(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        params = {"from": "2020-12-30", "to": "2021-01-04"}
+
+        expected = self.client.get(self.portfolio_url, params)
+        materialize_nav(self.portfolio, date(2021, 1, 2))
+        result = self.client.get(self.portfolio_url, params)
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.data, expected.data)
+        self.assertEqual(
+            [snapshot["cash_flow"] for snapshot in result.data["results"]],
+            [0, 0, 500, 0, 0],
+        )
+        self.assertEqual(
+            set(result.data["returns"]), {"time_weighted", "money_weighted"}
+        )
+
+    @override_settings(PERFORMANCE_CACHE="default")
+    def test_cached_results(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.addCleanup(caches["default"].clear)
+        params = {"from": "2020-12-30", "to": "2021-01-04"}
+
+        expected = self.client.get(self.portfolio_url, params)
+        cached = self.client.get(self.portfolio_url, params)
+        CashTransaction.objects.create(
+            currency=Currency.US_DOLLAR,
+            amount=100,
+            date=date(2021, 1, 2),
+            owner=self.portfolio.owner,
+            portfolio=self.portfolio,
+        )
+        result = self.client.get(self.portfolio_url, params)
+
+        self.assertEqual(cached.data, expected.data)
+        self.assertEqual(
+            [snapshot["cash_flow"] for snapshot in result.data["results"]],
+            [0, 0, 500, 100, 0],
+        )
+
+    def test_points(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        params = {"from": "2020-12-30", "to": "2021-01-04"}
+
+        daily = self.client.get(self.portfolio_url, params)
+        result = self.client.get(self.portfolio_url, {**params, "points": 3})
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(result.data["results"]), 3)
+        self.assertEqual(
+            result.data["results"][-1]["date"], daily.data["results"][-1]["date"]
+        )
+        self.assertEqual(
+            sum(snapshot["cash_flow"] for snapshot in result.data["results"]), 500
+        )
+
+    def test_invalid_points(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        for points in ["test", "1"]:
+            response = self.client.get(self.portfolio_url, {"points": points})
+
+            self.assertEqual(response.status_code, 400)
+
+
+class TestPortfolioSummaryPerformance(CommittedTestCase):
+    # The portfolios are loaded by worker threads, so the test data must be committed.
 
-class TestPortfolioSummaryPerformance(TestCase):
     def setUp(self):
         self.client = APIClient()
 
-    @classmethod
-    def setUpTestData(cls):
-        generate_test_data()
-
-        cls.url = "/performance/portfolios/summary"
+        data = generate_test_data()
+
+        self.url = "/performance/portfolios/summary"
+        self.token = generate_token(data.USERS.owner)
+        self.portfolios = data.PORTFOLIOS
+
+        for portfolio in [data.PORTFOLIOS.main, data.PORTFOLIOS.other_users]:
+            CashTransaction.objects.create(
+                currency=Currency.US_DOLLAR,
+                amount=500,
+                date=date(2021, 1, 1),
+                owner=portfolio.owner,
+                portfolio=portfolio,
+            )
+        StockTransaction.objects.create(
+            amount=2,
+            date=date(2020, 12, 30),
+            ticker=data.STOCKS.MSFT,
+            owner=data.USERS.owner,
+            portfolio=data.PORTFOLIOS.other,
+            price=85.0,
+        )
 
     def test_cannot_access_unauthenticated(self):
         response = self.client.get(self.url)
 
         self.assertEqual(response.status_code, 401)
+
+    def test_sums_the_owned_portfolios(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        params = {"from": "2020-12-30", "to": "2021-01-04"}
+
+        result = self.client.get(self.url, params)
+        portfolios = [
+            self.client.get(f"/performance/portfolios/{portfolio.id}", params)
+            for portfolio in [self.portfolios.main, self.portfolios.other]
+        ]
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(result.data["results"]), 5)
+        for field in ["base_size", "appreciation", "cash_flow"]:
+            self.assertEqual(
+                [snapshot[field] for snapshot in result.data["results"]],
+                [
+                    sum(values)
+                    for values in zip(
+                        *(
+                            [snapshot[field] for snapshot in portfolio.data["results"]]
+                            for portfolio in portfolios
+                        )
+                    )
+                ],
+            )
@@ -1,10 +1,16 @@
 """Integration tests for the raw data API."""
 
-from django.test import TestCase
+from datetime import date
+
+from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
 from src.auth.helpers import generate_token
 from src.lib.enums import SyncStatus
+from src.lib.services.cache import get_shared_versions
+from src.lib.services.stocks import QUOTE_CACHE
 from src.raw_data.models import (
+    ForexRate,
+    ForexRateSync,
     StockDividend,
     StockDividendSync,
     StockPrice,
@@ -91,6 +97,22 @@ class TestStockPriceSync(TestCase):
         self.assertEqual(sync.status, SyncStatus.FINISHED)
         self.assertEqual(updated_prices_count, current_prices_count + 4)
 
+    @override_settings(QUOTE_CACHE_SIZE=10)
+    def test_upload_invalidates_the_quotes(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.bot_token}")
+        self.addCleanup(QUOTE_CACHE.clear)
+        versions = get_shared_versions("quotes", ["MSFT", "PM"])
+        QUOTE_CACHE.set(("MSFT", versions["MSFT"], date(2021, 1, 5)), (90, 3))
+        QUOTE_CACHE.set(("PM", versions["PM"], date(2021, 1, 5)), (45, 1.5))
+
+        self.client.post(self.url, self.payload, format="json")
+
+        self.assertIsNone(QUOTE_CACHE.get(("MSFT", versions["MSFT"], date(2021, 1, 5))))
+        self.assertIsNotNone(QUOTE_CACHE.get(("PM", versions["PM"], date(2021, 1, 5))))
+        self.assertNotEqual(
+            get_shared_versions("quotes", ["MSFT"])["MSFT"], versions["MSFT"]
+        )
+
 
 class TestStockDividendSync(TestCase):
     def setUp(self):
@@ -292,3 +314,87 @@ class TestStockSplitStats(TestCase):
         response = self.client.get("/raw-data/stocks/stock-splits")
 
         self.assertEqual(response.status_code, 200)
+
+
+class TestForexRateSync(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+
+        cls.url = "/raw-data/forex/EUR/USD/forex-rates"
+        cls.token = generate_token(data.USERS.owner)
+        cls.bot_token = generate_token(data.USERS.bot)
+
+        cls.payload = {
+            "data": [
+                {"date": "2021-01-04", "rate": 1.2},
+                {"date": "2021-01-05", "rate": 1.21},
+            ]
+        }
+
+    def test_cannot_access_unauthenticated(self):
+        response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_investor_cannot_upload(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        response = self.client.post(self.url, self.payload, format="json")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_cannot_upload_unknown_currency(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.bot_token}")
+
+        response = self.client.post(
+            "/raw-data/forex/GBP/USD/forex-rates", self.payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_upload(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.bot_token}")
+
+        response = self.client.post(self.url, self.payload, format="json")
+
+        sync = ForexRateSync.objects.last()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sync.status, SyncStatus.FINISHED)
+        self.assertEqual(
+            list(
+                ForexRate.objects.filter(
+                    source_currency="EUR", target_currency="USD"
+                ).values_list("date", "rate")
+            ),
+            [(date(2021, 1, 4), 1.2), (date(2021, 1, 5), 1.21)],
+        )
+
+    def test_upload_skips_the_synced_dates(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.bot_token}")
+        self.client.post(self.url, self.payload, format="json")
+
+        response = self.client.post(
+            self.url,
+            {
+                "data": [
+                    {"date": "2021-01-05", "rate": 1.3},
+                    {"date": "2021-01-06", "rate": 1.22},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(ForexRate.objects.values_list("date", "rate")),
+            [
+                (date(2021, 1, 4), 1.2),
+                (date(2021, 1, 5), 1.21),
+                (date(2021, 1, 6), 1.22),
+            ],
+        )
@@ -3,6 +3,7 @@
 import logging
 from types import MethodType
 
+from django.conf import settings
 from django.db import connections
 from django.test.runner import DiscoverRunner
 
@@ -17,6 +18,7 @@ def prepare_database(self):
             CREATE SCHEMA stocks;
             CREATE SCHEMA transactions;
             CREATE SCHEMA dashboard;
+            CREATE SCHEMA performance;
         """
     )
 
@@ -28,6 +30,14 @@ class PostgresSchemaTestRunner(DiscoverRunner):
         super().__init__(*args, **kwargs)
         logging.disable(logging.CRITICAL)
 
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # The test cases change the prices without syncing them, so they are not cached by default.
+        settings.QUOTE_CACHE_SIZE = 0
+        settings.PRICE_MATRIX_CACHE = False
+        settings.FOREX_RATE_CACHE = False
+        settings.PERFORMANCE_CACHE = ""
+
     def setup_databases(self, **kwargs):
         for connection_name in connections:
             connection = connections[connection_name]
@@ -1,9 +1,11 @@
 """Stubs for testing."""
 
 from datetime import date
-from typing import Any
+from typing import Any, Iterable
 
 from django.contrib.auth.models import User
+from django.db.models import Model
+from src.lib.services.events import EVENT_TYPES, Event
 
 
 class RequestStub:
@@ -72,3 +74,14 @@ class DateBoundStub:
 
         self.value = value
         self.date = date
+
+
+def to_events(instances: Iterable[Model]) -> list[Event]:
+    """Converts already loaded model instances to replay events, keeping their order."""
+
+    return [
+        EVENT_TYPES[type(instance)]._make(
+            getattr(instance, field) for field in EVENT_TYPES[type(instance)]._fields
+        )
+        for instance in instances
+    ]
@@ -0,0 +1,116 @@
+"""Query plan tests for the indexes of the transaction tables."""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from src.lib.queries import sum_cash_transactions
+from src.lib.services.stocks import get_first_transaction, get_portfolio_snapshot
+from src.stocks.models import StockPortfolio
+from src.transactions.enums import Currency
+from src.transactions.models import (
+    CashTransaction,
+    ForexTransaction,
+    StockTransaction,
+)
+
+from ..explain import explain, get_scans
+from ..seed import generate_test_data
+
+TRANSACTION_TABLES = {"cash_transaction", "forex_transaction", "stock_transaction"}
+
+
+class TestTransactionIndexes(TestCase):
+    """The service queries use index scans on the transaction tables at realistic row counts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = generate_test_data()
+        cls.USERS = data.USERS
+        cls.PORTFOLIOS = data.PORTFOLIOS
+        cls.STOCKS = data.STOCKS
+
+        owners = [User.objects.create_user(f"investor-{index}") for index in range(20)]
+        portfolios = StockPortfolio.objects.bulk_create(
+            [
+                StockPortfolio(name=f"Portfolio {index}", owner=owners[index % 20])
+                for index in range(200)
+            ]
+        )
+        portfolios.append(cls.PORTFOLIOS.main)
+
+        start = date(2015, 1, 1)
+        days = [start + timedelta(days=day * 29 % 2_500) for day in range(60)]
+        StockTransaction.objects.bulk_create(
+            StockTransaction(
+                ticker=cls.STOCKS.MSFT,
+                amount=1,
+                price=100.0,
+                date=day,
+                owner=portfolio.owner,
+                portfolio=portfolio,
+            )
+            for portfolio in portfolios
+            for day in days
+        )
+        CashTransaction.objects.bulk_create(
+            CashTransaction(
+                currency=Currency.US_DOLLAR,
+                amount=1_000.0,
+                date=day,
+                owner=portfolio.owner,
+                portfolio=portfolio,
+            )
+            for portfolio in portfolios
+            for day in days
+        )
+        ForexTransaction.objects.bulk_create(
+            ForexTransaction(
+                source_currency=Currency.US_DOLLAR,
+                target_currency=Currency.EURO,
+                amount=100.0,
+                ratio=0.9,
+                date=day,
+                owner=portfolio.owner,
+                portfolio=portfolio,
+            )
+            for portfolio in portfolios
+            for day in days
+        )
+
+        with connection.cursor() as cursor:
+            for table in TRANSACTION_TABLES:
+                cursor.execute(f"ANALYZE transactions.{table}")
+
+    def assertIndexScans(self, function):
+        """Checks that every scan of a transaction table in the queries of the function uses an index."""
+
+        # pylint: disable=invalid-name
+
+        scans = [
+            (node_type, table, index)
+            for plan in explain(function)
+            for node_type, table, index in get_scans(plan)
+            if table in TRANSACTION_TABLES
+            or index.startswith(("cash", "forex", "stock"))
+        ]
+
+        self.assertTrue(scans)
+        for node_type, table, index in scans:
+            self.assertNotEqual(
+                node_type, "Seq Scan", f"{table} is scanned sequentially."
+            )
+
+    def test_sum_cash_transactions(self):
+        self.assertIndexScans(
+            lambda: sum_cash_transactions([self.PORTFOLIOS.main], date(2020, 1, 1))
+        )
+
+    def test_portfolio_snapshot(self):
+        self.assertIndexScans(
+            lambda: get_portfolio_snapshot([self.PORTFOLIOS.main], date(2020, 1, 1))
+        )
+
+    def test_first_transaction(self):
+        self.assertIndexScans(lambda: get_first_transaction([self.PORTFOLIOS.main]))